@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import inspect
 import json
-import uuid
+from collections import deque
+from contextlib import ExitStack, asynccontextmanager
 from dataclasses import dataclass
 from pathlib import Path
+from threading import Lock
 
 from agentscope.agent import ReActAgent
 from agentscope.formatter import OpenAIChatFormatter
@@ -12,46 +15,109 @@ from agentscope.model import OpenAIChatModel
 from agentscope.tool import Toolkit, ToolResponse
 
 from app.agents.skill_registry import SkillRegistry, get_skill_registry
-from app.services.abox_generator import generate_abox
+from app.services.abox_generator import export_abox, generate_abox, load_abox
+from app.services.abox_incremental import generate_abox_delta
+from app.services.abox_links import infer_links as infer_object_links, link_specs
 from app.services.data_source import parse_tabular_files
 from app.services.r2rml_generator import generate_r2rml
+from app.services.relations import infer_relations
+from app.services.rdf_output import normalize_output
+from app.services.subjects import subject_specs
 from app.services.tbox_parser import parse_tbox
-from app.utils.config import get_setting
+from app.services.triple_store import default_store_path, open_triple_sink
+from app.utils.config import get_int_setting, get_setting
+from app.utils.file_store import create_file_store
+from app.utils.metrics import REGISTRY, timed
 
+AGENT_POOL_REQUESTS = REGISTRY.counter(
+    "r2rml_agent_pool_requests_total",
+    "Skill agent checkouts by skill and whether a warmed agent was reused.",
+    ("skill", "result"),
+)
 
 
-@dataclass
-class StoredFile:
-    filename: str
-    content: bytes
 
+@dataclass(frozen=True)
+class AgentSettings:
+    api_key: str
+    base_url: str
+    model_name: str
+
+    @classmethod
+    def load(cls) -> "AgentSettings":
+        api_key = get_setting("QWEN_API_KEY")
+        if not api_key:
+            raise RuntimeError("QWEN_API_KEY not configured for AgentScope.")
+        return cls(
+            api_key=api_key,
+            base_url=get_setting("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"),
+            model_name=get_setting("QWEN_MODEL", "qwen-plus"),
+        )
 
-class FileStore:
-    def __init__(self) -> None:
-        self._files: dict[str, StoredFile] = {}
 
-    def put(self, filename: str, content: bytes) -> str:
-        file_id = uuid.uuid4().hex
-        self._files[file_id] = StoredFile(filename=filename, content=content)
-        return file_id
+class AgentPool:
+    """按技能缓存预热好的 ReActAgent；模型客户端与格式化器全局共享，取出的代理独占使用，归还前清空记忆。"""
 
-    def pop(self, file_id: str) -> StoredFile:
+    def __init__(self, build_agent, max_idle: int = 4) -> None:
+        self._build_agent = build_agent
+        self.max_idle = max(0, max_idle)
+        self._idle: dict[tuple[str, str], deque[ReActAgent]] = {}
+        self._lock = Lock()
+
+    @asynccontextmanager
+    async def checkout(self, skill_name: str, sys_prompt: str):
+        key = (skill_name, sys_prompt)
+        with self._lock:
+            idle = self._idle.get(key)
+            agent = idle.pop() if idle else None
+        if agent is None:
+            AGENT_POOL_REQUESTS.inc(skill=skill_name, result="miss")
+            with timed("agent.build"):
+                agent = self._build_agent(skill_name, sys_prompt)
+        else:
+            AGENT_POOL_REQUESTS.inc(skill=skill_name, result="hit")
+
+        healthy = False
         try:
-            return self._files.pop(file_id)
-        except KeyError as exc:
-            raise ValueError(f"Unknown file id: {file_id}") from exc
+            yield agent
+            healthy = True
+        finally:
+            # 出错的代理可能残留半截对话，直接丢弃，不放回池中。
+            if healthy and await self._reset(agent):
+                with self._lock:
+                    for stale in [item for item in self._idle if item[0] == skill_name and item != key]:
+                        del self._idle[stale]
+                    idle = self._idle.setdefault(key, deque())
+                    if len(idle) < self.max_idle:
+                        idle.append(agent)
+
+    async def _reset(self, agent: ReActAgent) -> bool:
+        memory = getattr(agent, "memory", None)
+        clear = getattr(memory, "clear", None)
+        if clear is None:
+            return False
+        result = clear()
+        if inspect.isawaitable(result):
+            await result
+        return True
 
-    def pop_many(self, file_ids: list[str]) -> list[StoredFile]:
-        return [self.pop(file_id) for file_id in file_ids]
+    def clear(self) -> None:
+        with self._lock:
+            self._idle.clear()
 
 
 class AgentScopeSkillRunner:
     def __init__(self, registry: SkillRegistry | None = None) -> None:
         self.registry = registry or get_skill_registry()
-        self.file_store = FileStore()
+        self.file_store = create_file_store()
+        self._settings: AgentSettings | None = None
+        self._model: OpenAIChatModel | None = None
+        self._formatter: OpenAIChatFormatter | None = None
+        self._sys_prompts: dict[str, tuple[str, str]] = {}
+        self.agent_pool = AgentPool(self._build_agent, get_int_setting("AGENT_POOL_SIZE", 4))
 
-    def store_file(self, filename: str, content: bytes) -> str:
-        return self.file_store.put(filename, content)
+    def discard_files(self, file_ids: list[str]) -> None:
+        self.file_store.discard(file_ids)
 
     async def run_skill(
         self,
@@ -59,7 +125,6 @@ class AgentScopeSkillRunner:
         tool_name: str,
         payload: dict,
     ) -> dict:
-        agent = self._build_agent(skill_name)
         message = Msg(
             name="user",
             role="user",
@@ -72,34 +137,44 @@ class AgentScopeSkillRunner:
                 ensure_ascii=False,
             ),
         )
-        reply = await agent.reply(message)
+        async with self.agent_pool.checkout(skill_name, self._sys_prompt(skill_name)) as agent:
+            reply = await agent.reply(message)
         result = self._extract_tool_result(reply, tool_name)
         if result is None:
             raise RuntimeError(f"Skill execution failed: {skill_name}")
         return result
 
-    def _build_agent(self, skill_name: str) -> ReActAgent:
-        api_key = get_setting("QWEN_API_KEY")
-        base_url = get_setting("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
-        model_name = get_setting("QWEN_MODEL", "qwen-plus")
-
-        if not api_key:
-            raise RuntimeError("QWEN_API_KEY not configured for AgentScope.")
+    def _shared_model(self) -> tuple[OpenAIChatModel, OpenAIChatFormatter]:
+        # 模型客户端（含底层 HTTP 连接池）与格式化器无会话状态，所有代理共用一份。
+        if self._model is None:
+            settings = self._settings or AgentSettings.load()
+            self._settings = settings
+            self._model = OpenAIChatModel(
+                model_name=settings.model_name,
+                api_key=settings.api_key,
+                client_kwargs={"base_url": settings.base_url},
+                stream=False,
+            )
+            self._formatter = OpenAIChatFormatter()
+        return self._model, self._formatter
 
+    def _sys_prompt(self, skill_name: str) -> str:
+        # 技能文档按修改时间热更新；文档变化后提示词随之变化，池中旧代理自然不再命中。
         skill_doc = self.registry.get_skill_doc(skill_name)
-        sys_prompt = (
-            "你是技能执行代理，必须严格按照技能文档执行并调用工具完成任务。\n"
-            "只允许调用工具，不要输出解释性文字。\n"
-            f"技能文档:\n{skill_doc}"
-        )
+        cached = self._sys_prompts.get(skill_name)
+        if cached is None or cached[0] is not skill_doc:
+            sys_prompt = (
+                "你是技能执行代理，必须严格按照技能文档执行并调用工具完成任务。\n"
+                "只允许调用工具，不要输出解释性文字。\n"
+                f"技能文档:\n{skill_doc}"
+            )
+            cached = (skill_doc, sys_prompt)
+            self._sys_prompts[skill_name] = cached
+        return cached[1]
 
-        model = OpenAIChatModel(
-            model_name=model_name,
-            api_key=api_key,
-            client_kwargs={"base_url": base_url},
-            stream=False,
-        )
-        formatter = OpenAIChatFormatter()
+    def _build_agent(self, skill_name: str, sys_prompt: str) -> ReActAgent:
+        model, formatter = self._shared_model()
+        # ReActAgent 可能向工具集注册自身的结束函数，因此每个代理持有独立的 Toolkit。
         toolkit = Toolkit()
         toolkit.register_tool_function(self.parse_tbox_tool)
         toolkit.register_tool_function(self.parse_data_tool)
@@ -142,8 +217,8 @@ class AgentScopeSkillRunner:
 
     def parse_tbox_tool(self, file_id: str, filename: str) -> ToolResponse:
         """Parse a TBox ontology file by stored file id."""
-        stored = self.file_store.pop(file_id)
-        result = parse_tbox(stored.content, filename or stored.filename)
+        with self.file_store.pop(file_id) as stored:
+            result = parse_tbox(stored.source, filename or stored.filename)
         payload = {
             "properties": [item.model_dump() for item in result["properties"]],
             "classes": [item.model_dump() for item in result["classes"]],
@@ -154,9 +229,10 @@ class AgentScopeSkillRunner:
 
     def parse_data_tool(self, file_ids: list[str]) -> ToolResponse:
         """Parse tabular data files by stored file ids."""
-        stored_items = self.file_store.pop_many(file_ids)
-        files = [(item.filename, item.content) for item in stored_items]
-        tables = parse_tabular_files(files)
+        with ExitStack() as stack:
+            stored_items = [stack.enter_context(item) for item in self.file_store.pop_many(file_ids)]
+            files = [(item.filename, item.source) for item in stored_items]
+            tables = parse_tabular_files(files)
         payload = {
             "tables": tables,
             "file_count": len(files),
@@ -164,14 +240,116 @@ class AgentScopeSkillRunner:
         }
         return self._json_response(payload)
 
-    def generate_abox_tool(self, tables: list, mapping: list, base_iri: str) -> ToolResponse:
-        """Generate ABox Turtle content."""
+    def generate_abox_tool(
+        self,
+        tables: list,
+        mapping: list,
+        base_iri: str,
+        properties: list | None = None,
+        output_format: str = "turtle",
+        compression: str | None = None,
+        shard_by_table: bool = False,
+        store: str | None = None,
+        incremental: bool = False,
+        delta_format: str = "patch",
+        subjects: list | None = None,
+        links: list | None = None,
+        object_properties: list | None = None,
+        infer_links: bool = False,
+        dataset: str | None = None,
+    ) -> ToolResponse:
+        """Generate ABox Turtle content; property ranges select literal datatypes.
+
+        Compressed, binary, N-Quads or sharded output is streamed to files and
+        returned as a file list instead of inline content. When ``store`` is
+        set, triples are bulk-loaded into that local triple store instead.
+        ``incremental`` compares rows with the previous run and writes only the
+        added/removed triples as a delta file (also applied to ``store``); its
+        row state is kept per ``dataset``, which is required in that mode.
+        ``subjects`` gives per-table key-column templates or content hashes
+        for stable subject IRIs. ``links`` (plus inferred ones when
+        ``infer_links`` is set) add object-property triples via hash joins.
+        """
         data_dir = get_setting("DATA_DIR", "./data")
         output_dir = str(Path(data_dir) / "abox")
-        content, file_path = generate_abox(tables, mapping, base_iri, output_dir)
+        links = self._resolve_links(tables, mapping, properties, object_properties, subjects, links, infer_links)
+        if incremental and links:
+            raise ValueError("Object-property links are not supported in incremental ABox mode")
+        if incremental and not dataset:
+            raise ValueError("dataset is required for incremental ABox generation")
+        sink = None
+        if store:
+            store_path = get_setting("ABOX_STORE_PATH") or default_store_path(data_dir, store)
+            sink = open_triple_sink(store, store_path)
+        if incremental:
+            result = generate_abox_delta(
+                tables,
+                mapping,
+                base_iri,
+                output_dir,
+                get_setting("ABOX_STATE_PATH") or Path(output_dir) / "state.sqlite3",
+                properties=properties,
+                delta_format=delta_format,
+                sink=sink,
+                subjects=subjects,
+                dataset=dataset,
+            )
+            return self._json_response(result)
+        if sink is not None:
+            result = load_abox(
+                tables, mapping, base_iri, sink, properties=properties, subjects=subjects, links=links
+            )
+            return self._json_response({"format": "store", "content": None, "file_path": result["path"], **result})
+        fmt, codec = normalize_output(output_format, compression)
+        if fmt != "turtle" or codec != "none" or shard_by_table:
+            result = export_abox(
+                tables,
+                mapping,
+                base_iri,
+                output_dir,
+                properties=properties,
+                output_format=fmt,
+                compression=codec,
+                shard_by_table=shard_by_table,
+                subjects=subjects,
+                links=links,
+            )
+            return self._json_response(result.to_dict())
+        content, file_path = generate_abox(
+            tables, mapping, base_iri, output_dir, properties=properties, subjects=subjects, links=links
+        )
         return self._json_response({"format": "turtle", "content": content, "file_path": file_path})
 
-    def generate_r2rml_tool(self, mapping: list, table_name: str, base_iri: str) -> ToolResponse:
-        """Generate R2RML Turtle content."""
-        content = generate_r2rml(mapping, table_name, base_iri)
+    def generate_r2rml_tool(
+        self,
+        mapping: list,
+        table_name: str,
+        base_iri: str,
+        tables: list | None = None,
+        properties: list | None = None,
+        links: list | None = None,
+        object_properties: list | None = None,
+        infer_links: bool = False,
+        subjects: list | None = None,
+    ) -> ToolResponse:
+        """Generate R2RML Turtle content; ``links`` (plus inferred ones when
+        ``infer_links`` is set) become joins to the referenced tables.
+        ``subjects`` are the same per-table key rules as for the ABox, so
+        subject templates match the generated ABox IRIs."""
+        links = self._resolve_links(tables or [], mapping, properties, object_properties, subjects, links, infer_links)
+        content = generate_r2rml(mapping, table_name, base_iri, links, subject_specs(subjects))
         return self._json_response({"format": "turtle", "content": content})
+
+    @staticmethod
+    def _resolve_links(tables, mapping, properties, object_properties, subjects, links, infer_links: bool) -> list:
+        # 推断的连接来自表间关系（同名字段与按取值草图发现的外键列对）。
+        links = link_specs(links)
+        if infer_links and tables:
+            relations = infer_relations(tables)
+            links = link_specs(
+                links
+                + infer_object_links(
+                    tables, mapping, properties or [], object_properties or [], relations, subject_specs(subjects)
+                )
+            )
+        return links
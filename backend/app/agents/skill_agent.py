@@ -1,5 +1,5 @@
 from app.agents.skill_registry import SkillRegistry, get_skill_registry
-from app.skills.r2rml_skill import run_matching
+from app.skills.r2rml_skill import run_incremental_matching, run_matching
 
 
 class SkillAgent:
@@ -12,8 +12,14 @@ class SkillAgent:
     def _load_skill_doc(self) -> str:
         return self.registry.get_skill_doc(self.skill_name)
 
-    def match(self, properties, tables, mode: str, threshold: float):
+    def match(self, properties, tables, mode: str, threshold: float, on_result=None, session_id: str | None = None):
         skill_doc = self._load_skill_doc()
         if self.skill_name == "r2rml":
-            return run_matching(properties, tables, mode, threshold, skill_doc)
+            return run_matching(properties, tables, mode, threshold, skill_doc, on_result, session_id)
+        raise ValueError(f"未知技能: {self.skill_name}")
+
+    def match_incremental(self, properties, tables, mode: str, threshold: float, session_id: str | None = None):
+        skill_doc = self._load_skill_doc()
+        if self.skill_name == "r2rml":
+            return run_incremental_matching(properties, tables, mode, threshold, skill_doc, session_id)
         raise ValueError(f"未知技能: {self.skill_name}")
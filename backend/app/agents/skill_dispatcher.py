@@ -1,7 +1,11 @@
+import asyncio
+import contextvars
+
 from app.agents.agentscope_runner import AgentScopeSkillRunner
 from app.agents.skill_agent import SkillAgent
 from app.agents.skill_registry import SkillRegistry, get_skill_registry
 
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 
 class SkillDispatcher:
@@ -10,42 +14,146 @@ class SkillDispatcher:
         self.match_agent = SkillAgent("r2rml", registry=self.registry)
         self.skill_runner = AgentScopeSkillRunner(self.registry)
 
-    async def parse_tbox(self, content: bytes, filename: str):
+    async def parse_tbox(self, upload):
+        """upload 需提供 filename 与异步 read(size)，例如 FastAPI 的 UploadFile。"""
         self.registry.ensure_skill("tbox-parse")
-        file_id = self.skill_runner.store_file(filename or "", content)
-        return await self.skill_runner.run_skill(
-            "tbox-parse",
-            "parse_tbox_tool",
-            {"file_id": file_id, "filename": filename},
-        )
+        file_id = await self._spool_upload(upload)
+        try:
+            return await self.skill_runner.run_skill(
+                "tbox-parse",
+                "parse_tbox_tool",
+                {"file_id": file_id, "filename": upload.filename},
+            )
+        finally:
+            # 代理未调用工具时文件仍在暂存区，立即释放而不是等 TTL。
+            self.skill_runner.discard_files([file_id])
 
-    async def parse_data(self, files: list[tuple[str, bytes]]):
+    async def parse_data(self, uploads):
         self.registry.ensure_skill("data-parse")
         file_ids = []
-        for filename, content in files:
-            file_ids.append(self.skill_runner.store_file(filename or "", content))
-        return await self.skill_runner.run_skill(
-            "data-parse",
-            "parse_data_tool",
-            {"file_ids": file_ids},
-        )
+        try:
+            for upload in uploads:
+                file_ids.append(await self._spool_upload(upload))
+            return await self.skill_runner.run_skill(
+                "data-parse",
+                "parse_data_tool",
+                {"file_ids": file_ids},
+            )
+        finally:
+            self.skill_runner.discard_files(file_ids)
+
+    async def _spool_upload(self, upload) -> str:
+        # 分块写入暂存文件，整个上传内容不会同时驻留内存。
+        with self.skill_runner.file_store.spool(upload.filename or "") as writer:
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                writer.write(chunk)
+        return writer.file_id
 
     async def match(self, properties, tables, mode: str, threshold: float):
         self.registry.ensure_skill("r2rml")
         return self.match_agent.match(properties, tables, mode, threshold)
 
-    async def generate_abox(self, tables, mapping, base_iri: str):
+    async def match_stream(self, properties, tables, mode: str, threshold: float, session_id: str | None = None):
+        """逐条产出 ("match", MatchItem)，最后产出 ("done", 全部结果) 供调用方汇总；
+        带 session_id 时结果写入该会话的增量状态。
+        """
+        self.registry.ensure_skill("r2rml")
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def on_result(item) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, ("match", item))
+
+        context = contextvars.copy_context()
+        task = loop.run_in_executor(
+            None,
+            context.run,
+            self.match_agent.match,
+            properties,
+            tables,
+            mode,
+            threshold,
+            on_result,
+            session_id,
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(("finished", None)))
+        while True:
+            kind, item = await queue.get()
+            if kind == "finished":
+                break
+            yield kind, item
+        yield "done", task.result()
+
+    async def match_incremental(self, properties, tables, mode: str, threshold: float, session_id: str | None):
+        self.registry.ensure_skill("r2rml")
+        return self.match_agent.match_incremental(properties, tables, mode, threshold, session_id)
+
+    async def generate_abox(
+        self,
+        tables,
+        mapping,
+        base_iri: str,
+        properties=None,
+        output_format: str = "turtle",
+        compression: str | None = None,
+        shard_by_table: bool = False,
+        store: str | None = None,
+        incremental: bool = False,
+        delta_format: str = "patch",
+        subjects=None,
+        links=None,
+        object_properties=None,
+        infer_links: bool = False,
+        dataset: str | None = None,
+    ):
         self.registry.ensure_skill("abox-generate")
         return await self.skill_runner.run_skill(
             "abox-generate",
             "generate_abox_tool",
-            {"tables": tables, "mapping": mapping, "base_iri": base_iri},
+            {
+                "tables": tables,
+                "mapping": mapping,
+                "base_iri": base_iri,
+                "properties": properties or [],
+                "output_format": output_format,
+                "compression": compression,
+                "shard_by_table": shard_by_table,
+                "store": store,
+                "incremental": incremental,
+                "delta_format": delta_format,
+                "subjects": subjects or [],
+                "links": links or [],
+                "object_properties": object_properties or [],
+                "infer_links": infer_links,
+                "dataset": dataset,
+            },
         )
 
-    async def generate_r2rml(self, mapping, table_name: str, base_iri: str):
+    async def generate_r2rml(
+        self,
+        mapping,
+        table_name: str,
+        base_iri: str,
+        tables=None,
+        properties=None,
+        links=None,
+        object_properties=None,
+        infer_links: bool = False,
+        subjects=None,
+    ):
         self.registry.ensure_skill("r2rml-generate")
         return await self.skill_runner.run_skill(
             "r2rml-generate",
             "generate_r2rml_tool",
-            {"mapping": mapping, "table_name": table_name, "base_iri": base_iri},
+            {
+                "mapping": mapping,
+                "table_name": table_name,
+                "base_iri": base_iri,
+                "tables": tables or [],
+                "properties": properties or [],
+                "links": links or [],
+                "object_properties": object_properties or [],
+                "infer_links": infer_links,
+                "subjects": subjects or [],
+            },
         )
@@ -1,6 +1,9 @@
+import json
 import logging
+import time
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
 
 from app.agents.skill_dispatcher import SkillDispatcher
 from app.models.schemas import AboxRequest, MatchRequest, MatchResponse, R2RmlRequest
@@ -19,8 +22,7 @@ async def version():
 @router.post("/tbox/parse")
 async def tbox_parse(file: UploadFile = File(...)):
     try:
-        content = await file.read()
-        result = await dispatcher.parse_tbox(content, file.filename)
+        result = await dispatcher.parse_tbox(file)
         return result
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -29,12 +31,7 @@ async def tbox_parse(file: UploadFile = File(...)):
 @router.post("/data/parse")
 async def data_parse(files: list[UploadFile] = File(...)):
     try:
-        file_items = []
-        for file in files:
-            content = await file.read()
-            file_items.append((file.filename or "", content))
-
-        return await dispatcher.parse_data(file_items)
+        return await dispatcher.parse_data(files)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
@@ -42,6 +39,15 @@ async def data_parse(files: list[UploadFile] = File(...)):
 @router.post("/match", response_model=MatchResponse)
 async def match_fields(payload: MatchRequest):
     try:
+        if payload.incremental:
+            matches, diff = await dispatcher.match_incremental(
+                payload.properties,
+                payload.tables,
+                payload.mode,
+                payload.threshold,
+                payload.session_id,
+            )
+            return MatchResponse(matches=matches, diff=diff)
         matches = await dispatcher.match(payload.properties, payload.tables, payload.mode, payload.threshold)
         return MatchResponse(matches=matches)
     except Exception as exc:
@@ -49,6 +55,52 @@ async def match_fields(payload: MatchRequest):
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@router.post("/match/stream")
+async def match_fields_stream(payload: MatchRequest, request: Request, format: str | None = None):
+    use_sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+
+    def encode(record: dict) -> str:
+        body = json.dumps(record, ensure_ascii=False)
+        if use_sse:
+            return f"event: {record['type']}\ndata: {body}\n\n"
+        return body + "\n"
+
+    async def events():
+        start = time.perf_counter()
+        emitted: set[str] = set()
+        try:
+            async for kind, data in dispatcher.match_stream(
+                payload.properties,
+                payload.tables,
+                payload.mode,
+                payload.threshold,
+                payload.session_id,
+            ):
+                if kind == "match":
+                    emitted.add(data.property_iri)
+                    yield encode({"type": "match", "item": data.model_dump()})
+                    continue
+                # 兜底：未逐条推送的结果在汇总前补发，保证客户端拿到完整结果。
+                for item in data:
+                    if item.property_iri not in emitted:
+                        yield encode({"type": "match", "item": item.model_dump()})
+                yield encode(
+                    {
+                        "type": "summary",
+                        "total": len(data),
+                        "matched": sum(1 for item in data if item.field),
+                        "mode": payload.mode,
+                        "elapsed": round(time.perf_counter() - start, 3),
+                    }
+                )
+        except Exception as exc:
+            logger.exception("流式匹配失败")
+            yield encode({"type": "error", "detail": str(exc)})
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
 @router.post("/abox")
 async def abox_generate(payload: AboxRequest):
     try:
@@ -56,6 +108,18 @@ async def abox_generate(payload: AboxRequest):
             payload.tables,
             payload.mapping,
             payload.base_iri,
+            payload.properties,
+            output_format=payload.output_format,
+            compression=payload.compression,
+            shard_by_table=payload.shard_by_table,
+            store=payload.store,
+            incremental=payload.incremental,
+            delta_format=payload.delta_format,
+            subjects=payload.subjects,
+            links=payload.links,
+            object_properties=payload.object_properties,
+            infer_links=payload.infer_links,
+            dataset=payload.dataset,
         )
         return result
     except Exception as exc:
@@ -65,7 +129,17 @@ async def abox_generate(payload: AboxRequest):
 @router.post("/r2rml")
 async def r2rml_generate(payload: R2RmlRequest):
     try:
-        result = await dispatcher.generate_r2rml(payload.mapping, payload.table_name, payload.base_iri)
+        result = await dispatcher.generate_r2rml(
+            payload.mapping,
+            payload.table_name,
+            payload.base_iri,
+            tables=payload.tables,
+            properties=payload.properties,
+            links=payload.links,
+            object_properties=payload.object_properties,
+            infer_links=payload.infer_links,
+            subjects=payload.subjects,
+        )
         return result
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -1,17 +1,41 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
+import time
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 
 from app.api.routes import router
+from app.services.data_source import shutdown_parse_pool
+from app.services.triple_store import close_triple_stores
+from app.utils.cache import publish_cache_metrics
+from app.utils.file_store import publish_file_store_metrics
 from app.utils.logging import configure_logging
+from app.utils.match_logger import shutdown_match_logs
+from app.utils.metrics import (
+    HTTP_DURATION,
+    HTTP_REQUESTS,
+    REGISTRY,
+    begin_request_timings,
+    format_server_timing,
+)
 from app.utils.version import BACKEND_VERSION
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
 configure_logging()
 
-app = FastAPI(title="R2RML Demo API", version=BACKEND_VERSION)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    shutdown_match_logs()
+    shutdown_parse_pool()
+    close_triple_stores()
+
+
+app = FastAPI(title="R2RML Demo API", version=BACKEND_VERSION, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,11 +43,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Process-Time"],
 )
 
 app.include_router(router, prefix="/api")
 
 
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    timings = begin_request_timings()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.inc(path=path, status=status)
+        HTTP_DURATION.observe(elapsed, path=path)
+    # 流式响应（没有 Content-Length）的响应头在响应体开始发送前就已确定，此时的计时只覆盖到首字节，
+    # 不能代表整个请求，因此不加 Server-Timing / X-Process-Time。
+    if "content-length" in response.headers:
+        response.headers["Server-Timing"] = format_server_timing(timings, elapsed)
+        response.headers["X-Process-Time"] = f"{elapsed:.4f}"
+    return response
+
+
+@app.get("/metrics")
+def metrics():
+    publish_cache_metrics()
+    publish_file_store_metrics()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
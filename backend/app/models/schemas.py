@@ -26,11 +26,19 @@ class ObjectPropertyItem(BaseModel):
     ranges: List[IriItem] = Field(default_factory=list)
 
 
+class ColumnSketchItem(BaseModel):
+    values: int = 0
+    distinct: int = 0
+    minhash: List[int] = Field(default_factory=list)
+    numeric: bool = False
+
+
 class TableItem(BaseModel):
     name: str
     fields: List[str] = Field(default_factory=list)
     sample_rows: List[dict[str, Any]] = Field(default_factory=list)
     rows: List[dict[str, Any]] = Field(default_factory=list)
+    sketches: dict[str, ColumnSketchItem] = Field(default_factory=dict)
 
 
 class MatchRequest(BaseModel):
@@ -38,6 +46,8 @@ class MatchRequest(BaseModel):
     tables: List[TableItem]
     mode: str = Field(default="heuristic")
     threshold: float = Field(default=0.5)
+    session_id: Optional[str] = None
+    incremental: bool = False
 
 
 class MatchItem(BaseModel):
@@ -46,10 +56,22 @@ class MatchItem(BaseModel):
     table_name: Optional[str] = None
     field: Optional[str] = None
     score: Optional[float] = None
+    reason: Optional[str] = None
+    # LLM/精排没有给出结论、沿用本地评分时为 True；这类结果不进入增量状态。
+    fallback: bool = False
+
+
+class MatchDiff(BaseModel):
+    added: List[str] = Field(default_factory=list)
+    removed: List[str] = Field(default_factory=list)
+    changed: List[str] = Field(default_factory=list)
+    rescored: int = 0
+    reused: int = 0
 
 
 class MatchResponse(BaseModel):
     matches: List[MatchItem]
+    diff: Optional[MatchDiff] = None
 
 
 class MappingItem(BaseModel):
@@ -58,13 +80,46 @@ class MappingItem(BaseModel):
     table_name: Optional[str] = None
 
 
+class SubjectTemplateItem(BaseModel):
+    table_name: str
+    keys: List[str] = Field(default_factory=list)
+    template: Optional[str] = None
+    hash: bool = False
+
+
+class LinkItem(BaseModel):
+    property_iri: str
+    source_table: str
+    source_field: str
+    target_table: str
+    target_field: str
+
+
 class AboxRequest(BaseModel):
     tables: List[TableItem]
     mapping: List[MappingItem]
     base_iri: str = Field(default="http://example.com/")
+    properties: List[PropertyItem] = Field(default_factory=list)
+    output_format: str = Field(default="turtle")
+    compression: Optional[str] = None
+    shard_by_table: bool = False
+    store: Optional[str] = None
+    incremental: bool = False
+    delta_format: str = Field(default="patch")
+    dataset: Optional[str] = None
+    subjects: List[SubjectTemplateItem] = Field(default_factory=list)
+    links: List[LinkItem] = Field(default_factory=list)
+    object_properties: List[ObjectPropertyItem] = Field(default_factory=list)
+    infer_links: bool = False
 
 
 class R2RmlRequest(BaseModel):
     mapping: List[MappingItem]
     table_name: str = Field(default="data_table")
     base_iri: str = Field(default="http://example.com/")
+    tables: List[TableItem] = Field(default_factory=list)
+    properties: List[PropertyItem] = Field(default_factory=list)
+    links: List[LinkItem] = Field(default_factory=list)
+    object_properties: List[ObjectPropertyItem] = Field(default_factory=list)
+    infer_links: bool = False
+    subjects: List[SubjectTemplateItem] = Field(default_factory=list)
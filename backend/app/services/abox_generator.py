@@ -1,11 +1,66 @@
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 from urllib.parse import quote
+import logging
+import time
 
-from rdflib import Graph, Literal, URIRef
+from app.models.schemas import MappingItem, PropertyItem
+from app.services.abox_links import LinkSpec, iter_link_triples, link_specs
+from app.services.literals import LiteralEncoder, compile_literal_encoder, escape_iri, select_range
+from app.services.rdf_output import (
+    BinaryTripleWriter,
+    TextTripleWriter,
+    Triple,
+    normalize_output,
+    open_output,
+    output_suffix,
+)
+from app.services.subjects import SubjectSpec, compile_subject, subject_specs, track_subjects
+from app.utils.config import get_setting
+from app.utils.metrics import BYTES_OUT, ITEMS, timed
 
-from app.models.schemas import MappingItem
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompiledMapping:
+    field: str
+    predicate: str
+    encode: LiteralEncoder
+    datatype: Optional[str] = None
+
+
+@dataclass
+class AboxFile:
+    path: str
+    table_name: Optional[str]
+    triples: int
+    bytes: int
+
+
+@dataclass
+class AboxExport:
+    format: str
+    compression: str
+    files: list[AboxFile] = field(default_factory=list)
+    duplicates: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def triples(self) -> int:
+        return sum(item.triples for item in self.files)
+
+    def to_dict(self) -> dict:
+        return {
+            "format": self.format,
+            "compression": self.compression,
+            "content": None,
+            "file_path": self.files[0].path if len(self.files) == 1 else None,
+            "files": [asdict(item) for item in self.files],
+            "triples": self.triples,
+            "duplicates": self.duplicates,
+        }
 
 
 def generate_abox(
@@ -13,50 +68,287 @@ def generate_abox(
     mapping: list[MappingItem],
     base_iri: str,
     output_dir: Optional[str] = None,
+    properties: Optional[list[PropertyItem]] = None,
+    language: Optional[str] = None,
+    subjects: Optional[list] = None,
+    links: Optional[list] = None,
 ) -> Tuple[str, Optional[str]]:
-    graph = Graph()
+    """按映射生成 ABox，直接输出 N-Triples 行（也是合法的 Turtle）。
 
-    base = base_iri if base_iri.endswith('/') else base_iri + '/'
-    mapping_by_table = _group_mapping_by_table(mapping)
+    properties 提供各属性的 rdfs:range，用于生成带数据类型的字面量；缺省时按值的 Python 类型推断。
+    links 为对象属性连接规则（见 app.services.abox_links），在数据属性之后输出表间链接。
+    """
+    base = normalize_base(base_iri)
+    mapping_by_table = compile_mapping(mapping, properties or [], resolve_language(language))
 
-    for table in tables:
-        table_name = _table_value(table, 'name', None)
-        rows = _table_value(table, 'rows', [])
-        if not table_name or table_name not in mapping_by_table:
-            continue
-        table_mapping = mapping_by_table[table_name]
-        table_token = quote(str(table_name))
-        for index, row in enumerate(rows, start=1):
-            subject = URIRef(f"{base}table/{table_token}/row/{index}")
-            for item in table_mapping:
-                value = row.get(item.field)
-                if value is None:
-                    continue
-                graph.add((subject, URIRef(item.property_iri), Literal(value)))
-
-    content = graph.serialize(format='turtle')
+    lines: list[str] = []
+    with timed("abox.build"):
+        for _, triples in iter_triple_batches(
+            tables, mapping_by_table, base, subjects=subject_specs(subjects), links=link_specs(links)
+        ):
+            lines.extend([f"{s} {p} {o} .\n" for s, p, o in triples])
+    ITEMS.inc(len(lines), kind="abox_triples")
+
+    with timed("abox.serialize"):
+        content = "".join(lines)
+        data = content.encode('utf-8')
+    BYTES_OUT.inc(len(data), target="abox")
     file_path = None
 
     if output_dir:
         Path(output_dir).mkdir(parents=True, exist_ok=True)
-        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-        target = Path(output_dir) / f"abox-{stamp}.ttl"
-        target.write_text(content, encoding='utf-8')
+        target = Path(output_dir) / f"abox-{_stamp()}.ttl"
+        target.write_bytes(data)
         file_path = str(target)
 
     return content, file_path
 
 
-def _group_mapping_by_table(mapping: list[MappingItem]) -> dict[str, list[MappingItem]]:
-    grouped: dict[str, list[MappingItem]] = {}
+def export_abox(
+    tables: list,
+    mapping: list[MappingItem],
+    base_iri: str,
+    output_dir: str,
+    properties: Optional[list[PropertyItem]] = None,
+    language: Optional[str] = None,
+    output_format: str = "turtle",
+    compression: Optional[str] = None,
+    shard_by_table: bool = False,
+    subjects: Optional[list] = None,
+    links: Optional[list] = None,
+) -> AboxExport:
+    """边生成边写文件，不在内存中拼接整份内容；支持 gzip/zstd 压缩、二进制字典编码与按表分片。
+
+    N-Quads 以每张表的命名图区分来源；分片时每张表一个文件，便于三元组库并行装载。
+    """
+    fmt, codec = normalize_output(output_format, compression)
+    base = normalize_base(base_iri)
+    mapping_by_table = compile_mapping(mapping, properties or [], resolve_language(language))
+    suffix = output_suffix(fmt, codec)
+    stamp = _stamp()
+    target_dir = Path(output_dir) / f"abox-{stamp}" if shard_by_table else Path(output_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    result = AboxExport(format=fmt, compression=codec)
+    writers: dict[Optional[str], tuple[Path, object]] = {}
+
+    def writer_for(table_name: str):
+        key = table_name if shard_by_table else None
+        if key not in writers:
+            name = quote(table_name, safe='') if shard_by_table else f"abox-{stamp}"
+            path = target_dir / f"{name}{suffix}"
+            stream = open_output(path, codec)
+            writer = BinaryTripleWriter(stream) if fmt == "binary" else TextTripleWriter(stream)
+            writers[key] = (path, writer)
+        return writers[key][1]
+
+    try:
+        with timed("abox.export"):
+            for table_name, triples in iter_triple_batches(
+                tables,
+                mapping_by_table,
+                base,
+                subjects=subject_specs(subjects),
+                duplicates=result.duplicates,
+                links=link_specs(links),
+            ):
+                graph = graph_iri(base, table_name) if fmt == "nquads" else None
+                writer_for(table_name).write(triples, graph)
+    finally:
+        for path, writer in writers.values():
+            writer.close()
+
+    for key, (path, writer) in writers.items():
+        size = path.stat().st_size
+        result.files.append(AboxFile(path=str(path), table_name=key, triples=writer.triples, bytes=size))
+        BYTES_OUT.inc(size, target="abox")
+    ITEMS.inc(result.triples, kind="abox_triples")
+    return result
+
+
+def load_abox(
+    tables: list,
+    mapping: list[MappingItem],
+    base_iri: str,
+    sink,
+    properties: Optional[list[PropertyItem]] = None,
+    language: Optional[str] = None,
+    subjects: Optional[list] = None,
+    links: Optional[list] = None,
+) -> dict:
+    """把生成的三元组直接批量写入本地三元组库（见 app.services.triple_store），省去序列化再解析。
+
+    每张表写入各自的命名图，与 N-Quads 导出一致；全量装载前先清空该表的命名图，源数据中删除或修改的行不会残留。
+    """
+    base = normalize_base(base_iri)
+    mapping_by_table = compile_mapping(mapping, properties or [], resolve_language(language))
+    duplicates: dict[str, int] = {}
+    link_rules = link_specs(links)
+    loaded = {_value(table, 'name', None) for table in tables} & set(mapping_by_table)
+    loaded.update(link.source_table for link in link_rules)
+    started = time.perf_counter()
+    try:
+        with timed("abox.store"):
+            sink.clear_graphs([graph_iri(base, table_name) for table_name in sorted(loaded)])
+            for table_name, triples in iter_triple_batches(
+                tables,
+                mapping_by_table,
+                base,
+                subjects=subject_specs(subjects),
+                duplicates=duplicates,
+                links=link_rules,
+            ):
+                sink.write(triples, graph_iri(base, table_name))
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - started
+    ITEMS.inc(sink.triples, kind="abox_triples")
+    return {
+        "store": sink.kind,
+        "path": str(sink.path),
+        "triples": sink.triples,
+        "removed": sink.removed,
+        "batches": sink.batches,
+        "batch_size": sink.batch_size,
+        "elapsed": round(elapsed, 3),
+        "duplicates": duplicates,
+    }
+
+
+def iter_triple_batches(
+    tables: list,
+    mapping_by_table: dict[str, list["CompiledMapping"]],
+    base: str,
+    batch_rows: int = 2000,
+    subjects: Optional[dict[str, SubjectSpec]] = None,
+    duplicates: Optional[dict] = None,
+    links: Optional[list[LinkSpec]] = None,
+) -> Iterator[tuple[str, list[Triple]]]:
+    """按表逐批产出 (主语, 谓词, 宾语) 三元组，均为已格式化的 N-Triples 词项；对象属性链接归入源表。
+
+    与 rdflib Graph 不同，流式输出不做全局去重：同一行内及同一批内的重复三元组会去掉，
+    键列重复的行若落在不同批次，输出中仍可能有重复（重复主语数见 duplicates）。
+    """
+    subjects = subjects or {}
+    for table_name, table_mapping, subject_rows in iter_table_rows(
+        tables, mapping_by_table, base, subjects, duplicates
+    ):
+        # 行号主语各不相同，只有按键列或内容哈希生成主语的表才可能跨行重复。
+        dedupe = table_name in subjects
+        batch: list[Triple] = []
+        for index, (subject, row) in enumerate(subject_rows, start=1):
+            batch.extend(row_triples(subject, row, table_mapping))
+            if index % batch_rows == 0 and batch:
+                yield table_name, list(dict.fromkeys(batch)) if dedupe else batch
+                batch = []
+        if batch:
+            yield table_name, list(dict.fromkeys(batch)) if dedupe else batch
+    yield from iter_link_triples(tables, links or [], base, subjects)
+
+
+def iter_table_rows(
+    tables: list,
+    mapping_by_table: dict[str, list["CompiledMapping"]],
+    base: str,
+    subjects: Optional[dict[str, SubjectSpec]] = None,
+    duplicates: Optional[dict] = None,
+    duplicate_check: Optional[str] = None,
+) -> Iterator[tuple[str, list["CompiledMapping"], Iterator[tuple[str, dict]]]]:
+    """按表产出 (表名, 编译后的映射, (主语, 行) 迭代器)；主语为已格式化的 IRI 词项。
+
+    subjects 为按表的主语规则（键列模板或内容哈希），未配置的表使用行号主语；键列主语会检测重复，
+    重复数写入 duplicates。duplicate_check 覆盖 ABOX_DUPLICATE_CHECK 设置。
+    """
+    subjects = subjects or {}
+    for table in tables:
+        table_name = _value(table, 'name', None)
+        rows = _value(table, 'rows', [])
+        if not table_name or table_name not in mapping_by_table:
+            continue
+        spec = subjects.get(table_name)
+        subject_of = compile_subject(table_name, base, spec)
+        if spec is None:
+            subject_rows = ((subject_of(index, row), row) for index, row in enumerate(rows, start=1))
+        else:
+            subject_rows = track_subjects(table_name, rows, subject_of, duplicates, duplicate_check)
+        yield table_name, mapping_by_table[table_name], subject_rows
+
+
+def row_triples(subject: str, row: dict, table_mapping: list["CompiledMapping"]) -> list[Triple]:
+    triples = []
+    for item in table_mapping:
+        value = row.get(item.field)
+        if value is None:
+            continue
+        literal = item.encode(value)
+        if literal is not None:
+            triples.append((subject, item.predicate, literal))
+    # 多个字段映射到同一属性且取值相同时只保留一条。
+    return list(dict.fromkeys(triples)) if len(triples) > 1 else triples
+
+
+def compile_mapping(
+    mapping: list,
+    properties: list,
+    language: Optional[str] = None,
+) -> dict[str, list[CompiledMapping]]:
+    """每个映射项只编译一次：谓词 IRI 预先转义并格式化，字面量编码函数按属性 range 选定；重复映射去重。"""
+    ranges = {
+        _value(prop, 'iri', None): select_range([_value(item, 'iri', '') for item in _value(prop, 'ranges', [])])
+        for prop in properties
+    }
+    encoders: dict[Optional[str], LiteralEncoder] = {}
+    grouped: dict[str, list[CompiledMapping]] = {}
+    seen: set[tuple[str, str, str]] = set()
+    escaped: dict[str, str] = {}
     for item in mapping:
-        if not item.table_name:
+        table_name = _value(item, 'table_name', None)
+        field = _value(item, 'field', None)
+        property_iri = _value(item, 'property_iri', None)
+        if not table_name or not field or not property_iri:
             continue
-        grouped.setdefault(item.table_name, []).append(item)
+        key = (table_name, field, property_iri)
+        if key in seen:
+            continue
+        seen.add(key)
+        range_iri = ranges.get(property_iri)
+        if range_iri not in encoders:
+            encoders[range_iri] = compile_literal_encoder(range_iri, language)
+        if property_iri not in escaped:
+            escaped[property_iri] = escape_iri(property_iri)
+            if escaped[property_iri] != property_iri:
+                logger.warning("属性 IRI 含 N-Triples 不允许的字符，已按百分号编码：%r", property_iri)
+        grouped.setdefault(table_name, []).append(
+            CompiledMapping(
+                field=field,
+                predicate=f"<{escaped[property_iri]}>",
+                encode=encoders[range_iri],
+                datatype=range_iri,
+            )
+        )
     return grouped
 
 
-def _table_value(table, key: str, default):
-    if isinstance(table, dict):
-        return table.get(key, default)
-    return getattr(table, key, default)
+def normalize_base(base_iri: str) -> str:
+    base = escape_iri(base_iri)
+    return base if base.endswith('/') else base + '/'
+
+
+def resolve_language(language: Optional[str]) -> Optional[str]:
+    if language is None:
+        return get_setting("ABOX_DEFAULT_LANGUAGE", "") or None
+    return language
+
+
+def graph_iri(base: str, table_name: str) -> str:
+    return f"<{base}graph/{quote(str(table_name))}>"
+
+
+def _stamp() -> str:
+    return datetime.now().strftime('%Y%m%d-%H%M%S')
+
+
+def _value(item, key: str, default):
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+import hashlib
+import json
+import logging
+import sqlite3
+import tempfile
+import time
+
+from app.services.abox_generator import (
+    CompiledMapping,
+    compile_mapping,
+    graph_iri,
+    iter_table_rows,
+    normalize_base,
+    resolve_language,
+    row_triples,
+)
+from app.services.literals import RDF_LANG_STRING, XSD
+from app.services.rdf_output import Triple
+from app.services.subjects import DUPLICATE_CHECKS, duplicate_check_mode, subject_specs
+from app.utils.metrics import BYTES_OUT, ITEMS, timed
+
+logger = logging.getLogger(__name__)
+
+DELTA_FORMATS = {"patch": ".rdfp", "sparql": ".ru"}
+# SQLite 单条语句的参数个数有上限，按块查询旧三元组。
+_LOOKUP_CHUNK = 500
+
+
+@dataclass
+class DeltaStats:
+    rows_added: int = 0
+    rows_changed: int = 0
+    rows_removed: int = 0
+    rows_unchanged: int = 0
+    triples_added: int = 0
+    triples_removed: int = 0
+
+
+class AboxState:
+    """增量生成的行状态：按 (数据集, 表名, 主语) 保存行内容哈希与上次生成的三元组。
+
+    哈希覆盖映射签名与行中已映射字段的取值，未变化的行无需重新编码；三元组用于计算删除。
+    dataset 区分共用同一状态文件的不同项目/数据集，表名与 base IRI 相同也互不影响。
+    """
+
+    def __init__(self, path: str | Path, dataset: str) -> None:
+        self.path = Path(path)
+        self.dataset = dataset
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(abox_rows)")}
+        if columns and "dataset" not in columns:
+            # 旧版状态没有数据集维度，无法判断归属，只能丢弃；下次生成按全新状态输出。
+            logger.warning("增量状态缺少数据集列，已清空旧状态：%s", self.path)
+            self.connection.execute("DROP TABLE abox_rows")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS abox_rows ("
+            "dataset TEXT NOT NULL, table_name TEXT NOT NULL, subject TEXT NOT NULL, hash BLOB NOT NULL, "
+            "triples TEXT NOT NULL, PRIMARY KEY (dataset, table_name, subject)) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def hashes(self, table_name: str) -> dict[str, bytes]:
+        cursor = self.connection.execute(
+            "SELECT subject, hash FROM abox_rows WHERE dataset = ? AND table_name = ?", (self.dataset, table_name)
+        )
+        return dict(cursor)
+
+    def triples(self, table_name: str, subjects: list[str]) -> dict[str, list[Triple]]:
+        result: dict[str, list[Triple]] = {}
+        for start in range(0, len(subjects), _LOOKUP_CHUNK):
+            chunk = subjects[start : start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self.connection.execute(
+                "SELECT subject, triples FROM abox_rows "
+                f"WHERE dataset = ? AND table_name = ? AND subject IN ({placeholders})",
+                [self.dataset, table_name, *chunk],
+            )
+            for subject, payload in cursor:
+                result[subject] = [tuple(item) for item in json.loads(payload)]
+        return result
+
+    def stage(self, table_name: str, upserts: list[tuple[str, bytes, list[Triple]]], removed: Iterable[str]) -> None:
+        """写入本表的变化；在 commit() 之前不生效，输出写完后再统一提交。"""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO abox_rows (dataset, table_name, subject, hash, triples) VALUES (?, ?, ?, ?, ?)",
+            [(self.dataset, table_name, subject, digest, json.dumps(triples)) for subject, digest, triples in upserts],
+        )
+        self.connection.executemany(
+            "DELETE FROM abox_rows WHERE dataset = ? AND table_name = ? AND subject = ?",
+            [(self.dataset, table_name, subject) for subject in removed],
+        )
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def rollback(self) -> None:
+        self.connection.rollback()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class SinkBuffer:
+    """暂存要应用到三元组库的删除/新增（JSONL 临时文件，内存只占一个批次）。
+
+    三元组库的批次各自提交、无法整体回滚，因此先把变化写到这里，全部表检查通过后再 apply()。
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.handle = tempfile.NamedTemporaryFile(
+            "w+", encoding="utf-8", dir=directory, prefix="abox-delta-", suffix=".pending", delete=False
+        )
+        self.path = Path(self.handle.name)
+
+    def write(self, graph: str, removed: list[Triple], added: list[Triple]) -> None:
+        self.handle.write(json.dumps([graph, removed, added], ensure_ascii=False) + "\n")
+
+    def apply(self, sink) -> None:
+        self.handle.seek(0)
+        for line in self.handle:
+            graph, removed, added = json.loads(line)
+            if removed:
+                sink.remove([tuple(triple) for triple in removed], graph)
+            if added:
+                sink.write([tuple(triple) for triple in added], graph)
+
+    def discard(self) -> None:
+        self.handle.close()
+        self.path.unlink(missing_ok=True)
+
+
+class DeltaWriter:
+    """写出删除/新增三元组：patch 为 RDF Patch（D/A 行，带表的命名图），sparql 为 SPARQL Update。"""
+
+    def __init__(self, path: Path, delta_format: str) -> None:
+        self.path = path
+        self.delta_format = delta_format
+        self.handle = open(path, "w", encoding="utf-8")
+        if delta_format == "patch":
+            self.handle.write("TX .\n")
+
+    def write(self, graph: str, removed: list[Triple], added: list[Triple]) -> None:
+        if self.delta_format == "patch":
+            lines = [f"D {s} {p} {o} {graph} .\n" for s, p, o in removed]
+            lines.extend(f"A {s} {p} {o} {graph} .\n" for s, p, o in added)
+            self.handle.write("".join(lines))
+            return
+        if removed:
+            body = "\n".join(f"    {s} {p} {o} ." for s, p, o in removed)
+            self.handle.write(f"DELETE DATA {{\n  GRAPH {graph} {{\n{body}\n  }}\n}} ;\n")
+        if added:
+            body = "\n".join(f"    {s} {p} {o} ." for s, p, o in added)
+            self.handle.write(f"INSERT DATA {{\n  GRAPH {graph} {{\n{body}\n  }}\n}} ;\n")
+
+    def close(self) -> None:
+        if self.delta_format == "patch":
+            self.handle.write("TC .\n")
+        self.handle.close()
+
+
+def generate_abox_delta(
+    tables: list,
+    mapping: list,
+    base_iri: str,
+    output_dir: str,
+    state_path: str | Path,
+    properties: Optional[list] = None,
+    language: Optional[str] = None,
+    delta_format: str = "patch",
+    sink=None,
+    batch_rows: int = 2000,
+    subjects: Optional[list] = None,
+    dataset: str = "default",
+) -> dict:
+    """增量生成 ABox：与上次的行状态比较，只输出新增/删除的三元组（写入增量文件，可同时应用到三元组库）。
+
+    只处理本次请求中出现的表；行主语相同即视为同一行，因此主语必须唯一（键列重复时报错并回滚）。
+    状态按 dataset 隔离；三元组库的变化在所有表检查通过后才应用，出错时库与状态都保持原样。
+    """
+    fmt = (delta_format or "patch").strip().lower()
+    if fmt not in DELTA_FORMATS:
+        raise ValueError(f"Unsupported ABox delta format: {delta_format}")
+    base = normalize_base(base_iri)
+    language = resolve_language(language)
+    mapping_by_table = compile_mapping(mapping, properties or [], language)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    target = Path(output_dir) / f"abox-delta-{stamp}{DELTA_FORMATS[fmt]}"
+    # 同一秒内多次生成时加序号，失败清理不会删掉前一次的增量文件。
+    sequence = 1
+    while target.exists():
+        target = Path(output_dir) / f"abox-delta-{stamp}-{sequence}{DELTA_FORMATS[fmt]}"
+        sequence += 1
+
+    # 行状态按主语对应，重复主语会让状态错乱：设置关闭检测时这里仍按 bloom 检测。
+    duplicate_check = duplicate_check_mode()
+    if duplicate_check not in DUPLICATE_CHECKS or duplicate_check == "off":
+        duplicate_check = "bloom"
+
+    stats = DeltaStats()
+    state = AboxState(state_path, dataset)
+    writer = DeltaWriter(target, fmt)
+    buffer = SinkBuffer(Path(output_dir)) if sink is not None else None
+    started = time.perf_counter()
+    try:
+        with timed("abox.delta"):
+            duplicates: dict[str, int] = {}
+            for table_name, table_mapping, subject_rows in iter_table_rows(
+                tables, mapping_by_table, base, subject_specs(subjects), duplicates, duplicate_check
+            ):
+                graph = graph_iri(base, table_name)
+                signature = _mapping_signature(base, language, table_mapping)
+                hash_fields = _hash_fields(table_mapping)
+                previous = state.hashes(table_name)
+                pending: list[tuple[str, bytes, list[Triple]]] = []
+                for subject, row in subject_rows:
+                    digest = _row_hash(signature, row, hash_fields)
+                    old_digest = previous.pop(subject, None)
+                    if old_digest == digest:
+                        stats.rows_unchanged += 1
+                        continue
+                    pending.append((subject, digest, row_triples(subject, row, table_mapping)))
+                    if old_digest is None:
+                        stats.rows_added += 1
+                    else:
+                        stats.rows_changed += 1
+                    if len(pending) >= batch_rows:
+                        _flush(state, writer, buffer, table_name, graph, pending, stats)
+                        pending = []
+                _flush(state, writer, buffer, table_name, graph, pending, stats)
+                # 本次没有出现的旧行整行删除。
+                removed_subjects = list(previous)
+                stats.rows_removed += len(removed_subjects)
+                for start in range(0, len(removed_subjects), batch_rows):
+                    chunk = removed_subjects[start : start + batch_rows]
+                    removed = [triple for triples in state.triples(table_name, chunk).values() for triple in triples]
+                    _emit(writer, buffer, graph, removed, [], stats)
+                    state.stage(table_name, [], chunk)
+                if duplicates:
+                    raise ValueError(f"Incremental ABox requires unique subjects; duplicates in table {table_name}")
+        writer.close()
+        if sink is not None:
+            buffer.apply(sink)
+            sink.close()
+    except BaseException:
+        writer.handle.close()
+        target.unlink(missing_ok=True)
+        state.rollback()
+        state.close()
+        if sink is not None:
+            try:
+                sink.close()
+            except Exception:
+                logger.exception("增量生成失败后关闭三元组库出错")
+        raise
+    finally:
+        if buffer is not None:
+            buffer.discard()
+    state.commit()
+    state.close()
+
+    size = target.stat().st_size
+    BYTES_OUT.inc(size, target="abox_delta")
+    ITEMS.inc(stats.triples_added + stats.triples_removed, kind="abox_delta_triples")
+    result = {
+        "format": fmt,
+        "content": None,
+        "file_path": str(target),
+        "bytes": size,
+        "elapsed": round(time.perf_counter() - started, 3),
+        **asdict(stats),
+    }
+    if sink is not None:
+        result["store"] = sink.kind
+        result["store_path"] = str(sink.path)
+    return result
+
+
+def _flush(
+    state: AboxState,
+    writer: DeltaWriter,
+    buffer: Optional[SinkBuffer],
+    table_name: str,
+    graph: str,
+    pending,
+    stats: DeltaStats,
+) -> None:
+    if not pending:
+        return
+    old_triples = state.triples(table_name, [subject for subject, _, _ in pending])
+    removed: list[Triple] = []
+    added: list[Triple] = []
+    for subject, _, triples in pending:
+        old = old_triples.get(subject, [])
+        # 行内按三元组求差，只输出真正变化的部分。
+        old_set = set(old)
+        new_set = set(triples)
+        removed.extend(triple for triple in old if triple not in new_set)
+        added.extend(triple for triple in triples if triple not in old_set)
+    _emit(writer, buffer, graph, removed, added, stats)
+    state.stage(table_name, pending, [])
+
+
+def _emit(
+    writer: DeltaWriter,
+    buffer: Optional[SinkBuffer],
+    graph: str,
+    removed: list[Triple],
+    added: list[Triple],
+    stats: DeltaStats,
+) -> None:
+    writer.write(graph, removed, added)
+    if buffer is not None and (removed or added):
+        buffer.write(graph, removed, added)
+    stats.triples_removed += len(removed)
+    stats.triples_added += len(added)
+
+
+def _mapping_signature(base: str, language: Optional[str], table_mapping: list[CompiledMapping]) -> bytes:
+    # 映射、数据类型、base IRI 或语言变化时所有行的哈希随之变化，相当于全量重算。
+    parts = [base, language or ""]
+    parts.extend(f"{item.field}\t{item.predicate}\t{item.datatype or ''}" for item in table_mapping)
+    return "\n".join(parts).encode("utf-8")
+
+
+def _hash_fields(table_mapping: list[CompiledMapping]) -> list[tuple[str, bool]]:
+    """(字段, 是否按取值的 Python 类型编码)：带 XSD/langString range 的字段按文本转换，CSV 引擎推断出的列类型
+    变化不改变字面量，只哈希文本；没有 range 的字段按类型生成数据类型，类型名也计入哈希。"""
+    return [
+        (item.field, not item.datatype or not (item.datatype.startswith(XSD) or item.datatype == RDF_LANG_STRING))
+        for item in table_mapping
+    ]
+
+
+def _row_hash(signature: bytes, row: dict, hash_fields: list[tuple[str, bool]]) -> bytes:
+    digest = hashlib.blake2b(signature, digest_size=16)
+    parts = []
+    for field, typed in hash_fields:
+        value = row.get(field)
+        if value is None:
+            parts.append("\x00")
+        elif typed:
+            parts.append(f"{type(value).__name__}:{value}")
+        else:
+            parts.append(str(value))
+    digest.update("\x1f".join(parts).encode("utf-8"))
+    return digest.digest()
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import json
+import logging
+import re
+import shutil
+import tempfile
+import zlib
+
+from app.services.literals import escape_iri
+from app.services.rdf_output import Triple
+from app.services.relations import is_key_column, table_sketches
+from app.services.subjects import SubjectSpec, SubjectFactory, compile_subject, key_text
+from app.utils.config import get_float_setting, get_int_setting
+from app.utils.metrics import ITEMS, timed
+
+logger = logging.getLogger(__name__)
+
+# 推断连接列时优先考虑的列名后缀（外键常见命名）。
+KEY_SUFFIXES = ("id", "_id", "code", "_code", "no", "编号", "代码")
+# 文本形式的整数值小数（"1.0"、"-3.00"）；连接时与整数 1、-3 视为同一键。
+_INTEGRAL_DECIMAL = re.compile(r"^(-?\d+)\.0+$")
+
+
+@dataclass(frozen=True)
+class LinkSpec:
+    """对象属性连接：source_table.source_field = target_table.target_field 时生成 <源主语> <property> <目标主语>。"""
+
+    property_iri: str
+    source_table: str
+    source_field: str
+    target_table: str
+    target_field: str
+
+
+def link_specs(items: Optional[list]) -> list[LinkSpec]:
+    specs = []
+    for item in items or []:
+        if isinstance(item, LinkSpec):
+            specs.append(item)
+            continue
+        get = item.get if isinstance(item, dict) else (lambda key, default=None: getattr(item, key, default))
+        values = [get(key) for key in ("property_iri", "source_table", "source_field", "target_table", "target_field")]
+        if all(values):
+            specs.append(LinkSpec(*values))
+    return list(dict.fromkeys(specs))
+
+
+def infer_links(
+    tables: list,
+    mapping: list,
+    properties: list,
+    object_properties: list,
+    relations: list[dict],
+    subjects: Optional[dict[str, SubjectSpec]] = None,
+) -> list[LinkSpec]:
+    """由映射推断表对应的类（已映射属性最常见的 rdfs:domain），再按对象属性的 domain/range 与表间关系生成连接。
+
+    relations 为 {"left_table", "right_table", "shared_fields"} 或带 "left_field"/"right_field" 的列对。
+    只有能唯一确定目标行的列才用作连接：发现的外键列对、目标表的主语键列或取值唯一的列；
+    只是同名（如 status）的字段会产生笛卡尔积式的错误连接，直接丢弃。
+    """
+    subjects = subjects or {}
+    domains = {_get(prop, "iri"): [_get(item, "iri") for item in _get(prop, "domains") or []] for prop in properties}
+    votes: dict[str, Counter] = {}
+    for item in mapping:
+        table_name = _get(item, "table_name")
+        for domain in domains.get(_get(item, "property_iri"), []):
+            if table_name and domain:
+                votes.setdefault(table_name, Counter())[domain] += 1
+    table_class = {table: counter.most_common(1)[0][0] for table, counter in votes.items()}
+    if not table_class:
+        return []
+
+    # (源表, 目标表) -> [(源列, 目标列, 是否为发现的外键列对)]
+    pairs: dict[tuple[str, str], list[tuple[str, str, bool]]] = {}
+    for relation in relations:
+        left, right = relation.get("left_table"), relation.get("right_table")
+        if relation.get("left_field") and relation.get("right_field"):
+            columns = [(relation["left_field"], relation["right_field"], True)]
+        else:
+            columns = [(name, name, False) for name in relation.get("shared_fields") or []]
+        pairs.setdefault((left, right), []).extend(columns)
+        pairs.setdefault((right, left), []).extend((b, a, explicit) for a, b, explicit in columns)
+
+    tables_by_name = {_get(table, "name"): table for table in tables}
+    uniqueness = get_float_setting("RELATION_KEY_UNIQUENESS", 0.95)
+    unique_columns: dict[str, set[str]] = {}
+
+    def unique_fields(table_name: str) -> set[str]:
+        if table_name not in unique_columns:
+            table = tables_by_name.get(table_name)
+            sketches = table_sketches(table) if table is not None else {}
+            unique_columns[table_name] = {
+                field for field, sketch in sketches.items() if is_key_column(sketch, uniqueness)
+            }
+        return unique_columns[table_name]
+
+    specs: list[LinkSpec] = []
+    for prop in object_properties:
+        iri = _get(prop, "iri")
+        prop_domains = {_get(item, "iri") for item in _get(prop, "domains") or []}
+        prop_ranges = {_get(item, "iri") for item in _get(prop, "ranges") or []}
+        for source, source_class in table_class.items():
+            if source_class not in prop_domains:
+                continue
+            for target, target_class in table_class.items():
+                if target == source or target_class not in prop_ranges:
+                    continue
+                columns = pairs.get((source, target))
+                if not columns:
+                    continue
+                picked = _pick_join_columns(columns, subjects.get(target), unique_fields(target))
+                if picked is None:
+                    logger.info("表 %s -> %s 没有可唯一确定目标行的连接列，跳过对象属性 %s", source, target, iri)
+                    continue
+                source_field, target_field = picked
+                specs.append(LinkSpec(iri, source, source_field, target, target_field))
+    if specs:
+        logger.info("推断对象属性连接 %d 个", len(specs))
+    return list(dict.fromkeys(specs))
+
+
+def _pick_join_columns(
+    columns: list[tuple[str, str, bool]],
+    target_spec: Optional[SubjectSpec],
+    unique_fields: set[str],
+) -> Optional[tuple[str, str]]:
+    """在候选列对中选连接列：外键列对优先，其次目标表主语键列，再次目标表取值唯一的列；都不满足时返回 None。"""
+    keys = set(target_spec.keys) if target_spec is not None else set()
+
+    def rank(pair: tuple[str, str, bool]) -> tuple[int, int]:
+        _, target_field, explicit = pair
+        if explicit:
+            level = 0
+        elif target_field in keys:
+            level = 1
+        elif target_field in unique_fields:
+            level = 2
+        else:
+            level = 3
+        return (level, 0 if str(target_field).lower().endswith(KEY_SUFFIXES) else 1)
+
+    ranked = sorted(columns, key=rank)
+    if not ranked or rank(ranked[0])[0] == 3:
+        return None
+    source_field, target_field, _ = ranked[0]
+    return source_field, target_field
+
+
+def iter_link_triples(
+    tables: list,
+    links: list[LinkSpec],
+    base: str,
+    subjects: Optional[dict[str, SubjectSpec]] = None,
+    memory_rows: Optional[int] = None,
+    batch_size: int = 10000,
+) -> Iterator[tuple[str, list[Triple]]]:
+    """按连接规则做哈希连接，逐批产出 (源表名, 对象属性三元组)。"""
+    if not links:
+        return
+    subjects = subjects or {}
+    rows_by_table = {_get(table, "name"): _get(table, "rows") or [] for table in tables}
+    if memory_rows is None:
+        memory_rows = get_int_setting("ABOX_JOIN_MEMORY_ROWS", 1_000_000)
+    partitions = max(2, get_int_setting("ABOX_JOIN_PARTITIONS", 16))
+    for link in links:
+        if link.source_table not in rows_by_table or link.target_table not in rows_by_table:
+            logger.warning("连接 %s 引用的表不存在，跳过", link)
+            continue
+        source = _keyed_subjects(link.source_table, rows_by_table[link.source_table], link.source_field, base, subjects)
+        target = _keyed_subjects(link.target_table, rows_by_table[link.target_table], link.target_field, base, subjects)
+        predicate = f"<{escape_iri(link.property_iri)}>"
+        # 在较小的一侧建哈希索引；结果方向始终是 源主语 -> 目标主语。
+        source_rows = len(rows_by_table[link.source_table])
+        target_rows = len(rows_by_table[link.target_table])
+        build_is_source = source_rows <= target_rows
+        build, probe = (source, target) if build_is_source else (target, source)
+        batch: list[Triple] = []
+        count = 0
+        with timed("abox.link"):
+            for build_subject, probe_subject in hash_join(build, probe, min(source_rows, target_rows), memory_rows, partitions):
+                source_subject, target_subject = (
+                    (build_subject, probe_subject) if build_is_source else (probe_subject, build_subject)
+                )
+                batch.append((source_subject, predicate, target_subject))
+                if len(batch) >= batch_size:
+                    # 键列重复的行会连出相同的链接，批内去重。
+                    batch = list(dict.fromkeys(batch))
+                    count += len(batch)
+                    yield link.source_table, batch
+                    batch = []
+            if batch:
+                batch = list(dict.fromkeys(batch))
+                count += len(batch)
+                yield link.source_table, batch
+        ITEMS.inc(count, kind="abox_links")
+
+
+def _keyed_subjects(
+    table_name: str,
+    rows: list,
+    field: str,
+    base: str,
+    subjects: dict[str, SubjectSpec],
+) -> Iterator[tuple[str, str]]:
+    subject_of: SubjectFactory = compile_subject(table_name, base, subjects.get(table_name))
+    for index, row in enumerate(rows, start=1):
+        value = row.get(field)
+        if value is None or value == "":
+            continue
+        subject = subject_of(index, row)
+        if subject is None:
+            continue
+        yield join_key(value), subject
+
+
+def join_key(value) -> str:
+    """连接键按规范文本比较：不同来源的同一键可能是整数、整数值的浮点数或文本（1、1.0、"1.0"），-0 与 0 相同；
+    前导零（"007"）保留，编码类键不会与数值混同。"""
+    text = key_text(value)
+    matched = _INTEGRAL_DECIMAL.match(text)
+    if matched:
+        text = matched.group(1)
+    return "0" if text == "-0" else text
+
+
+def hash_join(
+    build: Iterable[tuple[str, str]],
+    probe: Iterable[tuple[str, str]],
+    build_rows: int,
+    memory_rows: int,
+    partitions: int = 16,
+) -> Iterator[tuple[str, str]]:
+    """等值哈希连接，产出 (build 侧值, probe 侧值)。
+
+    build 侧行数超过 memory_rows 时改为 Grace 哈希连接：两侧按键哈希分区写入临时目录，再逐个分区在内存中连接；
+    仍超过上限的分区取哈希值的下一组位再分区。同一个键的行数超过上限时无法再拆分，该分区整体载入内存。
+    """
+    if build_rows <= memory_rows:
+        yield from _join_in_memory(build, probe)
+        return
+    spill_dir = Path(tempfile.mkdtemp(prefix="r2rml-join-"))
+    logger.info("连接构建侧 %d 行超过内存上限 %d，分 %d 个分区落盘", build_rows, memory_rows, partitions)
+    try:
+        yield from _grace_join(build, probe, build_rows, memory_rows, partitions, spill_dir, 0, "p")
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def _grace_join(
+    build: Iterable[tuple[str, str]],
+    probe: Iterable[tuple[str, str]],
+    build_rows: int,
+    memory_rows: int,
+    partitions: int,
+    spill_dir: Path,
+    level: int,
+    prefix: str,
+) -> Iterator[tuple[str, str]]:
+    build_parts = _partition(build, spill_dir, f"{prefix}-build", partitions, level)
+    probe_parts = _partition(probe, spill_dir, f"{prefix}-probe", partitions, level)
+    # 第 level 层用 crc32 的第 level 个 partitions 进制位分区；位用完后不再拆分。
+    can_split = partitions ** (level + 2) <= 1 << 32
+    for index, ((build_path, rows), (probe_path, _)) in enumerate(zip(build_parts, probe_parts)):
+        if rows > memory_rows and rows < build_rows and can_split:
+            logger.info("连接分区 %s-%d 有 %d 行，继续分区", prefix, index, rows)
+            yield from _grace_join(
+                _read_partition(build_path),
+                _read_partition(probe_path),
+                rows,
+                memory_rows,
+                partitions,
+                spill_dir,
+                level + 1,
+                f"{prefix}-{index}",
+            )
+        else:
+            if rows > memory_rows:
+                logger.warning("连接分区 %s-%d 有 %d 行且无法再拆分（同一键的行过多），整体载入内存", prefix, index, rows)
+            yield from _join_in_memory(_read_partition(build_path), _read_partition(probe_path))
+        build_path.unlink(missing_ok=True)
+        probe_path.unlink(missing_ok=True)
+
+
+def _join_in_memory(build: Iterable[tuple[str, str]], probe: Iterable[tuple[str, str]]) -> Iterator[tuple[str, str]]:
+    index: dict[str, object] = {}
+    for key, value in build:
+        existing = index.get(key)
+        if existing is None:
+            index[key] = value
+        elif isinstance(existing, list):
+            existing.append(value)
+        else:
+            index[key] = [existing, value]
+    for key, value in probe:
+        matched = index.get(key)
+        if matched is None:
+            continue
+        if isinstance(matched, list):
+            for item in matched:
+                yield item, value
+        else:
+            yield matched, value
+
+
+def _partition(
+    rows: Iterable[tuple[str, str]], spill_dir: Path, prefix: str, partitions: int, level: int = 0
+) -> list[tuple[Path, int]]:
+    """按键分区写入 JSONL，返回各分区的 (路径, 行数)。"""
+    paths = [spill_dir / f"{prefix}-{index}.jsonl" for index in range(partitions)]
+    counts = [0] * partitions
+    divisor = partitions**level
+    handles = [open(path, "w", encoding="utf-8") for path in paths]
+    try:
+        for key, value in rows:
+            # crc32 在进程间稳定（内置 hash 对字符串加盐），保证两侧同键落在同一分区。
+            index = zlib.crc32(key.encode("utf-8")) // divisor % partitions
+            handles[index].write(json.dumps([key, value], ensure_ascii=False) + "\n")
+            counts[index] += 1
+    finally:
+        for handle in handles:
+            handle.close()
+    return list(zip(paths, counts))
+
+
+def _read_partition(path: Path) -> Iterator[tuple[str, str]]:
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            key, value = json.loads(line)
+            yield key, value
+
+
+def _get(item, key: str, default=None):
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
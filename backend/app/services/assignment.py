@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import heapq
+
+INF = float("inf")
+
+
+@dataclass
+class AssignmentEdge:
+    row: int
+    col: int
+    score: float
+
+
+class _FlowGraph:
+    def __init__(self, node_count: int) -> None:
+        self.adjacency: list[list[int]] = [[] for _ in range(node_count)]
+        self.to: list[int] = []
+        self.cap: list[int] = []
+        self.cost: list[float] = []
+
+    def add_edge(self, source: int, target: int, cap: int, cost: float) -> int:
+        index = len(self.to)
+        self.adjacency[source].append(index)
+        self.to.append(target)
+        self.cap.append(cap)
+        self.cost.append(cost)
+        self.adjacency[target].append(index + 1)
+        self.to.append(source)
+        self.cap.append(0)
+        self.cost.append(-cost)
+        return index
+
+
+def solve_assignment(
+    row_count: int,
+    col_count: int,
+    edges: list[AssignmentEdge],
+    capacities: list[int] | int = 1,
+) -> dict[int, int]:
+    """在稀疏得分矩阵上求总分最大的行到列分配，每行至多一列、每列至多 capacity 行。
+
+    采用逐行增广的最小费用流（带势能的 Dijkstra，到达汇点即提前终止），
+    费用为 1 - score，每行另有一条费用为 1 的“未分配”边，因此结果对分数求和最优。
+    """
+    if isinstance(capacities, int):
+        capacities = [capacities] * col_count
+
+    col_offset = row_count
+    sink = row_count + col_count
+    graph = _FlowGraph(row_count + col_count + 1)
+
+    row_edges: list[list[int]] = [[] for _ in range(row_count)]
+    for edge in edges:
+        if edge.score <= 0:
+            continue
+        index = graph.add_edge(edge.row, col_offset + edge.col, 1, 1.0 - edge.score)
+        row_edges[edge.row].append(index)
+    for col in range(col_count):
+        if capacities[col] > 0:
+            graph.add_edge(col_offset + col, sink, capacities[col], 0.0)
+    for row in range(row_count):
+        graph.add_edge(row, sink, 1, 1.0)
+
+    # 势能 = stored[v] + offset；offset 统一累加，避免每轮遍历全部节点。
+    stored = [0.0] * (row_count + col_count + 1)
+    offset = 0.0
+
+    for row in range(row_count):
+        potential_row = -INF
+        for index in graph.adjacency[row]:
+            if graph.cap[index] > 0:
+                target = graph.to[index]
+                potential_row = max(potential_row, stored[target] + offset - graph.cost[index])
+        stored[row] = potential_row - offset
+
+        dist: dict[int, float] = {row: 0.0}
+        parent: dict[int, int] = {}
+        done: set[int] = set()
+        heap = [(0.0, row)]
+        while heap:
+            current, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            if node == sink:
+                break
+            base = stored[node] + current
+            for index in graph.adjacency[node]:
+                if graph.cap[index] <= 0:
+                    continue
+                target = graph.to[index]
+                if target in done:
+                    continue
+                candidate = max(current, graph.cost[index] + base - stored[target])
+                if candidate < dist.get(target, INF):
+                    dist[target] = candidate
+                    parent[target] = index
+                    heapq.heappush(heap, (candidate, target))
+
+        if sink not in done:
+            continue
+        sink_dist = dist[sink]
+        for node in done:
+            stored[node] += dist[node] - sink_dist
+        offset += sink_dist
+
+        node = sink
+        while node != row:
+            index = parent[node]
+            graph.cap[index] -= 1
+            graph.cap[index ^ 1] += 1
+            node = graph.to[index ^ 1]
+
+    assignment: dict[int, int] = {}
+    for row in range(row_count):
+        for index in row_edges[row]:
+            if graph.cap[index] == 0:
+                assignment[row] = graph.to[index] - col_offset
+                break
+    return assignment
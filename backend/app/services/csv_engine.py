@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from io import BytesIO, TextIOWrapper
+from pathlib import Path
+import codecs
+import csv
+import logging
+import re
+
+from app.utils.config import get_setting
+
+logger = logging.getLogger(__name__)
+
+CSV_ENCODINGS = ("utf-8-sig", "utf-8", "gbk")
+SAMPLE_BYTES = 1024 * 1024
+SNIFF_CHARS = 64 * 1024
+SNIFF_DELIMITERS = ",;\t|"
+CSV_ENGINES = ("pyarrow", "polars", "stdlib")
+
+# 只做无损的类型转换：整数不带前导零/正号（"007"、"-0" 转换后写不回原文）且在 int64 范围内，
+# 小数要求 repr 往返一致，否则整列保持字符串。
+INT_PATTERN = r"^(?:0|-?[1-9][0-9]{0,17})$"
+DECIMAL_PATTERN = r"^-?(?:0|[1-9][0-9]*)\.[0-9]*[1-9]$"
+NUMBER_PATTERN = r"^-?(?:0|[1-9][0-9]*)(?:\.[0-9]*[1-9])?$"
+_INT_RE = re.compile(INT_PATTERN)
+_DECIMAL_RE = re.compile(DECIMAL_PATTERN)
+
+
+@dataclass
+class CsvColumns:
+    """按列存放的解析结果；types 取值 integer / decimal / string。"""
+
+    fields: list[str]
+    columns: list[list]
+    types: list[str]
+    row_count: int
+
+    def by_field(self) -> dict[str, list]:
+        # 重复列名时与 to_rows 一致，后出现的列覆盖先出现的列。
+        return dict(zip(self.fields, self.columns))
+
+    def to_rows(self) -> list[dict]:
+        # 与 csv.DictReader 一致：重复列名时后出现的列覆盖先出现的列。
+        fields = self.fields
+        return [dict(zip(fields, values)) for values in zip(*self.columns)] if self.columns else []
+
+
+@dataclass
+class CsvDialect:
+    encoding: str
+    delimiter: str = ","
+    quotechar: str = '"'
+    header: list[str] | None = None
+
+
+def read_csv_columns(content: bytes | Path, engine: str | None = None) -> CsvColumns:
+    """读取 CSV 为按列的类型化结果；engine 为 None 时取 DATA_CSV_ENGINE（auto 依次尝试 pyarrow、polars、stdlib）。"""
+    sample = _read_sample(content)
+    encodings = _candidate_encodings(sample)
+    dialect = _sniff(sample, encodings[0] if encodings else "utf-8")
+    for name in _engine_order(engine):
+        if name == "stdlib":
+            break
+        if not encodings or (name == "polars" and not dialect.encoding.startswith("utf-8")):
+            continue
+        reader = _FAST_ENGINES[name]
+        try:
+            return reader(content, dialect)
+        except ImportError:
+            continue
+        except Exception as exc:
+            # 快速引擎对不规则行（列数不一致等）更严格，交给标准库按 DictReader 语义处理。
+            logger.debug("CSV 引擎 %s 解析失败，回退标准库：%s", name, exc)
+            break
+    return _read_stdlib(content, encodings, dialect)
+
+
+def _engine_order(engine: str | None) -> list[str]:
+    name = (engine or get_setting("DATA_CSV_ENGINE", "auto") or "auto").strip().lower()
+    if name in CSV_ENGINES:
+        return [name] if name == "stdlib" else [name, "stdlib"]
+    return list(CSV_ENGINES)
+
+
+def _read_sample(content) -> bytes:
+    if isinstance(content, (str, Path)):
+        with open(content, "rb") as handle:
+            return handle.read(SAMPLE_BYTES)
+    return bytes(content[:SAMPLE_BYTES])
+
+
+def _open_binary(content):
+    if isinstance(content, (str, Path)):
+        return open(content, "rb")
+    return BytesIO(content)
+
+
+def _candidate_encodings(sample: bytes) -> list[str]:
+    candidates = []
+    for encoding in CSV_ENCODINGS:
+        try:
+            # final=False：抽样末尾被截断的多字节字符不算解码失败。
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        candidates.append(encoding)
+    return candidates
+
+
+def _sniff(sample: bytes, encoding: str) -> CsvDialect:
+    text = codecs.getincrementaldecoder(encoding)(errors="ignore").decode(sample[: SNIFF_CHARS * 4], final=False)
+    text = text[:SNIFF_CHARS]
+    dialect = CsvDialect(encoding=encoding)
+    # 只用完整的行嗅探，避免被截断的末行干扰判断。
+    head = text.rsplit("\n", 1)[0] if "\n" in text else text
+    try:
+        sniffed = csv.Sniffer().sniff(head, delimiters=SNIFF_DELIMITERS)
+    except csv.Error:
+        sniffed = None
+    header = _split_header(head, ",", '"')
+    if sniffed is not None:
+        candidate = _split_header(head, sniffed.delimiter, sniffed.quotechar or '"')
+        # 只有嗅探出的分隔符能切出更多表头列时才采用，避免字段内容里的分号等误判。
+        if len(candidate) > len(header):
+            dialect.delimiter = sniffed.delimiter
+            dialect.quotechar = sniffed.quotechar or '"'
+            header = candidate
+    dialect.header = header
+    return dialect
+
+
+def _split_header(text: str, delimiter: str, quotechar: str) -> list[str]:
+    return next(csv.reader(text.splitlines(), delimiter=delimiter, quotechar=quotechar), None) or []
+
+
+def _type_column(values: list) -> tuple[list, str]:
+    kind = None
+    for value in values:
+        if value == "" or value is None:
+            continue
+        if _INT_RE.match(value):
+            kind = kind or "integer"
+        elif _DECIMAL_RE.match(value) and repr(float(value)) == value:
+            kind = "decimal"
+        else:
+            return values, "string"
+    if kind is None:
+        return values, "string"
+    if kind == "integer":
+        return [int(value) if value else None for value in values], kind
+    return [(int(value) if _INT_RE.match(value) else float(value)) if value else None for value in values], kind
+
+
+def _read_stdlib(content, encodings: list[str], dialect: CsvDialect) -> CsvColumns:
+    with _open_binary(content) as raw:
+        for encoding in encodings:
+            raw.seek(0)
+            try:
+                return _read_stdlib_stream(raw, encoding, "strict", dialect)
+            except UnicodeDecodeError:
+                continue
+        raw.seek(0)
+        return _read_stdlib_stream(raw, "utf-8", "ignore", dialect)
+
+
+def _read_stdlib_stream(raw, encoding: str, errors: str, dialect: CsvDialect) -> CsvColumns:
+    # 边读边解码，不再先把整个文件解码成一个大字符串。
+    stream = TextIOWrapper(raw, encoding=encoding, errors=errors, newline="")
+    try:
+        reader = csv.reader(stream, delimiter=dialect.delimiter, quotechar=dialect.quotechar)
+        header = next(reader, None)
+        if not header:
+            return CsvColumns([], [], [], 0)
+        width = len(header)
+        columns: list[list] = [[] for _ in range(width)]
+        appenders = [column.append for column in columns]
+        row_count = 0
+        for row in reader:
+            if not row:
+                continue
+            # 与 DictReader 一致：缺失的列补 None，多出的列丢弃。
+            if len(row) < width:
+                row = row + [None] * (width - len(row))
+            for append, value in zip(appenders, row):
+                append(value)
+            row_count += 1
+    finally:
+        stream.detach()
+    return _finish(header, columns, row_count)
+
+
+def _finish(header: list[str], columns: list[list], row_count: int) -> CsvColumns:
+    typed_columns = []
+    types = []
+    for column in columns:
+        values, kind = _type_column(column)
+        typed_columns.append(values)
+        types.append(kind)
+    return CsvColumns(list(header), typed_columns, types, row_count)
+
+
+def _read_pyarrow(content, dialect: CsvDialect) -> CsvColumns:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+
+    header = dialect.header or []
+    if not header or len(set(header)) != len(header):
+        raise ValueError("header missing or contains duplicate names")
+    table = pacsv.read_csv(
+        str(content) if isinstance(content, (str, Path)) else pa.py_buffer(content),
+        # Arrow 自行跳过 UTF-8 BOM；其他编码由 Arrow 调用 Python 编解码器转码。
+        read_options=pacsv.ReadOptions(encoding="utf8" if dialect.encoding.startswith("utf-8") else dialect.encoding),
+        parse_options=pacsv.ParseOptions(
+            delimiter=dialect.delimiter,
+            quote_char=dialect.quotechar,
+            newlines_in_values=True,
+        ),
+        # 全部按字符串读取，再按无损规则做列类型转换，避免 "00123" 这类编码被推断成整数。
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    columns = []
+    types = []
+    for column in table.columns:
+        present = pc.filter(column, pc.not_equal(column, ""))
+        # 先用向量化正则筛掉明显的字符串列，只有疑似数值列才回到 Python 逐值校验。
+        if not len(present) or not pc.all(pc.match_substring_regex(present, NUMBER_PATTERN)).as_py():
+            values, kind = column.to_pylist(), "string"
+        elif pc.all(pc.match_substring_regex(present, INT_PATTERN)).as_py():
+            values, kind = pc.cast(pc.if_else(pc.equal(column, ""), None, column), pa.int64()).to_pylist(), "integer"
+        else:
+            values, kind = _type_column(column.to_pylist())
+        columns.append(values)
+        types.append(kind)
+    return CsvColumns(list(table.column_names), columns, types, table.num_rows)
+
+
+def _read_polars(content, dialect: CsvDialect) -> CsvColumns:
+    import polars as pl
+
+    header = dialect.header or []
+    if not header or len(set(header)) != len(header):
+        raise ValueError("header missing or contains duplicate names")
+    frame = pl.read_csv(
+        content if isinstance(content, (str, Path)) else bytes(content),
+        separator=dialect.delimiter,
+        quote_char=dialect.quotechar,
+        infer_schema_length=0,
+        raise_if_empty=False,
+    )
+    # Polars 不跳过空行（读成全 null 的行），按 csv 模块的行为去掉。
+    frame = frame.filter(~pl.all_horizontal(pl.all().is_null()))
+    columns = []
+    types = []
+    for name in frame.columns:
+        # Polars 把空字段读成 null，这里还原为与标准库一致的空字符串。
+        series = frame.get_column(name).fill_null("")
+        present = series.filter(series != "")
+        if not present.len() or not present.str.contains(NUMBER_PATTERN).all():
+            values, kind = series.to_list(), "string"
+        elif present.str.contains(INT_PATTERN).all():
+            values, kind = series.replace("", None).cast(pl.Int64).to_list(), "integer"
+        else:
+            values, kind = _type_column(series.to_list())
+        columns.append(values)
+        types.append(kind)
+    return CsvColumns(list(frame.columns), columns, types, frame.height)
+
+
+_FAST_ENGINES = {"pyarrow": _read_pyarrow, "polars": _read_polars}
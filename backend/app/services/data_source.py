@@ -1,33 +1,190 @@
-from io import BytesIO, StringIO
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from typing import List
 from datetime import date, datetime, timedelta
 from pathlib import Path
-import csv
+from threading import Lock
+import atexit
 import math
+import multiprocessing
+import os
 
 from openpyxl import load_workbook
 
+from app.services.csv_engine import read_csv_columns
+from app.services.relations import sketch_columns, sketch_table
+from app.utils.config import get_int_setting
+from app.utils.metrics import BYTES_IN, ITEMS, timed
 
-def parse_tabular_files(files: list[tuple[str, bytes]]) -> List[dict]:
+def parse_tabular_files(files: list[tuple[str, bytes | Path]], workers: int | None = None) -> List[dict]:
+    """files 中的内容可以是 bytes（或其他字节缓冲区），也可以是落盘文件路径；路径按流式读取。
+
+    输入总量超过 DATA_PARSE_PARALLEL_MIN_BYTES 且有多个文件或工作表时，按文件/工作表分发到进程池并行解析，
+    结果顺序与串行一致；workers 为 None 时取 DATA_PARSE_WORKERS。
+    """
     if not files:
         raise ValueError("No data files provided.")
 
+    for filename, _ in files:
+        if not filename.lower().endswith((".csv", ".xlsx", ".xls")):
+            raise ValueError(f"Unsupported file type: {filename}")
+
+    sizes = [_source_size(content) for _, content in files]
+    BYTES_IN.inc(sum(sizes), source="data")
+    if workers is None:
+        workers = _parse_workers()
+    parallel = workers > 1 and sum(sizes) >= get_int_setting("DATA_PARSE_PARALLEL_MIN_BYTES", 8 * 1024 * 1024)
+
+    if parallel:
+        units = _plan_units(files)
+        if len(units) > 1:
+            with timed("data.parse_parallel"):
+                tables = _parse_units_parallel(units, workers)
+            ITEMS.inc(sum(len(table["rows"]) for table in tables), kind="data_rows")
+            return tables
+
     tables: list[dict] = []
+    for filename, content in files:
+        try:
+            tables.extend(_parse_file(filename, content))
+        except Exception as exc:
+            raise ValueError(f"Failed to parse {filename}: {exc}") from exc
+
+    ITEMS.inc(sum(len(table["rows"]) for table in tables), kind="data_rows")
+    return tables
+
+
+def _parse_file(filename: str, content) -> list[dict]:
+    if filename.lower().endswith(".csv"):
+        with timed("data.parse_csv"):
+            parsed = read_csv_columns(content)
+            # CSV 引擎产出的值已是 str/int/float/None，无需再逐行规整；草图直接取引擎的按列结果。
+            return [
+                _build_table(
+                    _table_name_from_file(filename),
+                    parsed.to_rows(),
+                    normalize=False,
+                    columns=parsed.by_field(),
+                )
+            ]
+    with timed("data.parse_excel"):
+        return _read_excel_tables(filename, content)
+
 
+def _plan_units(files: list[tuple[str, bytes | Path]]) -> list[tuple[str, object, str | None]]:
+    """拆分并行任务：CSV 每个文件一个任务，工作簿每个工作表一个任务。"""
+    units: list[tuple[str, object, str | None]] = []
     for filename, content in files:
-        lower = filename.lower()
-        if lower.endswith(".csv"):
-            table_name = _table_name_from_file(filename)
-            rows = _read_csv_rows(content)
-            tables.append(_build_table(table_name, rows))
-        elif lower.endswith((".xlsx", ".xls")):
-            tables.extend(_read_excel_tables(filename, content))
+        if isinstance(content, (bytes, str, Path)):
+            source = content
         else:
-            raise ValueError(f"Unsupported file type: {filename}")
+            # mmap 等缓冲区无法跨进程传递，复制为 bytes。
+            source = bytes(content)
+        if filename.lower().endswith(".csv"):
+            units.append((filename, source, None))
+            continue
+        try:
+            with _open_binary(source) as stream:
+                workbook = load_workbook(stream, read_only=True)
+                try:
+                    sheet_names = [sheet.title for sheet in workbook.worksheets]
+                finally:
+                    workbook.close()
+        except Exception:
+            # 无法列出工作表时整本交给工作进程解析，由其按文件报告错误。
+            units.append((filename, source, None))
+            continue
+        units.extend((filename, source, sheet_name) for sheet_name in sheet_names)
+    return units
+
+
+def _parse_unit(filename: str, source, sheet_name: str | None) -> list[dict]:
+    if sheet_name is None:
+        return _parse_file(filename, source)
+    return _read_excel_tables(filename, source, sheet_name)
 
+
+def _parse_units_parallel(units: list[tuple[str, object, str | None]], workers: int) -> list[dict]:
+    pool = _get_parse_pool(workers)
+    futures = [pool.submit(_parse_unit, *unit) for unit in units]
+    tables: list[dict] = []
+    errors: list[str] = []
+    # 按提交顺序收集结果，保证与串行解析的表顺序一致；逐个文件汇总错误。
+    for (filename, _, sheet_name), future in zip(units, futures):
+        try:
+            tables.extend(future.result())
+        except Exception as exc:
+            label = f"{filename}::{sheet_name}" if sheet_name else filename
+            errors.append(f"{label}: {exc}")
+    if errors:
+        raise ValueError("Failed to parse " + "; ".join(errors))
     return tables
 
 
+_parse_pool: ProcessPoolExecutor | None = None
+_parse_pool_workers = 0
+_parse_pool_lock = Lock()
+
+
+def _get_parse_pool(workers: int) -> ProcessPoolExecutor:
+    global _parse_pool, _parse_pool_workers
+    with _parse_pool_lock:
+        if _parse_pool is None or _parse_pool_workers != workers:
+            if _parse_pool is not None:
+                _parse_pool.shutdown(wait=False)
+            # 服务进程内有多个线程，使用 spawn 避免 fork 继承锁状态；工作进程定期重建以回收内存。
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_parse_worker,
+                initargs=(get_int_setting("DATA_PARSE_WORKER_MEMORY_MB", 0),),
+                max_tasks_per_child=get_int_setting("DATA_PARSE_MAX_TASKS_PER_CHILD", 50) or None,
+            )
+            _parse_pool_workers = workers
+        return _parse_pool
+
+
+def _init_parse_worker(memory_limit_mb: int) -> None:
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+atexit.register(shutdown_parse_pool)
+
+
+def _parse_workers() -> int:
+    workers = get_int_setting("DATA_PARSE_WORKERS", 0)
+    if workers <= 0:
+        workers = min(4, os.cpu_count() or 1)
+    return workers
+
+
+def _source_size(content) -> int:
+    if isinstance(content, (str, Path)):
+        return os.path.getsize(content)
+    return len(content)
+
+
+def _open_binary(content):
+    if isinstance(content, (str, Path)):
+        return open(content, "rb")
+    return BytesIO(content)
+
+
 def _normalize_rows(rows: list[dict]) -> list[dict]:
     return [{key: _normalize_value(value) for key, value in row.items()} for row in rows]
 
@@ -46,56 +203,49 @@ def _normalize_value(value):
     return value
 
 
-def _read_csv_rows(content: bytes) -> list[dict]:
-    text = _decode_bytes(content)
-    stream = StringIO(text)
-    reader = csv.DictReader(stream)
-    if not reader.fieldnames:
-        return []
-    rows = []
-    for row in reader:
-        rows.append({key: row.get(key) for key in reader.fieldnames})
-    return rows
-
-
-def _decode_bytes(content: bytes) -> str:
-    for encoding in ("utf-8-sig", "utf-8", "gbk"):
-        try:
-            return content.decode(encoding)
-        except UnicodeDecodeError:
-            continue
-    return content.decode(errors="ignore")
-
-
-def _read_excel_tables(filename: str, content: bytes) -> list[dict]:
-    stream = BytesIO(content)
+def _read_excel_tables(filename: str, content, sheet_name: str | None = None) -> list[dict]:
     tables: list[dict] = []
-    workbook = load_workbook(stream, data_only=True)
-    for sheet in workbook.worksheets:
-        rows = list(sheet.iter_rows(values_only=True))
-        if not rows:
-            continue
-        headers = _normalize_headers(rows[0])
-        data_rows = rows[1:]
-        table_rows: list[dict] = []
-        for row in data_rows:
-            table_rows.append(_row_to_dict(headers, row))
-        table_name = f"{_table_name_from_file(filename)}::{sheet.title}"
-        tables.append(_build_table(table_name, table_rows))
+    # 暂存文件没有扩展名，openpyxl 会拒绝路径参数，因此统一传入文件对象。
+    with _open_binary(content) as source:
+        # 只读模式按行流式读取工作表，不在内存中构建完整的单元格对象。
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            sheets = [workbook[sheet_name]] if sheet_name is not None else workbook.worksheets
+            for sheet in sheets:
+                rows = sheet.iter_rows(values_only=True)
+                first = next(rows, None)
+                if first is None:
+                    continue
+                headers = _normalize_headers(first)
+                table_rows: list[dict] = []
+                for row in rows:
+                    table_rows.append(_row_to_dict(headers, row))
+                table_name = f"{_table_name_from_file(filename)}::{sheet.title}"
+                tables.append(_build_table(table_name, table_rows))
+        finally:
+            workbook.close()
     return tables
 
 
-def _build_table(table_name: str, rows: list[dict]) -> dict:
+def _build_table(
+    table_name: str,
+    rows: list[dict],
+    normalize: bool = True,
+    columns: dict[str, list] | None = None,
+) -> dict:
     if rows:
         fields = [str(col) for col in rows[0].keys()]
     else:
         fields = []
-    rows = _normalize_rows(rows)
+    if normalize:
+        rows = _normalize_rows(rows)
     return {
         "name": table_name,
         "fields": fields,
         "sample_rows": rows[:5],
         "rows": rows,
+        # 列取值草图供表间关系发现使用，解析时一并算好，避免匹配时再扫描全部行。
+        "sketches": sketch_columns(columns) if columns is not None and rows else sketch_table(rows, fields),
     }
 
 
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Callable
+from urllib.parse import quote
+import math
+import re
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_LANG_STRING = "http://www.w3.org/1999/02/22-rdf-syntax-ns#langString"
+
+INTEGER_TYPES = {
+    "integer",
+    "int",
+    "long",
+    "short",
+    "byte",
+    "nonNegativeInteger",
+    "positiveInteger",
+    "nonPositiveInteger",
+    "negativeInteger",
+    "unsignedLong",
+    "unsignedInt",
+    "unsignedShort",
+    "unsignedByte",
+}
+TRUE_VALUES = {"true", "1", "yes", "y", "t", "是", "真"}
+FALSE_VALUES = {"false", "0", "no", "n", "f", "否", "假"}
+
+_INTEGER_RE = re.compile(r"^[+-]?\d+$")
+_DATE_SEPARATORS = re.compile(r"[/.]")
+_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+# N-Triples/Turtle 的 IRIREF 不允许出现的字符。
+_IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+# 把单元格值编码成 N-Triples 字面量（含引号、数据类型或语言标签）；返回 None 表示跳过该值。
+LiteralEncoder = Callable[[object], "str | None"]
+
+
+def escape_string(value: str) -> str:
+    return value.translate(_ESCAPES)
+
+
+def escape_iri(iri: str) -> str:
+    """把 IRIREF 中不允许的字符（空白、尖括号、引号等）按 UTF-8 百分号编码，其余字符原样保留。"""
+    return _IRI_UNSAFE.sub(lambda match: quote(match.group(0), safe=""), iri)
+
+
+def _typed(lexical: str, datatype: str) -> str:
+    return f'"{escape_string(lexical)}"^^<{datatype}>'
+
+
+def _plain(value) -> str:
+    """无类型信息时的编码，与 rdflib 的 Literal(value) 按 Python 类型推断保持一致。"""
+    if isinstance(value, bool):
+        return _typed("true" if value else "false", XSD + "boolean")
+    if isinstance(value, int):
+        return _typed(str(value), XSD + "integer")
+    if isinstance(value, float):
+        return _typed(_double_lexical(value), XSD + "double")
+    if isinstance(value, datetime):
+        return _typed(value.isoformat(), XSD + "dateTime")
+    if isinstance(value, date):
+        return _typed(value.isoformat(), XSD + "date")
+    return f'"{escape_string(str(value))}"'
+
+
+def _double_lexical(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "INF" if value > 0 else "-INF"
+    return repr(value)
+
+
+def _to_integer(value) -> str | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else None
+    text = str(value).strip()
+    return str(int(text)) if _INTEGER_RE.match(text) else None
+
+
+def _to_decimal(value) -> str | None:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    if not number.is_finite():
+        return None
+    lexical = format(number, "f")
+    return lexical if "." in lexical else lexical + ".0"
+
+
+def _to_double(value) -> str | None:
+    if isinstance(value, bool):
+        return None
+    try:
+        return _double_lexical(float(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def _to_boolean(value) -> str | None:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return "true"
+    if text in FALSE_VALUES:
+        return "false"
+    return None
+
+
+def _parse_datetime(value) -> datetime | None:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text = str(value).strip()
+    if len(text) <= 10:
+        text = _DATE_SEPARATORS.sub("-", text)
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _to_date(value) -> str | None:
+    parsed = _parse_datetime(value)
+    if parsed is None or parsed.time() != datetime.min.time():
+        return None
+    return parsed.date().isoformat()
+
+
+def _to_datetime(value) -> str | None:
+    parsed = _parse_datetime(value)
+    return parsed.isoformat() if parsed is not None else None
+
+
+_CONVERTERS: dict[str, Callable[[object], "str | None"]] = {
+    "decimal": _to_decimal,
+    "double": _to_double,
+    "float": _to_double,
+    "boolean": _to_boolean,
+    "date": _to_date,
+    "dateTime": _to_datetime,
+}
+_CONVERTERS.update({name: _to_integer for name in INTEGER_TYPES})
+
+
+def compile_literal_encoder(range_iri: str | None, language: str | None = None) -> LiteralEncoder:
+    """按属性的 rdfs:range 预先生成编码函数；值无法转换为该类型时退回按 Python 类型编码，不丢数据。"""
+    if range_iri == RDF_LANG_STRING:
+        suffix = f"@{language}" if language else ""
+        return lambda value: f'"{escape_string(str(value))}"{suffix}'
+    if not range_iri or not range_iri.startswith(XSD):
+        return _plain
+    local = range_iri[len(XSD) :]
+    range_iri = escape_iri(range_iri)
+    if local == "string":
+        return lambda value: f'"{escape_string(str(value))}"'
+    converter = _CONVERTERS.get(local)
+    if converter is None:
+        # anyURI、gYear 等其他 XSD 类型按原样标注数据类型。
+        return lambda value: _typed(str(value), range_iri)
+
+    def encode(value) -> str | None:
+        lexical = converter(value)
+        if lexical is None:
+            return _plain(value)
+        return _typed(lexical, range_iri)
+
+    return encode
+
+
+def select_range(ranges: list[str]) -> str | None:
+    """多个 range 时优先取 XSD 数据类型或 rdf:langString。"""
+    for iri in ranges:
+        if iri.startswith(XSD) or iri == RDF_LANG_STRING:
+            return iri
+    return ranges[0] if ranges else None
@@ -1,12 +1,18 @@
 import json
 import logging
+import random
 import re
-from typing import List
+import time
+from dataclasses import asdict
+from typing import Callable, List
 
 import httpx
 
 from app.models.schemas import PropertyItem
-from app.utils.config import get_setting
+from app.services.model_router import RoutingStats, get_model_router, routing_stats
+from app.services.rate_limiter import estimate_tokens, get_provider_limiter
+from app.utils.config import get_int_setting, get_setting
+from app.utils.metrics import BYTES_IN, BYTES_OUT, ITEMS, timed
 
 logger = logging.getLogger(__name__)
 
@@ -18,35 +24,184 @@ def _extract_json(text: str):
     return json.loads(match.group(0))
 
 
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+
+class MatchStreamParser:
+    """增量解析流式返回的 JSON：数组中的对象一闭合就立即解析并返回。"""
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.position = 0
+        self.stack: list[str] = []
+        self.object_starts: list[int | None] = []
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, chunk: str) -> list[dict]:
+        self.text += chunk
+        items: list[dict] = []
+        text = self.text
+        for index in range(self.position, len(text)):
+            char = text[index]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                parent = self.stack[-1] if self.stack else None
+                self.stack.append(char)
+                if char == "{":
+                    self.object_starts.append(index if parent == "[" else None)
+            elif char in "}]" and self.stack:
+                opener = self.stack.pop()
+                if opener == "{":
+                    start = self.object_starts.pop()
+                    if start is not None:
+                        try:
+                            value = json.loads(text[start : index + 1])
+                        except json.JSONDecodeError:
+                            value = None
+                        if isinstance(value, dict) and value.get("property_iri"):
+                            items.append(value)
+        self.position = len(text)
+        return items
+
+
 def _chat_completion(
     api_key: str,
     base_url: str,
     model: str,
     messages: list[dict],
     temperature: float = 0.2,
+    on_delta: Callable[[str], None] | None = None,
 ) -> str:
     payload = {
         "model": model,
         "messages": messages,
         "temperature": temperature,
     }
-    headers = {"Authorization": f"Bearer {api_key}"}
+    if on_delta is not None:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     url = base_url.rstrip("/") + "/chat/completions"
 
-    with httpx.Client(timeout=60) as client:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    estimated = estimate_tokens(body.decode("utf-8"))
+    limiter = get_provider_limiter(base_url)
+    max_retries = get_int_setting("QWEN_MAX_RETRIES", 3)
+    streamed = False
+
+    def forward(delta: str) -> None:
+        nonlocal streamed
+        streamed = True
+        on_delta(delta)
+
+    attempt = 0
+    while True:
+        retry_after = None
         try:
-            response = client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+            with limiter.slot(estimated), httpx.Client(timeout=60) as client, timed("llm.request"):
+                BYTES_OUT.inc(len(body), target="llm_request")
+                if on_delta is None:
+                    response = client.post(url, content=body, headers=headers)
+                    BYTES_IN.inc(len(response.content), source="llm_response")
+                    response.raise_for_status()
+                    data = response.json()
+                    content = data["choices"][0]["message"]["content"]
+                    usage = data.get("usage") or {}
+                else:
+                    content, usage = _read_stream(client, url, body, headers, forward)
         except httpx.HTTPError as exc:
+            status = None
             detail = ""
             if isinstance(exc, httpx.HTTPStatusError) and exc.response is not None:
+                status = exc.response.status_code
                 detail = exc.response.text
+                retry_after = _retry_after_seconds(exc.response.headers.get("Retry-After"))
+            if status in THROTTLE_STATUS:
+                limiter.on_throttle()
+            # 流式输出已开始推送时不再重试，避免调用方收到重复条目。
+            retryable = (status is None or status in RETRYABLE_STATUS) and not streamed
+            if retryable and attempt < max_retries:
+                delay = retry_after if retry_after is not None else _backoff_seconds(attempt)
+                logger.warning(
+                    "LLM request failed (status=%s), retry %d/%d in %.2fs",
+                    status,
+                    attempt + 1,
+                    max_retries,
+                    delay,
+                )
+                attempt += 1
+                time.sleep(delay)
+                continue
             message = f"LLM request failed: {detail or str(exc)}"
             logger.error(message)
             raise RuntimeError(message) from exc
+        break
+
+    limiter.on_success()
+    limiter.record_usage(estimated, usage.get("total_tokens"))
+    ITEMS.inc(usage.get("prompt_tokens") or 0, kind="llm_prompt_tokens")
+    ITEMS.inc(usage.get("completion_tokens") or 0, kind="llm_completion_tokens")
+    return content
 
-    return data["choices"][0]["message"]["content"]
+
+def _read_stream(
+    client: httpx.Client,
+    url: str,
+    body: bytes,
+    headers: dict,
+    on_delta: Callable[[str], None],
+) -> tuple[str, dict]:
+    parts: list[str] = []
+    usage: dict = {}
+    received = 0
+    with client.stream("POST", url, content=body, headers=headers) as response:
+        if response.status_code >= 400:
+            response.read()
+            response.raise_for_status()
+        for line in response.iter_lines():
+            received += len(line) + 1
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            for choice in chunk.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+    BYTES_IN.inc(received, source="llm_response")
+    return "".join(parts), usage
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return min(30.0, 0.5 * (2**attempt)) * (0.5 + random.random() / 2)
 
 
 def _parse_model_candidates(raw: str | None, default_model: str) -> list[str]:
@@ -78,6 +233,23 @@ def select_llm_model(
     model_candidates = _parse_model_candidates(raw_candidates, default_model)
     if len(model_candidates) <= 1:
         return default_model
+    stats = routing_stats(properties, candidates, tables, relations)
+    return get_model_router().route(
+        stats,
+        model_candidates,
+        default_model,
+        ask_router=lambda: _route_with_llm(stats, model_candidates, default_model, api_key, base_url, skill_doc),
+    )
+
+
+def _route_with_llm(
+    stats: RoutingStats,
+    model_candidates: list[str],
+    default_model: str,
+    api_key: str,
+    base_url: str,
+    skill_doc: str | None,
+) -> str | None:
     router_model = get_setting("QWEN_ROUTER_MODEL", default_model)
 
     system_parts = [
@@ -92,12 +264,7 @@ def select_llm_model(
         "task": "r2rml_match",
         "default_model": default_model,
         "candidates": model_candidates,
-        "stats": {
-            "property_count": len(properties),
-            "table_count": len(tables),
-            "candidate_count": len(candidates),
-            "relation_count": len(relations),
-        },
+        "stats": asdict(stats),
     }
 
     messages = [
@@ -109,7 +276,7 @@ def select_llm_model(
         parsed = _extract_json(content)
     except Exception as exc:
         logger.warning("Model selection failed, fallback to default: %s", exc)
-        return default_model
+        return None
 
     if isinstance(parsed, dict):
         selected = parsed.get("model")
@@ -119,7 +286,7 @@ def select_llm_model(
         logger.info("Selected model by router: %s", selected)
         return selected
     logger.warning("Router returned invalid model: %s", selected)
-    return default_model
+    return None
 
 
 def llm_match_properties(
@@ -131,6 +298,7 @@ def llm_match_properties(
     base_url: str,
     model: str,
     skill_doc: str | None,
+    on_item: Callable[[dict], None] | None = None,
 ) -> List[dict]:
     system_parts = [
         "You are a reliable assistant for ontology field matching.",
@@ -201,7 +369,24 @@ def llm_match_properties(
         {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
     ]
 
-    content = _chat_completion(api_key, base_url, model, messages, temperature=0.2)
+    emitted: set[str] = set()
+    parser = MatchStreamParser()
+
+    def emit_items(delta: str) -> None:
+        for item in parser.feed(delta):
+            property_iri = item.get("property_iri")
+            if property_iri not in emitted:
+                emitted.add(property_iri)
+                on_item(item)
+
+    content = _chat_completion(
+        api_key,
+        base_url,
+        model,
+        messages,
+        temperature=0.2,
+        on_delta=emit_items if on_item is not None else None,
+    )
     try:
         parsed = _extract_json(content)
     except Exception as exc:
@@ -213,4 +398,9 @@ def llm_match_properties(
     if not isinstance(matches, list):
         raise ValueError("Invalid LLM response format")
 
+    if on_item is not None:
+        for item in matches:
+            if isinstance(item, dict) and item.get("property_iri") not in emitted:
+                emitted.add(item.get("property_iri"))
+                on_item(item)
     return matches
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+import hashlib
+import json
+
+from app.models.schemas import MatchItem, PropertyItem
+from app.utils.config import get_int_setting
+
+
+@dataclass
+class PropertyState:
+    fingerprint: str
+    item: MatchItem
+
+
+@dataclass
+class SessionState:
+    config_fingerprint: str
+    properties: dict[str, PropertyState] = field(default_factory=dict)
+
+
+class MatchStateStore:
+    """按会话保存上一次匹配结果及其依赖指纹，超出容量时淘汰最久未用的会话。"""
+
+    def __init__(self, max_sessions: int = 32) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, session_id: str) -> SessionState | None:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self, session_id: str | None = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+
+def fingerprint(value) -> str:
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def property_fingerprint(prop: PropertyItem) -> str:
+    return fingerprint(prop.model_dump())
+
+
+def column_fingerprint(table_name: str, field_name: str, samples: list) -> str:
+    return fingerprint([table_name, field_name, samples])
+
+
+_default_store: MatchStateStore | None = None
+
+
+def get_match_state_store() -> MatchStateStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = MatchStateStore(get_int_setting("MATCH_STATE_MAX_SESSIONS", 32))
+    return _default_store
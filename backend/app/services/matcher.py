@@ -1,22 +1,46 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from difflib import SequenceMatcher
-from typing import Iterable
+from functools import cached_property
+from threading import Lock
+from typing import Callable, Iterable
+import contextvars
 import logging
 import re
+import time
 
-from app.models.schemas import MatchItem, PropertyItem
+from app.models.schemas import MatchDiff, MatchItem, PropertyItem
 from app.agents.skill_registry import get_skill_registry
+from app.services.assignment import AssignmentEdge, solve_assignment
 from app.services.llm_client import llm_match_properties, select_llm_model
-from app.utils.config import get_setting
+from app.services.match_state import (
+    PropertyState,
+    SessionState,
+    column_fingerprint,
+    fingerprint,
+    get_match_state_store,
+    property_fingerprint,
+)
+from app.services.model_router import get_model_router, routing_stats
+from app.services.relations import infer_relations
+from app.utils.config import get_float_setting, get_int_setting, get_setting
 from app.utils.match_logger import append_match_logs
-from app.utils.text import normalize_text
+from app.utils.metrics import ITEMS, timed
+from app.utils.text import label_similarity
 
 logger = logging.getLogger(__name__)
 
 LLM_BATCH_SIZE = 10
 
+# 依赖表集合与表间关系的匹配模式：两者都进入 LLM 提示词。
+TABLE_CONTEXT_MODES = ("llm", "pipeline")
+
+_EMAIL = re.compile(r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+_DATE = re.compile(r"^\d{4}[-/年]\d{1,2}[-/月]\d{1,2}")
+_PHONE = re.compile(r"^\+?\d{7,}$")
+
 
 @dataclass
 class FieldCandidate:
@@ -24,6 +48,117 @@ class FieldCandidate:
     field: str
     samples: list
 
+    @cached_property
+    def sample_type(self) -> str:
+        """样例值类型只与字段有关，每个候选推断一次，不随属性重复计算。"""
+        return _infer_sample_type(self.samples)
+
+
+@dataclass
+class RankedProperty:
+    prop: PropertyItem
+    ranked: list[tuple[FieldCandidate, float]]
+
+    @property
+    def top_score(self) -> float:
+        return self.ranked[0][1] if self.ranked else 0.0
+
+    @property
+    def margin(self) -> float:
+        if len(self.ranked) < 2:
+            return self.top_score
+        return self.ranked[0][1] - self.ranked[1][1]
+
+
+@dataclass
+class PipelineMetrics:
+    properties: int = 0
+    recall_resolved: int = 0
+    rerank_escalated: int = 0
+    rerank_resolved: int = 0
+    rerank_fallback: int = 0
+    llm_calls: int = 0
+
+
+class RecallStage:
+    """召回阶段：用启发式评分为每个属性保留 top-k 候选字段。"""
+
+    name = "recall"
+
+    def __init__(self, top_k: int) -> None:
+        self.top_k = max(1, top_k)
+
+    def run(
+        self,
+        properties: list[PropertyItem],
+        candidates: list[FieldCandidate],
+        tables: list[dict],
+    ) -> list[RankedProperty]:
+        ranked_props: list[RankedProperty] = []
+        for prop in properties:
+            scoped = _select_candidates_for_property(prop, candidates, tables)
+            scored = [(candidate, _score_candidate(prop, candidate)) for candidate in scoped]
+            scored = [item for item in scored if item[1] > 0]
+            scored.sort(key=lambda item: item[1], reverse=True)
+            ranked_props.append(RankedProperty(prop=prop, ranked=scored[: self.top_k]))
+        return ranked_props
+
+
+class LlmRerankStage:
+    """精排阶段：仅将召回结果存在歧义的属性交给 LLM，候选限制为召回的 top-k。"""
+
+    name = "rerank"
+
+    def __init__(
+        self,
+        tables: list[dict],
+        relations: list[dict],
+        skill_doc: str | None,
+        batch_size: int = LLM_BATCH_SIZE,
+    ) -> None:
+        self.tables = tables
+        self.relations = relations
+        self.skill_doc = skill_doc
+        self.batch_size = batch_size
+
+    def run(self, ranked_props: list[RankedProperty], metrics: PipelineMetrics) -> dict[str, dict]:
+        if not ranked_props:
+            return {}
+        properties = [item.prop for item in ranked_props]
+        shortlist = _shortlist_candidates(ranked_props)
+        try:
+            api_key, base_url, model = _resolve_llm_model(properties, shortlist, self.tables, self.relations)
+        except Exception as exc:
+            # 未配置 Key 或模型选择失败时不让整个流程失败：歧义属性全部沿用召回第一名。
+            logger.warning("精排模型不可用，%d 个歧义属性回退召回结果：%s", len(ranked_props), exc)
+            return {}
+
+        response_map: dict[str, dict] = {}
+        for start in range(0, len(ranked_props), self.batch_size):
+            batch = ranked_props[start : start + self.batch_size]
+            batch_candidates = _shortlist_candidates(batch)
+            metrics.llm_calls += 1
+            try:
+                with timed("llm.batch"):
+                    response = llm_match_properties(
+                        [item.prop for item in batch],
+                        batch_candidates,
+                        self.tables,
+                        self.relations,
+                        api_key,
+                        base_url,
+                        model,
+                        self.skill_doc,
+                    )
+            except Exception as exc:
+                logger.warning("精排批次失败，回退召回结果：%s", exc)
+                continue
+            for item in response:
+                property_iri = item.get("property_iri")
+                if property_iri:
+                    response_map[property_iri] = item
+        return response_map
+
 
 def match_properties(
     properties: list[PropertyItem],
@@ -31,22 +166,29 @@ def match_properties(
     mode: str,
     threshold: float,
     skill_doc: str | None = None,
+    on_result: Callable[[MatchItem], None] | None = None,
+    relations: list[dict] | None = None,
 ) -> list[MatchItem]:
+    """relations 为调用方已算好的表间关系；只有 TABLE_CONTEXT_MODES 会用到，缺省时按需推断。"""
     logger.info("开始匹配：mode=%s，属性数=%d，表数=%d，阈值=%.2f", mode, len(properties), len(tables), threshold)
-    candidates = _build_candidates(tables)
-    table_summary = _build_table_summary(tables)
-    relations = _infer_relations(table_summary)
+    ITEMS.inc(len(properties), kind="match_properties")
+    with timed("match.candidate_build"):
+        candidates = _build_candidates(tables)
+        table_summary = _build_table_summary(tables)
+        if relations is None and mode in TABLE_CONTEXT_MODES:
+            relations = infer_relations(tables)
     logger.info(
         "已解析候选字段：候选数=%d，关系数=%d",
         len(candidates),
-        len(relations),
+        len(relations or []),
     )
     threshold = max(0.0, min(1.0, threshold))
 
     if mode == "llm":
         logger.info("进入 LLM 匹配流程")
         try:
-            return llm_match(properties, candidates, table_summary, relations, threshold, skill_doc)
+            with timed("match.llm"):
+                return llm_match(properties, candidates, table_summary, relations, threshold, skill_doc, on_result)
         except Exception as exc:
             logger.error("LLM 匹配失败，准备记录失败日志")
             log_entries = []
@@ -65,8 +207,165 @@ def match_properties(
             append_match_logs(log_entries)
             raise
 
+    if mode == "pipeline":
+        logger.info("进入召回-精排匹配流程")
+        with timed("match.pipeline"):
+            return pipeline_match(properties, candidates, table_summary, relations, threshold, skill_doc, on_result)
+
+    if mode == "assignment":
+        logger.info("进入全局分配匹配流程")
+        with timed("match.assignment"):
+            return assignment_match(properties, candidates, table_summary, threshold, on_result)
+
     logger.info("进入启发式匹配流程")
-    return heuristic_match(properties, candidates, table_summary, threshold)
+    with timed("match.scoring"):
+        return heuristic_match(properties, candidates, table_summary, threshold, on_result)
+
+
+def match_properties_incremental(
+    properties: list[PropertyItem],
+    tables: list[dict],
+    mode: str,
+    threshold: float,
+    skill_doc: str | None = None,
+    session_id: str | None = None,
+) -> tuple[list[MatchItem], MatchDiff]:
+    if not session_id:
+        raise ValueError("session_id is required for incremental matching")
+    session_key = session_id
+    store = get_match_state_store()
+    previous = store.get(session_key)
+    threshold = max(0.0, min(1.0, threshold))
+    relations = infer_relations(tables) if mode in TABLE_CONTEXT_MODES else None
+    config_fp, dependency_fps = _match_fingerprints(properties, tables, mode, threshold, skill_doc, relations)
+    # reusable 为可复用的状态；配置变化时全部重算，但 diff 仍与上次结果比较（属于 changed 而非 added）。
+    reusable = previous
+    if previous is not None and previous.config_fingerprint != config_fp:
+        logger.info("匹配配置已变化，增量状态失效：session=%s", session_key)
+        reusable = None
+
+    dirty: list[PropertyItem] = []
+    for prop in properties:
+        cached = reusable.properties.get(prop.iri) if reusable else None
+        if cached is None or cached.fingerprint != dependency_fps[prop.iri]:
+            dirty.append(prop)
+    if mode == "assignment" and dirty:
+        # 全局分配受字段容量约束：只对变化的属性求解会看不到复用结果已占用的字段，整体重算。
+        dirty = list(properties)
+
+    logger.info(
+        "增量匹配：session=%s，属性数=%d，需重算=%d",
+        session_key,
+        len(properties),
+        len(dirty),
+    )
+    rescored: dict[str, MatchItem] = {}
+    if dirty:
+        for item in match_properties(dirty, tables, mode, threshold, skill_doc, relations=relations):
+            rescored[item.property_iri] = item
+
+    diff = MatchDiff(rescored=len(dirty), reused=len(properties) - len(dirty))
+    state = SessionState(config_fingerprint=config_fp)
+    results: list[MatchItem] = []
+    for prop in properties:
+        before = previous.properties.get(prop.iri) if previous else None
+        item = rescored.get(prop.iri)
+        if item is None:
+            item = reusable.properties[prop.iri].item
+        elif before is None:
+            diff.added.append(prop.iri)
+        elif _match_changed(before.item, item):
+            diff.changed.append(prop.iri)
+        results.append(item)
+        if not item.fallback:
+            state.properties[prop.iri] = PropertyState(fingerprint=dependency_fps[prop.iri], item=item)
+
+    if previous is not None:
+        current_iris = {prop.iri for prop in properties}
+        diff.removed = [iri for iri in previous.properties if iri not in current_iris]
+    store.put(session_key, state)
+    return results, diff
+
+
+def remember_match_results(
+    properties: list[PropertyItem],
+    tables: list[dict],
+    mode: str,
+    threshold: float,
+    skill_doc: str | None,
+    session_id: str,
+    results: list[MatchItem],
+    relations: list[dict] | None = None,
+) -> None:
+    """把一次全量匹配（如流式匹配）的结果写入会话状态，之后的增量匹配可直接复用。
+
+    relations 传入匹配时用过的表间关系，避免再推断一次。
+    """
+    threshold = max(0.0, min(1.0, threshold))
+    if relations is None and mode in TABLE_CONTEXT_MODES:
+        relations = infer_relations(tables)
+    config_fp, dependency_fps = _match_fingerprints(properties, tables, mode, threshold, skill_doc, relations)
+    state = SessionState(config_fingerprint=config_fp)
+    for item in results:
+        dependency_fp = dependency_fps.get(item.property_iri)
+        if dependency_fp is not None and not item.fallback:
+            state.properties[item.property_iri] = PropertyState(fingerprint=dependency_fp, item=item)
+    get_match_state_store().put(session_id, state)
+
+
+def _match_fingerprints(
+    properties: list[PropertyItem],
+    tables: list[dict],
+    mode: str,
+    threshold: float,
+    skill_doc: str | None,
+    relations: list[dict] | None,
+) -> tuple[str, dict[str, str]]:
+    """返回 (配置指纹, {属性 IRI: 依赖指纹})；依赖指纹覆盖属性本身与其候选字段的名称和样例。
+
+    本地评分模式（heuristic、assignment）只有达到阈值的候选字段才可能被选中，依赖指纹只覆盖这些字段；
+    低于阈值的候选变化时，未匹配结果里报告的最高分可能沿用旧值。
+    """
+    config: list = [mode, threshold]
+    if mode in TABLE_CONTEXT_MODES:
+        # 表集合（含字段）、表间关系与技能文档进入 LLM 提示词，变化时所有属性都要重算；
+        # 本地评分模式只看各属性作用域内的候选字段，由依赖指纹覆盖，加入无关的表不影响复用。
+        table_set = sorted(
+            (_table_value(table, "name", ""), list(_table_value(table, "fields", []))) for table in tables
+        )
+        config.extend([fingerprint(skill_doc or ""), table_set, relations or []])
+    if mode == "pipeline":
+        config.extend(
+            [get_int_setting("MATCH_RECALL_TOP_K", 5), get_float_setting("MATCH_RERANK_MARGIN", 0.1)]
+        )
+    elif mode == "assignment":
+        config.extend(
+            [get_int_setting("MATCH_ASSIGNMENT_TOP_K", 10), get_int_setting("MATCH_FIELD_CAPACITY", 1)]
+        )
+    config_fp = fingerprint(config)
+
+    candidates = _build_candidates(tables)
+    table_summary = _build_table_summary(tables)
+    column_fps = {
+        (candidate.table_name, candidate.field): column_fingerprint(
+            candidate.table_name,
+            candidate.field,
+            candidate.samples,
+        )
+        for candidate in candidates
+    }
+    dependency_fps: dict[str, str] = {}
+    for prop in properties:
+        scoped = _select_candidates_for_property(prop, candidates, table_summary)
+        if mode not in TABLE_CONTEXT_MODES:
+            scoped = [item for item in scoped if _score_candidate(prop, item) >= threshold]
+        scoped_fps = sorted(column_fps[(item.table_name, item.field)] for item in scoped)
+        dependency_fps[prop.iri] = fingerprint([property_fingerprint(prop), scoped_fps])
+    return config_fp, dependency_fps
+
+
+def _match_changed(before: MatchItem, after: MatchItem) -> bool:
+    return (before.table_name, before.field, before.score) != (after.table_name, after.field, after.score)
 
 
 def heuristic_match(
@@ -74,6 +373,7 @@ def heuristic_match(
     candidates: list[FieldCandidate],
     tables: list[dict],
     threshold: float,
+    on_result: Callable[[MatchItem], None] | None = None,
 ) -> list[MatchItem]:
     results: list[MatchItem] = []
     log_entries: list[dict] = []
@@ -83,31 +383,32 @@ def heuristic_match(
         score = best[1] if best else 0.0
         if best and score >= threshold:
             candidate = best[0]
-            results.append(
-                MatchItem(
-                    property_iri=prop.iri,
-                    property_label=prop.label or prop.local_name,
-                    table_name=candidate.table_name,
-                    field=candidate.field,
-                    score=round(score, 4),
-                )
-            )
             reason = "启发式匹配"
-        else:
-            results.append(
-                MatchItem(
-                    property_iri=prop.iri,
-                    property_label=prop.label or prop.local_name,
-                    table_name=None,
-                    field=None,
-                    score=round(score, 4) if score else None,
-                )
+            match_item = MatchItem(
+                property_iri=prop.iri,
+                property_label=prop.label or prop.local_name,
+                table_name=candidate.table_name,
+                field=candidate.field,
+                score=round(score, 4),
+                reason=reason,
             )
+        else:
             if best:
                 reason = "启发式匹配但置信度低于阈值"
             else:
                 reason = "启发式未找到匹配"
             candidate = best[0] if best else None
+            match_item = MatchItem(
+                property_iri=prop.iri,
+                property_label=prop.label or prop.local_name,
+                table_name=None,
+                field=None,
+                score=round(score, 4) if score else None,
+                reason=reason,
+            )
+        results.append(match_item)
+        if on_result is not None:
+            on_result(match_item)
 
         log_entries.append(
             {
@@ -123,160 +424,435 @@ def heuristic_match(
     return results
 
 
-def llm_match(
+def assignment_match(
     properties: list[PropertyItem],
     candidates: list[FieldCandidate],
     tables: list[dict],
-    relations: list[dict],
     threshold: float,
-    skill_doc: str | None,
+    on_result: Callable[[MatchItem], None] | None = None,
 ) -> list[MatchItem]:
-    api_key = get_setting("QWEN_API_KEY")
-    base_url = get_setting("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
-    default_model = get_setting("QWEN_MODEL", "qwen-plus")
+    top_k = get_int_setting("MATCH_ASSIGNMENT_TOP_K", 10)
+    capacity = get_int_setting("MATCH_FIELD_CAPACITY", 1)
+    candidate_index = {(item.table_name, item.field): index for index, item in enumerate(candidates)}
+
+    # 稀疏化：每个属性只保留作用域内、达到阈值的 top-k 字段作为边。
+    ranked_props = RecallStage(top_k).run(properties, candidates, tables)
+    edges: list[AssignmentEdge] = []
+    for row, ranked in enumerate(ranked_props):
+        for candidate, score in ranked.ranked:
+            if score >= threshold:
+                col = candidate_index[(candidate.table_name, candidate.field)]
+                edges.append(AssignmentEdge(row=row, col=col, score=score))
+    logger.info(
+        "全局分配：属性数=%d，字段数=%d，稀疏边数=%d，字段容量=%d",
+        len(properties),
+        len(candidates),
+        len(edges),
+        capacity,
+    )
+    assignment = solve_assignment(len(properties), len(candidates), edges, capacity)
 
-    if not api_key:
-        raise RuntimeError("QWEN_API_KEY 未配置，无法进行 LLM 匹配。")
+    results: list[MatchItem] = []
+    log_entries: list[dict] = []
+    for row, ranked in enumerate(ranked_props):
+        prop = ranked.prop
+        best = ranked.ranked[0] if ranked.ranked else None
+        col = assignment.get(row)
+        if col is not None:
+            candidate = candidates[col]
+            score = next(score for item, score in ranked.ranked if item is candidate)
+            reason = "全局分配匹配"
+            if best and best[0] is not candidate:
+                reason = f"{reason}；最佳字段 {best[0].field} 已分配给其他属性"
+        else:
+            candidate = None
+            score = best[1] if best else 0.0
+            if best and best[1] >= threshold:
+                reason = "全局分配未选中：候选字段已被其他属性占用"
+            elif best:
+                reason = "启发式匹配但置信度低于阈值"
+            else:
+                reason = "启发式未找到匹配"
+        match_item = MatchItem(
+            property_iri=prop.iri,
+            property_label=prop.label or prop.local_name,
+            table_name=candidate.table_name if candidate else None,
+            field=candidate.field if candidate else None,
+            score=round(score, 4) if score else None,
+            reason=reason,
+        )
+        results.append(match_item)
+        if on_result is not None:
+            on_result(match_item)
+        log_entries.append(
+            {
+                "level": "INFO",
+                "property_label": prop.label or prop.local_name or prop.iri,
+                "group_name": _group_name_for_property(prop),
+                "field": candidate.field if candidate else (best[0].field if best else "-"),
+                "result": "匹配成功" if candidate else "匹配失败",
+                "reason": reason,
+            }
+        )
+    append_match_logs(log_entries)
+    return results
 
-    model_select_doc = None
-    try:
-        model_select_doc = get_skill_registry().get_skill_doc("model-select")
-    except Exception as exc:
-        logger.warning("Model selection skill unavailable: %s", exc)
 
-    model = select_llm_model(
-        properties,
-        candidates,
-        tables,
-        relations,
-        default_model,
-        api_key,
-        base_url,
-        model_select_doc,
-    )
+def llm_match(
+    properties: list[PropertyItem],
+    candidates: list[FieldCandidate],
+    tables: list[dict],
+    relations: list[dict],
+    threshold: float,
+    skill_doc: str | None,
+    on_result: Callable[[MatchItem], None] | None = None,
+) -> list[MatchItem]:
+    api_key, base_url, model = _resolve_llm_model(properties, candidates, tables, relations)
+    started = time.perf_counter()
 
     total_batches = (len(properties) + LLM_BATCH_SIZE - 1) // LLM_BATCH_SIZE
     logger.info(
-        "准备分批调用 LLM：批大小=%d，总批次=%d，模型=%s",
+        "准备分批调用 LLM：批大小=%d，总批次=%d，模型=%s，流式=%s",
         LLM_BATCH_SIZE,
         total_batches,
         model,
+        on_result is not None,
     )
-    response_map: dict[str, dict] = {}
-    for index in range(total_batches):
-        batch = properties[index * LLM_BATCH_SIZE : (index + 1) * LLM_BATCH_SIZE]
+    batches = [
+        properties[index * LLM_BATCH_SIZE : (index + 1) * LLM_BATCH_SIZE]
+        for index in range(total_batches)
+    ]
+
+    # 流式模式下每个属性的结果一解析出来就回调，最终结果按属性顺序复用。
+    resolved: dict[str, tuple[MatchItem, dict]] = {}
+    resolved_lock = Lock()
+
+    def resolve(prop: PropertyItem, item: dict | None, batch_failed: bool = False) -> None:
+        with resolved_lock:
+            if prop.iri in resolved:
+                return
+            resolved[prop.iri] = _resolve_llm_result(prop, item, candidates, tables, threshold, batch_failed)
+            match_item = resolved[prop.iri][0]
+        if on_result is not None:
+            on_result(match_item)
+
+    def run_batch(index: int) -> list[dict]:
+        batch = batches[index]
         logger.info(
             "调用 LLM 批次 %d/%d：属性数=%d",
             index + 1,
             total_batches,
             len(batch),
         )
-        response = llm_match_properties(
-            batch,
-            candidates,
-            tables,
-            relations,
-            api_key,
-            base_url,
-            model,
-            skill_doc,
-        )
+        batch_props = {prop.iri: prop for prop in batch}
+
+        def resolve_streamed(item: dict) -> None:
+            prop = batch_props.get(item.get("property_iri"))
+            if prop is not None:
+                resolve(prop, item)
+
+        with timed("llm.batch"):
+            response = llm_match_properties(
+                batch,
+                candidates,
+                tables,
+                relations,
+                api_key,
+                base_url,
+                model,
+                skill_doc,
+                on_item=resolve_streamed if on_result is not None else None,
+            )
         logger.info("LLM 批次 %d/%d 返回条目数=%d", index + 1, total_batches, len(response))
-        for item in response:
-            property_iri = item.get("property_iri")
-            if property_iri:
-                response_map[property_iri] = item
+        return response
+
+    # 批次并发提交，实际并发度与配额由 llm_client 中的提供方限流器控制。
+    response_map: dict[str, dict] = {}
+    failed_iris: set[str] = set()
+    errors: list[Exception] = []
+    workers = max(1, min(total_batches, get_int_setting("QWEN_MAX_CONCURRENCY", 16)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-batch") as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, run_batch, index): index
+            for index in range(total_batches)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                response = future.result()
+            except Exception as exc:
+                logger.warning("LLM 批次 %d/%d 失败，改用本地评分：%s", index + 1, total_batches, exc)
+                errors.append(exc)
+                failed_iris.update(prop.iri for prop in batches[index])
+                continue
+            for item in response:
+                property_iri = item.get("property_iri")
+                if property_iri:
+                    response_map[property_iri] = item
+    if errors and len(errors) == total_batches and not resolved:
+        raise errors[0]
 
     results: list[MatchItem] = []
     log_entries: list[dict] = []
     for prop in properties:
-        item = response_map.get(prop.iri)
-        llm_confidence = _extract_llm_confidence(item)
-        explicit_null = (
-            item is not None
-            and item.get("table_name") is None
-            and item.get("field") is None
+        resolve(prop, response_map.get(prop.iri), prop.iri in failed_iris)
+        match_item, log_entry = resolved[prop.iri]
+        results.append(match_item)
+        log_entries.append(log_entry)
+
+    append_match_logs(log_entries)
+    # 把本次耗时与回退数反馈给本地模型路由：失败批次、空答与候选外的答案都记作回退。
+    get_model_router().record(
+        routing_stats(properties, candidates, tables, relations),
+        model,
+        time.perf_counter() - started,
+        sum(1 for item in results if item.fallback),
+        len(results),
+    )
+    return results
+
+
+def _resolve_llm_result(
+    prop: PropertyItem,
+    item: dict | None,
+    candidates: list[FieldCandidate],
+    tables: list[dict],
+    threshold: float,
+    batch_failed: bool,
+) -> tuple[MatchItem, dict]:
+    llm_confidence = _extract_llm_confidence(item)
+    explicit_null = (
+        item is not None
+        and item.get("table_name") is None
+        and item.get("field") is None
+    )
+    candidate = None
+    if item and not explicit_null:
+        candidate = _candidate_from_response(item, candidates)
+    if candidate:
+        score = _score_candidate(prop, candidate)
+        score_source = "local"
+    elif explicit_null:
+        score = llm_confidence or 0.0
+        score_source = "llm"
+    elif item is not None:
+        score = llm_confidence or 0.0
+        score_source = "llm"
+    else:
+        scoped = _select_candidates_for_property(prop, candidates, tables)
+        best = _best_candidate(prop, scoped)
+        candidate = best[0] if best else None
+        score = best[1] if best else 0.0
+        score_source = "local"
+
+    if llm_confidence is not None:
+        score = llm_confidence
+        score_source = "llm"
+
+    if candidate and score >= threshold:
+        match_item = MatchItem(
+            property_iri=prop.iri,
+            property_label=prop.label or prop.local_name,
+            table_name=candidate.table_name,
+            field=candidate.field,
+            score=round(score, 4),
+        )
+        result = "匹配成功"
+    else:
+        match_item = MatchItem(
+            property_iri=prop.iri,
+            property_label=prop.label or prop.local_name,
+            table_name=None,
+            field=None,
+            score=round(score, 4) if score else None,
         )
-        candidate = None
-        if item and not explicit_null:
-            candidate = _candidate_from_response(item, candidates)
-        if candidate:
-            score = _score_candidate(prop, candidate)
-            score_source = "local"
+        result = "匹配失败"
+
+    reason = None
+    if item:
+        reason = item.get("reason")
+    if not reason:
+        if batch_failed:
+            reason = "LLM 批次调用失败"
+        elif item is None:
+            reason = "LLM 未返回该属性匹配结果"
         elif explicit_null:
-            score = llm_confidence or 0.0
-            score_source = "llm"
-        elif item is not None:
-            score = llm_confidence or 0.0
-            score_source = "llm"
+            reason = "LLM 判定无合适字段"
         else:
-            scoped = _select_candidates_for_property(prop, candidates, tables)
-            best = _best_candidate(prop, scoped)
-            candidate = best[0] if best else None
-            score = best[1] if best else 0.0
-            score_source = "local"
-
-        if llm_confidence is not None:
-            score = llm_confidence
-            score_source = "llm"
-
-        if candidate and score >= threshold:
-            results.append(
-                MatchItem(
-                    property_iri=prop.iri,
-                    property_label=prop.label or prop.local_name,
-                    table_name=candidate.table_name,
-                    field=candidate.field,
-                    score=round(score, 4),
-                )
-            )
-            result = "匹配成功"
-        else:
-            results.append(
-                MatchItem(
-                    property_iri=prop.iri,
-                    property_label=prop.label or prop.local_name,
-                    table_name=None,
-                    field=None,
-                    score=round(score, 4) if score else None,
-                )
-            )
-            result = "匹配失败"
+            reason = "LLM 未返回匹配原因"
+    if item is not None and not explicit_null and candidate is None:
+        reason = f"{reason}；LLM 返回字段不在候选列表"
+    if candidate and score < threshold:
+        reason = f"{reason}；置信度低于阈值"
+    if score_source == "llm" and llm_confidence is not None:
+        reason = f"{reason}；LLM置信度={llm_confidence:.2f}"
+    elif score_source == "local":
+        reason = f"{reason}；使用本地评分"
+
+    match_item.reason = reason
+    match_item.fallback = batch_failed or item is None or (not explicit_null and candidate is None)
+    log_entry = {
+        "level": "INFO",
+        "property_label": prop.label or prop.local_name or prop.iri,
+        "group_name": _group_name_for_property(prop),
+        "field": candidate.field if candidate else "-",
+        "result": result,
+        "reason": reason,
+    }
+    return match_item, log_entry
+
+
+def pipeline_match(
+    properties: list[PropertyItem],
+    candidates: list[FieldCandidate],
+    tables: list[dict],
+    relations: list[dict],
+    threshold: float,
+    skill_doc: str | None,
+    on_result: Callable[[MatchItem], None] | None = None,
+) -> list[MatchItem]:
+    top_k = get_int_setting("MATCH_RECALL_TOP_K", 5)
+    margin = get_float_setting("MATCH_RERANK_MARGIN", 0.1)
+    metrics = PipelineMetrics(properties=len(properties))
+
+    with timed("match.recall"):
+        ranked_props = RecallStage(top_k).run(properties, candidates, tables)
+    ambiguous = [item for item in ranked_props if len(item.ranked) > 1 and item.margin < margin]
+    metrics.rerank_escalated = len(ambiguous)
+    logger.info(
+        "召回完成：top_k=%d，歧义阈值=%.2f，需精排属性数=%d/%d",
+        top_k,
+        margin,
+        len(ambiguous),
+        len(ranked_props),
+    )
+
+    response_map: dict[str, dict] = {}
+    if ambiguous:
+        with timed("match.rerank"):
+            response_map = LlmRerankStage(tables, relations, skill_doc).run(ambiguous, metrics)
+    ambiguous_iris = {item.prop.iri for item in ambiguous}
 
-        reason = None
-        if item:
-            reason = item.get("reason")
-        if not reason:
+    results: list[MatchItem] = []
+    log_entries: list[dict] = []
+    for ranked in ranked_props:
+        prop = ranked.prop
+        best = ranked.ranked[0] if ranked.ranked else None
+        candidate = best[0] if best else None
+        score = best[1] if best else 0.0
+        fallback = False
+        if prop.iri not in ambiguous_iris:
+            metrics.recall_resolved += 1
+            reason = "召回阶段匹配" if best else "召回阶段未找到匹配"
+        else:
+            item = response_map.get(prop.iri)
+            reranked = _candidate_from_response(item, [entry[0] for entry in ranked.ranked]) if item else None
             if item is None:
-                reason = "LLM 未返回该属性匹配结果"
-            elif explicit_null:
-                reason = "LLM 判定无合适字段"
+                metrics.rerank_fallback += 1
+                fallback = True
+                reason = "精排未返回结果，使用召回第一名"
+            elif item.get("table_name") is None and item.get("field") is None:
+                metrics.rerank_resolved += 1
+                candidate = None
+                score = _extract_llm_confidence(item) or 0.0
+                reason = item.get("reason") or "LLM 判定无合适字段"
+            elif reranked is None:
+                metrics.rerank_fallback += 1
+                fallback = True
+                reason = "精排返回字段不在候选列表，使用召回第一名"
             else:
-                reason = "LLM 未返回匹配原因"
-        if item is not None and not explicit_null and candidate is None:
-            reason = f"{reason}；LLM 返回字段不在候选列表"
-        if candidate and score < threshold:
+                metrics.rerank_resolved += 1
+                candidate = reranked
+                llm_confidence = _extract_llm_confidence(item)
+                score = llm_confidence if llm_confidence is not None else _score_candidate(prop, candidate)
+                reason = item.get("reason") or "精排阶段 LLM 匹配"
+        matched = candidate is not None and score >= threshold
+        if candidate and not matched:
             reason = f"{reason}；置信度低于阈值"
-        if score_source == "llm" and llm_confidence is not None:
-            reason = f"{reason}；LLM置信度={llm_confidence:.2f}"
-        elif score_source == "local":
-            reason = f"{reason}；使用本地评分"
-
+        match_item = MatchItem(
+            property_iri=prop.iri,
+            property_label=prop.label or prop.local_name,
+            table_name=candidate.table_name if matched else None,
+            field=candidate.field if matched else None,
+            score=round(score, 4) if score else None,
+            reason=reason,
+            fallback=fallback,
+        )
+        results.append(match_item)
+        if on_result is not None:
+            on_result(match_item)
         log_entries.append(
             {
                 "level": "INFO",
                 "property_label": prop.label or prop.local_name or prop.iri,
                 "group_name": _group_name_for_property(prop),
                 "field": candidate.field if candidate else "-",
-                "result": result,
+                "result": "匹配成功" if matched else "匹配失败",
                 "reason": reason,
             }
         )
 
+    logger.info(
+        "召回-精排完成：属性数=%d，召回解决=%d，精排升级=%d，精排解决=%d，精排回退=%d，LLM 调用=%d",
+        metrics.properties,
+        metrics.recall_resolved,
+        metrics.rerank_escalated,
+        metrics.rerank_resolved,
+        metrics.rerank_fallback,
+        metrics.llm_calls,
+    )
+    ITEMS.inc(metrics.recall_resolved, kind="pipeline_recall_resolved")
+    ITEMS.inc(metrics.rerank_resolved, kind="pipeline_rerank_resolved")
+    ITEMS.inc(metrics.rerank_fallback, kind="pipeline_rerank_fallback")
     append_match_logs(log_entries)
     return results
 
 
+def _shortlist_candidates(ranked_props: list[RankedProperty]) -> list[FieldCandidate]:
+    shortlist: list[FieldCandidate] = []
+    seen: set[tuple[str, str]] = set()
+    for ranked in ranked_props:
+        for candidate, _ in ranked.ranked:
+            key = (candidate.table_name, candidate.field)
+            if key in seen:
+                continue
+            seen.add(key)
+            shortlist.append(candidate)
+    return shortlist
+
+
+def _resolve_llm_model(
+    properties: list[PropertyItem],
+    candidates: list[FieldCandidate],
+    tables: list[dict],
+    relations: list[dict],
+) -> tuple[str, str, str]:
+    api_key = get_setting("QWEN_API_KEY")
+    base_url = get_setting("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+    default_model = get_setting("QWEN_MODEL", "qwen-plus")
+
+    if not api_key:
+        raise RuntimeError("QWEN_API_KEY 未配置，无法进行 LLM 匹配。")
+
+    model_select_doc = None
+    try:
+        model_select_doc = get_skill_registry().get_skill_doc("model-select")
+    except Exception as exc:
+        logger.warning("Model selection skill unavailable: %s", exc)
+
+    model = select_llm_model(
+        properties,
+        candidates,
+        tables,
+        relations,
+        default_model,
+        api_key,
+        base_url,
+        model_select_doc,
+    )
+    return api_key, base_url, model
+
+
 def _extract_llm_confidence(item: dict | None) -> float | None:
     if not item:
         return None
@@ -339,21 +915,17 @@ def _select_candidates_for_property(
 def _score_candidate(prop: PropertyItem, candidate: FieldCandidate) -> float:
     name_score = _name_similarity(candidate.field, [prop.label, prop.local_name])
     domain_score = _domain_similarity(candidate.table_name, prop.domains)
-    sample_score = _sample_similarity(candidate.samples, prop)
+    sample_score = _sample_similarity(candidate.sample_type, prop)
 
     return 0.6 * name_score + 0.2 * domain_score + 0.2 * sample_score
 
 
 def _name_similarity(text: str, candidates: Iterable[str | None]) -> float:
     best = 0.0
-    normalized_text = normalize_text(text)
     for value in candidates:
         if not value:
             continue
-        normalized_value = normalize_text(value)
-        if not normalized_value:
-            continue
-        score = SequenceMatcher(None, normalized_text, normalized_value).ratio()
+        score = label_similarity(text, value)
         if score > best:
             best = score
     return best
@@ -369,9 +941,8 @@ def _domain_similarity(table_name: str, domains: list) -> float:
     return _name_similarity(table_name, candidates)
 
 
-def _sample_similarity(samples: list, prop: PropertyItem) -> float:
+def _sample_similarity(sample_type: str, prop: PropertyItem) -> float:
     hints = _property_type_hints(prop)
-    sample_type = _infer_sample_type(samples)
 
     if not hints:
         return 0.5
@@ -460,7 +1031,7 @@ def _infer_sample_type(samples: list) -> str:
 
 
 def _looks_like_email(text: str) -> bool:
-    return bool(re.match(r"^[^\s@]+@[^\s@]+\.[^\s@]+$", text))
+    return bool(_EMAIL.match(text))
 
 
 def _looks_like_url(text: str) -> bool:
@@ -468,15 +1039,15 @@ def _looks_like_url(text: str) -> bool:
 
 
 def _looks_like_number(text: str) -> bool:
-    return bool(re.match(r"^-?\d+(\.\d+)?$", text))
+    return bool(_NUMBER.match(text))
 
 
 def _looks_like_date(text: str) -> bool:
-    return bool(re.match(r"^\d{4}[-/年]\d{1,2}[-/月]\d{1,2}", text))
+    return bool(_DATE.match(text))
 
 
 def _looks_like_phone(text: str) -> bool:
-    return bool(re.match(r"^\+?\d{7,}$", text))
+    return bool(_PHONE.match(text))
 
 
 def _looks_like_bool(text: str) -> bool:
@@ -540,21 +1111,3 @@ def _build_table_summary(tables: list) -> list[dict]:
             }
         )
     return summary
-
-
-def _infer_relations(tables: list[dict]) -> list[dict]:
-    relations: list[dict] = []
-    for i, left in enumerate(tables):
-        left_fields = set(left.get("fields") or [])
-        for right in tables[i + 1 :]:
-            right_fields = set(right.get("fields") or [])
-            shared = sorted(left_fields & right_fields)
-            if shared:
-                relations.append(
-                    {
-                        "left_table": left.get("name"),
-                        "right_table": right.get("name"),
-                        "shared_fields": shared[:5],
-                    }
-                )
-    return relations
\ No newline at end of file
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable
+import logging
+import time
+
+from app.utils.config import get_float_setting, get_int_setting, get_setting
+
+logger = logging.getLogger(__name__)
+
+ROUTER_POLICIES = ("local", "llm")
+
+
+@dataclass(frozen=True)
+class RoutingStats:
+    property_count: int
+    table_count: int
+    candidate_count: int
+    relation_count: int
+
+    def bucket(self) -> tuple[int, int, int, bool]:
+        # 按 2 的幂分桶，规模相近的请求共享路由决策与观测数据。
+        return (
+            self.property_count.bit_length(),
+            self.table_count.bit_length(),
+            self.candidate_count.bit_length(),
+            self.relation_count > 0,
+        )
+
+
+def routing_stats(properties: list, candidates: list, tables: list, relations: list) -> RoutingStats:
+    return RoutingStats(len(properties), len(tables), len(candidates), len(relations))
+
+
+@dataclass
+class ModelObservation:
+    samples: int = 0
+    seconds_per_property: float = 0.0
+    quality: float = 0.0
+
+    def update(self, seconds_per_property: float, quality: float, alpha: float) -> None:
+        if self.samples == 0:
+            self.seconds_per_property = seconds_per_property
+            self.quality = quality
+        else:
+            self.seconds_per_property += alpha * (seconds_per_property - self.seconds_per_property)
+            self.quality += alpha * (quality - self.quality)
+        self.samples += 1
+
+
+@dataclass
+class RoutingDecision:
+    model: str
+    source: str
+    expires_at: float
+
+
+class ModelRouter:
+    """本地模型路由：按规模分桶记录各模型的耗时与质量，选效用最高的模型。
+
+    质量 = 1 - 回退率（批次失败、空答或答出候选外字段的属性占比），明确答“无匹配”不扣分，
+    因此多匹配不会被奖励。探索即把真实请求发给观测不足的非默认模型，每桶最多 explore_budget 次，
+    用完后只在观测足够的模型与默认模型之间选择。policy=llm 时改由 ask_router（远端路由模型）决策，
+    它失败时使用默认模型；两种策略的决策都按桶缓存（探索决策不缓存，保证预算按请求计数）。
+    """
+
+    def __init__(
+        self,
+        policy: str = "local",
+        latency_weight: float = 0.1,
+        min_samples: int = 2,
+        cache_seconds: float = 600.0,
+        alpha: float = 0.3,
+        explore_budget: int = 4,
+    ) -> None:
+        self.policy = policy if policy in ROUTER_POLICIES else "local"
+        self.latency_weight = latency_weight
+        self.min_samples = max(1, min_samples)
+        self.cache_seconds = cache_seconds
+        self.alpha = alpha
+        self.explore_budget = max(0, explore_budget)
+        self._explored: dict[tuple, int] = {}
+        self._observations: dict[tuple, dict[str, ModelObservation]] = {}
+        self._decisions: dict[tuple, RoutingDecision] = {}
+        self._lock = Lock()
+
+    def route(
+        self,
+        stats: RoutingStats,
+        candidates: list[str],
+        default_model: str,
+        ask_router: Callable[[], str | None] | None = None,
+    ) -> str:
+        if len(candidates) <= 1:
+            return default_model
+        bucket = stats.bucket()
+        key = (bucket, tuple(candidates))
+        now = time.monotonic()
+        with self._lock:
+            decision = self._decisions.get(key)
+            if decision is not None and decision.expires_at > now:
+                return decision.model
+            if self.policy == "local":
+                model, source = self._choose_local(bucket, candidates, default_model)
+
+        if self.policy == "llm":
+            selected = ask_router() if ask_router is not None else None
+            model, source = (selected, "llm") if selected in candidates else (default_model, "default")
+
+        if source != "explore":
+            with self._lock:
+                self._decisions[key] = RoutingDecision(model, source, now + self.cache_seconds)
+        logger.info("模型路由：桶=%s，来源=%s，模型=%s", bucket, source, model)
+        return model
+
+    def record(self, stats: RoutingStats, model: str, seconds: float, fallbacks: int, total: int) -> None:
+        if total <= 0:
+            return
+        bucket = stats.bucket()
+        with self._lock:
+            observation = self._observations.setdefault(bucket, {}).setdefault(model, ModelObservation())
+            observation.update(seconds / total, 1.0 - fallbacks / total, self.alpha)
+            # 本地决策随观测刷新；远端路由的决策保留到过期，避免每次请求都发起网络调用。
+            for key in [key for key, item in self._decisions.items() if key[0] == bucket and item.source != "llm"]:
+                del self._decisions[key]
+
+    def _choose_local(self, bucket: tuple, candidates: list[str], default_model: str) -> tuple[str, str]:
+        # 默认模型先积累 min_samples 次观测（本来就要发给它，不占探索预算）；其余候选按配置顺序
+        # 在预算内依次探索，之后在观测足够的模型中按 质量 - 权重 × 单属性耗时 选择。
+        observations = self._observations.get(bucket, {})
+        ordered = [default_model] + [model for model in candidates if model != default_model]
+        scored = []
+        for index, model in enumerate(ordered):
+            observation = observations.get(model)
+            if observation is not None and observation.samples >= self.min_samples:
+                utility = observation.quality - self.latency_weight * observation.seconds_per_property
+                scored.append((utility, -index, model))
+                continue
+            if model == default_model:
+                return model, "default"
+            if self._explored.get(bucket, 0) < self.explore_budget:
+                self._explored[bucket] = self._explored.get(bucket, 0) + 1
+                return model, "explore"
+        if not scored:
+            return default_model, "default"
+        return max(scored)[2], "learned"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                str(bucket): {
+                    model: {
+                        "samples": item.samples,
+                        "seconds_per_property": round(item.seconds_per_property, 4),
+                        "quality": round(item.quality, 4),
+                    }
+                    for model, item in models.items()
+                }
+                for bucket, models in self._observations.items()
+            }
+
+
+_default_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter(
+            policy=(get_setting("QWEN_ROUTER_POLICY", "local") or "local").strip().lower(),
+            latency_weight=get_float_setting("QWEN_ROUTER_LATENCY_WEIGHT", 0.1),
+            min_samples=int(get_float_setting("QWEN_ROUTER_MIN_SAMPLES", 2)),
+            cache_seconds=get_float_setting("QWEN_ROUTER_CACHE_SECONDS", 600.0),
+            explore_budget=get_int_setting("QWEN_ROUTER_EXPLORE_BUDGET", 4),
+        )
+    return _default_router
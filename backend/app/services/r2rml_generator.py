@@ -1,8 +1,44 @@
+import logging
+from urllib.parse import quote
+
 from app.models.schemas import MappingItem
+from app.services.literals import escape_iri
+from app.services.subjects import SubjectSpec, subject_template
+
+logger = logging.getLogger(__name__)
 
 
-def generate_r2rml(mapping: list[MappingItem], table_name: str, base_iri: str) -> str:
-    base = base_iri if base_iri.endswith('/') else base_iri + '/'
+def generate_r2rml(
+    mapping: list[MappingItem],
+    table_name: str,
+    base_iri: str,
+    links: list | None = None,
+    subjects: dict[str, SubjectSpec] | None = None,
+) -> str:
+    """生成 table_name 的 TriplesMap；主语模板与 ABox 相同，都由 subjects 中的主语规则（subject_template）得出。
+
+    links 中源表为 table_name 的连接生成 rr:refObjectMap，被引用的表各生成一个只含主语的 TriplesMap。
+    ABox 在没有键列规则（或按内容哈希）时用行号作主语，R2RML 无法表达：主表退回 {base}table/{表名}/row/{id}，
+    涉及这类表的连接不生成 refObjectMap。
+    """
+    base = escape_iri(base_iri)
+    base = base if base.endswith('/') else base + '/'
+    subjects = subjects or {}
+    main_template = subject_template(table_name, base, subjects.get(table_name))
+    joins = []
+    parents: dict[str, tuple[str, str]] = {}
+    for link in links or []:
+        if link.source_table != table_name:
+            continue
+        parent_template = subject_template(link.target_table, base, subjects.get(link.target_table))
+        if main_template is None or parent_template is None:
+            logger.info("连接 %s 的表没有键列主语规则，R2RML 不生成 refObjectMap", link)
+            continue
+        joins.append(link)
+        if link.target_table not in parents:
+            parents[link.target_table] = (f"ex:TriplesMap{len(parents) + 2}", parent_template)
+    if main_template is None:
+        main_template = f"{base}table/{quote(str(table_name))}/row/{{id}}"
 
     lines = [
         "@prefix rr: <http://www.w3.org/ns/r2rml#> .",
@@ -10,13 +46,35 @@ def generate_r2rml(mapping: list[MappingItem], table_name: str, base_iri: str) -
         "",
         "ex:TriplesMap1 a rr:TriplesMap ;",
         f"  rr:logicalTable [ rr:tableName \"{table_name}\" ] ;",
-        f"  rr:subjectMap [ rr:template \"{base}row/{{id}}\" ] ;",
+        f"  rr:subjectMap [ rr:template {_literal(main_template)} ] ;",
     ]
 
+    total = len(mapping) + len(joins)
     for idx, item in enumerate(mapping, start=1):
         lines.append("  rr:predicateObjectMap [")
-        lines.append(f"    rr:predicate <{item.property_iri}> ;")
+        lines.append(f"    rr:predicate <{escape_iri(item.property_iri)}> ;")
         lines.append(f"    rr:objectMap [ rr:column \"{item.field}\" ]")
-        lines.append("  ]" + (" ;" if idx != len(mapping) else " ."))
+        lines.append("  ]" + (" ;" if idx != total else " ."))
+
+    for idx, link in enumerate(joins, start=len(mapping) + 1):
+        lines.append("  rr:predicateObjectMap [")
+        lines.append(f"    rr:predicate <{escape_iri(link.property_iri)}> ;")
+        lines.append("    rr:objectMap [")
+        lines.append(f"      rr:parentTriplesMap {parents[link.target_table][0]} ;")
+        lines.append(
+            f"      rr:joinCondition [ rr:child \"{link.source_field}\" ; rr:parent \"{link.target_field}\" ]"
+        )
+        lines.append("    ]")
+        lines.append("  ]" + (" ;" if idx != total else " ."))
+
+    for target_table, (name, template) in parents.items():
+        lines.append("")
+        lines.append(f"{name} a rr:TriplesMap ;")
+        lines.append(f"  rr:logicalTable [ rr:tableName \"{target_table}\" ] ;")
+        lines.append(f"  rr:subjectMap [ rr:template {_literal(template)} ] .")
 
     return "\n".join(lines)
+
+
+def _literal(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
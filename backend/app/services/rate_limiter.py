@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import Condition, Lock
+import time
+
+from app.utils.config import get_int_setting
+from app.utils.metrics import REGISTRY
+
+LLM_THROTTLED = REGISTRY.counter(
+    "r2rml_llm_throttled_total",
+    "LLM requests rejected by the provider with 429/503.",
+    ("provider",),
+)
+LLM_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "r2rml_llm_concurrency_limit",
+    "Current adaptive concurrency limit per LLM provider.",
+    ("provider",),
+)
+LLM_LIMITER_WAIT = REGISTRY.histogram(
+    "r2rml_llm_limiter_wait_seconds",
+    "Time spent waiting for the provider rate limiter.",
+    ("provider",),
+)
+
+
+class TokenBucket:
+    """线程安全的令牌桶；capacity 为每分钟配额，按秒匀速补充。"""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.condition = Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0, timeout: float | None = None) -> bool:
+        # 单次请求超过桶容量时按满桶处理，避免永远等待。
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                wait = (amount - self.tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self.condition.wait(wait)
+
+    def adjust(self, delta: float) -> None:
+        """按实际用量修正：delta > 0 表示多扣，delta < 0 表示退还。"""
+        with self.condition:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+            self.condition.notify_all()
+
+    def drain(self) -> None:
+        with self.condition:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class AdaptiveConcurrency:
+    """AIMD 并发控制：成功时缓慢加一，被限流时减半。"""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 32) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.condition = Condition()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self) -> None:
+        with self.condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+            self.condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self.condition:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+class ProviderLimiter:
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        initial_concurrency: int = 4,
+        max_concurrency: int = 16,
+    ) -> None:
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, 1, max_concurrency)
+        LLM_CONCURRENCY_LIMIT.set(self.concurrency.limit, provider=provider)
+
+    @contextmanager
+    def slot(self, estimated_tokens: int):
+        start = time.monotonic()
+        self.concurrency.acquire()
+        try:
+            if self.requests is not None:
+                self.requests.acquire(1)
+            if self.tokens is not None:
+                self.tokens.acquire(estimated_tokens)
+            LLM_LIMITER_WAIT.observe(time.monotonic() - start, provider=self.provider)
+            yield self
+        finally:
+            self.concurrency.release()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        if self.tokens is not None and actual_tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+        LLM_CONCURRENCY_LIMIT.set(self.concurrency.limit, provider=self.provider)
+
+    def on_throttle(self) -> None:
+        self.concurrency.on_throttle()
+        if self.requests is not None:
+            self.requests.drain()
+        LLM_THROTTLED.inc(provider=self.provider)
+        LLM_CONCURRENCY_LIMIT.set(self.concurrency.limit, provider=self.provider)
+
+
+def estimate_tokens(text: str) -> int:
+    # 粗略估算：英文约 4 字符/词元，中文约 1.5 字符/词元，取折中。
+    return max(1, len(text) // 3)
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = Lock()
+
+
+def get_provider_limiter(base_url: str) -> ProviderLimiter:
+    key = base_url.rstrip("/")
+    limiter = _limiters.get(key)
+    if limiter is not None:
+        return limiter
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = ProviderLimiter(
+                key,
+                requests_per_minute=get_int_setting("QWEN_RPM", 0),
+                tokens_per_minute=get_int_setting("QWEN_TPM", 0),
+                initial_concurrency=get_int_setting("QWEN_INITIAL_CONCURRENCY", 4),
+                max_concurrency=get_int_setting("QWEN_MAX_CONCURRENCY", 16),
+            )
+            _limiters[key] = limiter
+    return limiter
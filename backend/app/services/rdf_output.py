@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+import gzip
+import io
+
+OUTPUT_FORMATS = {"turtle": ".ttl", "ntriples": ".nt", "nquads": ".nq", "binary": ".rdfbin"}
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# 二进制三元组文件：魔数 + 版本，之后每个三元组是 3 个变长整数。
+# 0 表示紧跟一个新词项（长度 + UTF-8 的 N-Triples 词项），读写双方同时给它分配下一个编号；
+# 1 表示清空字典（字典达到上限时由写入方插入，保证内存有界）；其余值为已登记词项的编号。
+BINARY_MAGIC = b"R2RMLRDF\x01"
+_NEW_TERM = 0
+_RESET = 1
+_FIRST_ID = 2
+
+Triple = tuple[str, str, str]
+
+
+def normalize_output(output_format: str | None, compression: str | None) -> tuple[str, str]:
+    fmt = (output_format or "turtle").strip().lower()
+    codec = (compression or "none").strip().lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported ABox output format: {output_format}")
+    if codec not in COMPRESSIONS:
+        raise ValueError(f"Unsupported ABox compression: {compression}")
+    return fmt, codec
+
+
+def output_suffix(output_format: str, compression: str) -> str:
+    return OUTPUT_FORMATS[output_format] + COMPRESSIONS[compression]
+
+
+def open_output(path: Path, compression: str) -> BinaryIO:
+    """打开（可压缩的）输出流；zstd 依赖可选安装的 zstandard。"""
+    if compression == "gzip":
+        # compresslevel=6：比默认 9 快得多，体积相差很小。
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        zstd = _import_zstd()
+        return zstd.ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def open_input(path: str | Path) -> BinaryIO:
+    """按扩展名识别压缩格式打开输入流。"""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".zst":
+        zstd = _import_zstd()
+        return io.BufferedReader(zstd.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path, "rb")
+
+
+def _import_zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ValueError("zstd compression requires the optional 'zstandard' package") from exc
+    return zstandard
+
+
+class TextTripleWriter:
+    """逐批写出 N-Triples / N-Quads 行（N-Triples 同时是合法的 Turtle）。"""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self.triples = 0
+
+    def write(self, triples: list[Triple], graph: str | None = None) -> None:
+        suffix = f" {graph} .\n" if graph else " .\n"
+        self.stream.write("".join([f"{s} {p} {o}{suffix}" for s, p, o in triples]).encode("utf-8"))
+        self.triples += len(triples)
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+class BinaryTripleWriter:
+    """字典编码的二进制三元组写入器：重复出现的词项（谓词、同一行的主语、常见取值）只写一次。"""
+
+    def __init__(self, stream: BinaryIO, max_terms: int = 1 << 20) -> None:
+        self.stream = stream
+        self.max_terms = max(1, max_terms)
+        self.triples = 0
+        self._ids: dict[str, int] = {}
+        stream.write(BINARY_MAGIC)
+
+    def write(self, triples: list[Triple], graph: str | None = None) -> None:
+        # 二进制格式只保存三元组；按表分片时文件本身即区分来源。
+        out = bytearray()
+        ids = self._ids
+        for triple in triples:
+            for term in triple:
+                term_id = ids.get(term)
+                if term_id is not None:
+                    _put_varint(out, term_id)
+                    continue
+                if len(ids) >= self.max_terms:
+                    out.append(_RESET)
+                    ids.clear()
+                data = term.encode("utf-8")
+                out.append(_NEW_TERM)
+                _put_varint(out, len(data))
+                out += data
+                ids[term] = len(ids) + _FIRST_ID
+        self.stream.write(out)
+        self.triples += len(triples)
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_binary_triples(path: str | Path) -> Iterator[Triple]:
+    """读取二进制三元组文件，按 N-Triples 词项字符串逐个返回三元组。"""
+    with open_input(path) as stream:
+        if stream.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"Not an ABox binary triple file: {path}")
+        reader = _VarintReader(stream)
+        terms: list[str] = []
+        triple: list[str] = []
+        while True:
+            code = reader.varint()
+            if code is None:
+                if triple:
+                    raise ValueError(f"Truncated ABox binary triple file: {path}")
+                return
+            if code == _RESET:
+                terms.clear()
+                continue
+            if code == _NEW_TERM:
+                term = reader.read(reader.varint() or 0).decode("utf-8")
+                terms.append(term)
+            else:
+                term = terms[code - _FIRST_ID]
+            triple.append(term)
+            if len(triple) == 3:
+                yield triple[0], triple[1], triple[2]
+                triple = []
+
+
+class _VarintReader:
+    def __init__(self, stream: BinaryIO, chunk_size: int = 1 << 20) -> None:
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.pos = 0
+
+    def _fill(self, needed: int) -> bool:
+        if len(self.buffer) - self.pos >= needed:
+            return True
+        chunk = self.stream.read(max(self.chunk_size, needed))
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return len(self.buffer) >= needed
+
+    def varint(self) -> int | None:
+        value = 0
+        shift = 0
+        while True:
+            if not self._fill(1):
+                if shift:
+                    raise ValueError("Truncated varint in ABox binary triple file")
+                return None
+            byte = self.buffer[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read(self, size: int) -> bytes:
+        if not self._fill(size):
+            raise ValueError("Truncated term in ABox binary triple file")
+        data = self.buffer[self.pos : self.pos + size]
+        self.pos += size
+        return data
+
+
+def iter_ntriples_lines(triples: Iterable[Triple]) -> Iterator[str]:
+    for s, p, o in triples:
+        yield f"{s} {p} {o} .\n"
+
+
+def load_binary_graph(path: str | Path, graph=None, batch_size: int = 50000):
+    """把二进制三元组文件加载进 rdflib Graph（分批按 N-Triples 解析）。"""
+    from rdflib import Graph
+
+    graph = graph if graph is not None else Graph()
+    batch: list[str] = []
+    for line in iter_ntriples_lines(read_binary_triples(path)):
+        batch.append(line)
+        if len(batch) >= batch_size:
+            graph.parse(data="".join(batch), format="nt")
+            batch = []
+    if batch:
+        graph.parse(data="".join(batch), format="nt")
+    return graph
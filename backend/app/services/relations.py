@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from itertools import islice, repeat
+from operator import and_, itemgetter, mul
+from typing import Iterable, Optional
+import logging
+import re
+import zlib
+
+from app.utils.config import get_float_setting, get_int_setting
+from app.utils.metrics import ITEMS, timed
+
+logger = logging.getLogger(__name__)
+
+# 每个 LSH 带包含的签名行数；行数越少阈值越低，按查询列与分区大小选用（LSH Ensemble）。
+BAND_ROWS = (1, 2, 4, 8)
+# 超长文本（描述、备注）不会是键，含这类取值的列不生成草图。
+_MAX_KEY_LENGTH = 256
+# 没有取值落入的桶；比较与建索引时跳过。
+EMPTY = 0xFFFFFFFF
+_NAME_TOKEN = re.compile(r"[\W_]+")
+
+# 草图哈希：crc32 再乘奇数常数取低 64 位（乘法散列打散 crc 的线性结构）。比密码学哈希快数倍，
+# 且跨进程、跨重启稳定（内置 hash 对字符串加盐），解析进程池与前端带回的草图可以直接比较。
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+@dataclass
+class ColumnSketch:
+    """列取值草图：values 为非空值个数，distinct 为去重后个数，minhash 为单哈希分桶（OPH）的 MinHash 签名。
+
+    不同值少于桶数时部分桶为空（EMPTY）；估计时只看至少一侧非空的桶，大小悬殊的两列也不会有偏差。
+    """
+
+    values: int
+    distinct: int
+    minhash: list[int]
+    numeric: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def key_text(value) -> Optional[str]:
+    """把单元格取值规整成比较用的键文本；空值、布尔、非整数小数与超长文本返回 None。"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        if not value.is_integer():
+            return None
+        value = int(value)
+    text = str(value).strip()
+    if not text or len(text) > _MAX_KEY_LENGTH:
+        return None
+    return text
+
+
+def distinct_keys(values: list) -> tuple[int, Optional[set[str]]]:
+    """返回 (非空值个数, 去重后的键文本集合)；字符串与整数的规整按 map 在 C 层批量完成。
+
+    含非整数小数的列是度量列、含超长文本的列是描述类字段，都不会是键，集合返回 None。
+    """
+    raw = set(values)
+    count = len(values)
+    for empty in (None, ""):
+        if empty in raw:
+            raw.discard(empty)
+            count -= values.count(empty)
+    if not raw:
+        return count, None
+    if set(map(type, raw)) == {str}:
+        distinct = set(map(str.strip, raw))
+    else:
+        strings = {value for value in raw if value.__class__ is str}
+        distinct = set(map(str.strip, strings))
+        rest = raw - strings
+        integers = {value for value in rest if value.__class__ is int}
+        distinct.update(map(str, integers))
+        for value in rest - integers:
+            if isinstance(value, float) and not value.is_integer():
+                return count, None
+            text = key_text(value)
+            if text is not None:
+                distinct.add(text)
+    distinct.discard("")
+    # 抽查一部分取值即可认出长文本列（描述、备注），这类列不会是键。
+    if not distinct or max(map(len, islice(distinct, 256))) > _MAX_KEY_LENGTH:
+        return count, None
+    return count, distinct
+
+
+def sketch_column(values: list, size: int = 64) -> Optional[ColumnSketch]:
+    """生成列草图：不同值各算一次哈希（按 map 在 C 层批量完成），高 32 位为桶内取值、低位选桶，
+    按整个哈希取最小的若干个即可得到各桶最小值。
+    """
+    count, distinct = distinct_keys(values)
+    if distinct is None:
+        return None
+    hashes = list(map(and_, map(mul, map(zlib.crc32, map(str.encode, distinct)), repeat(_MIX)), repeat(_MASK64)))
+    return ColumnSketch(count, len(distinct), _slot_minimums(hashes, size), all(map(str.isdigit, distinct)))
+
+
+def _slot_minimums(hashes: list[int], size: int) -> list[int]:
+    # 各桶都有值通常只需约 size·ln(size) 个最小哈希。哈希均匀分布，先在 C 层按阈值筛出约 16·size 个
+    # 再排序；阈值以下的都保留了，所以只要各桶都有值，得到的就是全局最小值，否则（极少见）全量排序。
+    limit = size * 16
+    if len(hashes) > limit:
+        bound = (1 << 64) * limit // len(hashes)
+        mins = _fill_slots(sorted(filter(bound.__gt__, hashes)), size)
+        if EMPTY not in mins:
+            return mins
+    return _fill_slots(sorted(hashes), size)
+
+
+def _fill_slots(ordered: list[int], size: int) -> list[int]:
+    mins = [EMPTY] * size
+    left = size
+    for h in ordered:
+        slot = (h & 0xFFFFFFFF) % size
+        if mins[slot] == EMPTY:
+            mins[slot] = h >> 32
+            left -= 1
+            if not left:
+                break
+    return mins
+
+
+def sketch_table(rows: list[dict], fields: list[str], size: Optional[int] = None) -> dict[str, dict]:
+    """按列生成草图（解析数据时调用），结果随表一起返回给前端并在后续请求中带回。
+
+    size 为 None 时取 RELATION_SKETCH_SIZE；设为 0 时不生成草图（只按同名字段推断关系）。
+    """
+    return sketch_columns({field: _column(rows, field) for field in fields}, size)
+
+
+def sketch_columns(columns: dict[str, list], size: Optional[int] = None) -> dict[str, dict]:
+    """按列存放的数据（如 CSV 引擎的解析结果）直接生成草图，不必先从行中取列。"""
+    if size is None:
+        size = get_int_setting("RELATION_SKETCH_SIZE", 64)
+    if size <= 0:
+        return {}
+    size = max(8, size)
+    sketches: dict[str, dict] = {}
+    with timed("data.sketch"):
+        for field, values in columns.items():
+            sketch = sketch_column(values, size)
+            if sketch is not None:
+                sketches[field] = sketch.to_dict()
+    return sketches
+
+
+def _column(rows: list[dict], field: str) -> list:
+    try:
+        return list(map(itemgetter(field), rows))
+    except KeyError:
+        return [row.get(field) for row in rows]
+
+
+def table_sketches(table) -> dict[str, ColumnSketch]:
+    """取表上已有的草图；旧客户端未带草图时按行现算。"""
+    raw = _get(table, "sketches") or {}
+    if not raw:
+        rows = _get(table, "rows") or []
+        if not rows:
+            return {}
+        raw = sketch_table(rows, list(_get(table, "fields") or rows[0].keys()))
+    sketches = {}
+    for field, item in raw.items():
+        get = item.get if isinstance(item, dict) else (lambda key, default=None: getattr(item, key, default))
+        minhash = list(get("minhash") or [])
+        if minhash:
+            sketches[field] = ColumnSketch(
+                int(get("values") or 0), int(get("distinct") or 0), minhash, bool(get("numeric", False))
+            )
+    return sketches
+
+
+def estimate_containment(child: ColumnSketch, parent: ColumnSketch) -> float:
+    """估计 |child ∩ parent| / |child|：由签名相同桶的比例得 Jaccard，再结合两侧去重个数换算。"""
+    if len(child.minhash) != len(parent.minhash) or not child.distinct:
+        return 0.0
+    same = used = 0
+    for a, b in zip(child.minhash, parent.minhash):
+        if a == EMPTY and b == EMPTY:
+            continue
+        used += 1
+        if a == b:
+            same += 1
+    if not used:
+        return 0.0
+    jaccard = same / used
+    overlap = jaccard / (1 + jaccard) * (child.distinct + parent.distinct)
+    return min(1.0, overlap / child.distinct)
+
+
+class SketchIndex:
+    """键列的 LSH 索引：按去重个数的量级分区，每个分区按多种带宽建桶。
+
+    查询列与大得多的键列之间 Jaccard 很低，单一阈值会漏掉外键；按分区上界把包含度阈值换算成
+    Jaccard 阈值后选用最合适的带宽（LSH Ensemble 的做法），只有同桶的列才进入精确估计。
+    """
+
+    def __init__(self) -> None:
+        self.columns: list[tuple[str, str, ColumnSketch]] = []
+        self.buckets: dict[tuple, list[int]] = {}
+        self.partitions: set[int] = set()
+
+    def add(self, table_name: str, field: str, sketch: ColumnSketch) -> None:
+        column_id = len(self.columns)
+        self.columns.append((table_name, field, sketch))
+        partition = sketch.distinct.bit_length()
+        self.partitions.add(partition)
+        signature = sketch.minhash
+        for rows in BAND_ROWS:
+            for band, values in _bands(signature, rows):
+                self.buckets.setdefault((partition, rows, band, values), []).append(column_id)
+
+    def query(self, sketch: ColumnSketch, min_containment: float) -> set[int]:
+        found: set[int] = set()
+        signature = sketch.minhash
+        size = len(signature)
+        q = sketch.distinct
+        for partition in self.partitions:
+            upper = 1 << partition
+            if upper <= q * min_containment / 2:
+                # 分区内的键列去重个数不足以容纳查询列的大部分取值。
+                continue
+            threshold = min_containment * q / (upper + q - min_containment * q)
+            rows = _band_rows(threshold, size)
+            for band, values in _bands(signature, rows):
+                found.update(self.buckets.get((partition, rows, band, values), ()))
+        return found
+
+
+def _bands(signature: list[int], rows: int) -> Iterable[tuple[int, tuple]]:
+    # 含空桶的带不入索引：小列的空桶彼此相同，会把无关的列都拉成候选。
+    for band in range(len(signature) // rows):
+        values = tuple(signature[band * rows : (band + 1) * rows])
+        if EMPTY not in values:
+            yield band, values
+
+
+def _band_rows(threshold: float, size: int) -> int:
+    # 带宽 r、带数 b=size/r 时候选概率陡升点约为 (1/b)^(1/r)；取不超过目标阈值的最大 r。
+    chosen = BAND_ROWS[0]
+    for rows in BAND_ROWS:
+        bands = size // rows
+        if bands and (1 / bands) ** (1 / rows) <= threshold:
+            chosen = rows
+    return chosen
+
+
+def discover_relations(
+    tables: list,
+    min_containment: Optional[float] = None,
+    key_uniqueness: Optional[float] = None,
+) -> list[dict]:
+    """按取值重叠发现候选外键：候选键列（去重比例高）入 LSH 索引，各列查询得到候选列对后再核实包含度。
+
+    两表都带行数据时按实际取值精确计算包含度（只对候选列对，集合按列缓存）；否则用草图估计，
+    两列大小相差很大时估计偏差较大。
+
+    两侧都是纯数字时（自增编号、数量等极易互相包含），还要求外键列名含目标表名或与键列同名；
+    两个键列之间的一对一关系同样要求列名含目标表名。
+    """
+    if min_containment is None:
+        min_containment = get_float_setting("RELATION_MIN_CONTAINMENT", 0.8)
+    if key_uniqueness is None:
+        key_uniqueness = get_float_setting("RELATION_KEY_UNIQUENESS", 0.95)
+    columns: list[tuple[str, str, ColumnSketch]] = []
+    rows_by_table: dict[str, list] = {}
+    for table in tables:
+        name = _get(table, "name")
+        if not name:
+            continue
+        rows_by_table[name] = _get(table, "rows") or []
+        columns.extend((name, field, sketch) for field, sketch in table_sketches(table).items())
+
+    index = SketchIndex()
+    for table_name, field, sketch in columns:
+        if is_key_column(sketch, key_uniqueness):
+            index.add(table_name, field, sketch)
+
+    exact: dict[tuple[str, str], Optional[set[str]]] = {}
+
+    def exact_keys(table_name: str, field: str) -> Optional[set[str]]:
+        key = (table_name, field)
+        if key not in exact:
+            exact[key] = distinct_keys(_column(rows_by_table[table_name], field))[1]
+        return exact[key]
+
+    # 每个外键列只保留最好的目标：先看名称佐证（匹配的表名越长越好），再看包含度。
+    best: dict[tuple[str, str], tuple[tuple[int, float], dict]] = {}
+    with timed("match.relations"):
+        for table_name, field, sketch in columns:
+            if sketch.distinct < 2:
+                continue
+            child_is_key = is_key_column(sketch, key_uniqueness)
+            for column_id in index.query(sketch, min_containment):
+                parent_table, parent_field, parent = index.columns[column_id]
+                if parent_table == table_name:
+                    continue
+                # 先做便宜的名称判断，自增编号之间的大量候选不必再估计包含度。
+                named = _name_affinity(field, parent_table, parent_field, child_is_key)
+                if named is None or (not named and sketch.numeric and parent.numeric):
+                    continue
+                key = (table_name, field)
+                if key in best and best[key][0][0] > named:
+                    continue
+                if rows_by_table[table_name] and rows_by_table[parent_table]:
+                    child_keys = exact_keys(table_name, field) or set()
+                    parent_keys = exact_keys(parent_table, parent_field) or set()
+                    containment = len(child_keys & parent_keys) / len(child_keys) if child_keys else 0.0
+                else:
+                    containment = estimate_containment(sketch, parent)
+                if containment < min_containment:
+                    continue
+                rank = (named, containment)
+                if key in best and best[key][0] >= rank:
+                    continue
+                best[key] = (
+                    rank,
+                    {
+                        "left_table": table_name,
+                        "right_table": parent_table,
+                        "left_field": field,
+                        "right_field": parent_field,
+                        "containment": round(containment, 3),
+                    },
+                )
+    relations = [relation for _, relation in best.values()]
+    relations.sort(key=lambda item: (-item["containment"], item["left_table"], item["left_field"]))
+    if relations:
+        logger.info("按取值草图发现外键 %d 个（候选键列 %d 个）", len(relations), len(index.columns))
+    ITEMS.inc(len(relations), kind="relations_discovered")
+    return relations
+
+
+def is_key_column(sketch: ColumnSketch, uniqueness: float) -> bool:
+    """去重后个数接近非空值个数（不少于 uniqueness 比例）的列视为候选键列。"""
+    return sketch.distinct >= 2 and sketch.distinct >= uniqueness * sketch.values
+
+
+def _name_affinity(field: str, parent_table: str, parent_field: str, child_is_key: bool) -> Optional[int]:
+    """列名对该外键的佐证强度：列名含目标表名时为表名长度 + 1，与键列同名为 1，没有佐证为 0；
+    None 表示不应采纳（键列之间缺少表名佐证）。
+    """
+    child = _name_token(field)
+    table_token = _name_token(str(parent_table).split("::")[-1])
+    if len(table_token) > 3 and table_token.endswith("s"):
+        table_token = table_token[:-1]
+    if table_token and table_token in child:
+        return len(table_token) + 1
+    if child_is_key:
+        return None
+    return 1 if child == _name_token(parent_field) else 0
+
+
+def _name_token(text: str) -> str:
+    return _NAME_TOKEN.sub("", str(text).lower())
+
+
+def infer_relations(tables: list) -> list[dict]:
+    """表间关系：同名字段（shared_fields）加上按取值草图发现的外键列对（left_field/right_field）。
+
+    同名字段按字段倒排索引求表对，不再两两比较所有表。
+    """
+    names = [_get(table, "name") for table in tables]
+    owners: dict[str, list[int]] = {}
+    for position, table in enumerate(tables):
+        for field in dict.fromkeys(_get(table, "fields") or []):
+            owners.setdefault(field, []).append(position)
+    shared: dict[tuple[int, int], list[str]] = {}
+    for field, positions in owners.items():
+        for offset, left in enumerate(positions):
+            for right in positions[offset + 1 :]:
+                shared.setdefault((left, right), []).append(field)
+    relations = [
+        {"left_table": names[left], "right_table": names[right], "shared_fields": sorted(fields)[:5]}
+        for (left, right), fields in sorted(shared.items())
+    ]
+    relations.extend(discover_relations(tables))
+    return relations
+
+
+def _get(item, key: str, default=None):
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Callable, Iterator, Optional
+from urllib.parse import quote
+import hashlib
+import logging
+import math
+import re
+
+from app.utils.config import get_float_setting, get_setting
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_CHECKS = ("bloom", "set", "off")
+
+# 不需要百分号编码的字符（RFC 3986 unreserved）；多数键值整体命中，直接跳过 quote。
+_UNRESERVED = re.compile(r"[A-Za-z0-9_.~-]*")
+
+# (行号, 行) -> 已格式化的主语词项 "<iri>"；键列为空的行返回 None（不生成主语）。
+SubjectFactory = Callable[[int, dict], Optional[str]]
+
+
+@dataclass
+class SubjectSpec:
+    """表的主语规则：keys 为键列；template 中 {base}、{table} 与 {列名} 为占位符；hash 为按内容哈希。"""
+
+    keys: list[str] = field(default_factory=list)
+    template: Optional[str] = None
+    hash: bool = False
+
+
+def subject_specs(items: Optional[list]) -> dict[str, SubjectSpec]:
+    """把请求中的主语规则（模型或 dict）整理成 {表名: SubjectSpec}。"""
+    specs: dict[str, SubjectSpec] = {}
+    for item in items or []:
+        get = item.get if isinstance(item, dict) else (lambda key, default=None: getattr(item, key, default))
+        table_name = get("table_name")
+        if not table_name:
+            continue
+        specs[table_name] = SubjectSpec(
+            keys=list(get("keys", None) or []),
+            template=get("template", None) or None,
+            hash=bool(get("hash", False)),
+        )
+    return specs
+
+
+def key_text(value) -> str:
+    """键值的规范文本：与 CSV 引擎推断出的列类型无关（1、1.0 与 "1" 相同，-0.0 为 "0"），首尾空白不计。"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def encode_segment(value) -> str:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    text = key_text(value)
+    if _UNRESERVED.fullmatch(text):
+        return text
+    return quote(text, safe="")
+
+
+def compile_subject(table_name: str, base: str, spec: SubjectSpec | None) -> SubjectFactory:
+    """按规则预编译主语生成函数：模板拆成常量片段与列名，运行时只做拼接与必要的编码。
+
+    哈希按各键值的规范文本（key_text）计算，主语不随列类型推断变化；模板主语的键列为空时返回 None，
+    由调用方跳过该行，同一张表里不会混入按行号生成的主语。
+    """
+    table_token = quote(str(table_name))
+    row_prefix = f"<{base}table/{table_token}/row/"
+
+    def by_index(index: int, row: dict) -> str:
+        return f"{row_prefix}{index}>"
+
+    if spec is None or (not spec.keys and not spec.template and not spec.hash):
+        return by_index
+
+    if spec.hash:
+        hash_prefix = f"<{base}table/{table_token}/hash/"
+        keys = list(spec.keys)
+
+        def by_hash(index: int, row: dict) -> str:
+            if keys:
+                values = [row.get(key) for key in keys]
+            else:
+                values = [item for pair in sorted(row.items(), key=lambda pair: str(pair[0])) for item in pair]
+            text = "\x1f".join("" if value is None else key_text(value) for value in values)
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16)
+            return f"{hash_prefix}{digest.hexdigest()}>"
+
+        return by_hash
+
+    parts = _template_parts(table_name, base, spec)
+    columns = [name for _, name in parts if name]
+    if not columns:
+        raise ValueError(f"Subject template for table {table_name} has no key columns")
+
+    # 模板预编译成位置参数格式串，每行只取键值、编码后一次 format。
+    pattern = "<" + "".join(literal.replace("{", "{{").replace("}", "}}") + ("{}" if name else "") for literal, name in parts) + ">"
+    render = pattern.format
+
+    def by_template(index: int, row: dict) -> Optional[str]:
+        values = []
+        for name in columns:
+            value = row.get(name)
+            if value is None or value == "":
+                return None
+            values.append(encode_segment(value))
+        return render(*values)
+
+    return by_template
+
+
+
+def subject_template(table_name: str, base: str, spec: SubjectSpec | None) -> Optional[str]:
+    """与 compile_subject 相同规则的 R2RML rr:template（{列名} 占位）；行号或内容哈希主语无法用模板表达，返回 None。"""
+    if spec is None or spec.hash or (not spec.keys and not spec.template):
+        return None
+    parts = _template_parts(table_name, base, spec)
+    if not any(name for _, name in parts):
+        raise ValueError(f"Subject template for table {table_name} has no key columns")
+    # R2RML 模板中的字面花括号与反斜杠需转义。
+    escape = str.maketrans({"\\": "\\\\", "{": "\\{", "}": "\\}"})
+    return "".join(literal.translate(escape) + (f"{{{name}}}" if name else "") for literal, name in parts)
+
+
+def _template_parts(table_name: str, base: str, spec: SubjectSpec) -> list[tuple[str, Optional[str]]]:
+    """把主语模板拆成 (常量片段, 列名) 序列，{base} 与 {table} 已展开。"""
+    table_token = quote(str(table_name))
+    template = spec.template or "{base}table/{table}/key/" + "/".join(f"{{{key}}}" for key in spec.keys)
+    parts: list[tuple[str, Optional[str]]] = []
+    for literal, name, _, _ in Formatter().parse(template):
+        if name == "base":
+            literal, name = literal + base, None
+        elif name == "table":
+            literal, name = literal + table_token, None
+        parts.append((literal, name))
+    return parts
+
+# 12 位索引 -> 块内 2 个位的掩码；k 个位按每次查表 2 个生成。
+_PAIR_MASKS = [(1 << (index & 63)) | (1 << (index >> 6)) for index in range(4096)]
+
+
+class BloomFilter:
+    """分块 Bloom 过滤器：按预计条目数与误判率定长，每个条目的 k 个位都落在同一个 64 位块内。
+
+    128 位哈希的前半选块、后半每 12 位查表得到块内 2 个位，一次读写完成，比逐位散列快得多；
+    误判率略高于标准 Bloom，疑似重复最终都会精确确认。
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-9), 0.5)
+        size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hashes = min(10, max(1, round(size / capacity * math.log(2))))
+        self.pairs = (hashes + 1) // 2
+        self.blocks = array("Q", bytes(8 * ((size + 63) // 64)))
+
+    def add(self, key: int, bits: int) -> bool:
+        """加入条目（key 选块，bits 给出块内位置），返回加入前是否可能已存在。"""
+        block = key % len(self.blocks)
+        mask = 0
+        for _ in range(self.pairs):
+            mask |= _PAIR_MASKS[bits & 0xFFF]
+            bits >>= 12
+        current = self.blocks[block]
+        if current & mask == mask:
+            return True
+        self.blocks[block] = current | mask
+        return False
+
+
+class DuplicateDetector:
+    """主语重复检测：按 64 位摘要用 Bloom 过滤器（或摘要集合）找出疑似重复；
+
+    每行的摘要另存于紧凑数组（8 字节/行），表结束后只按数组精确计数，无需重新生成主语。
+    """
+
+    def __init__(self, mode: str, capacity: int, error_rate: float = 0.001) -> None:
+        self.bloom = BloomFilter(capacity, error_rate) if mode == "bloom" else None
+        self.seen: set[int] = set()
+        self.keys = array("Q")
+        self.suspects: dict[int, str] = {}
+
+    def add(self, subject: str) -> None:
+        digest = hashlib.blake2b(subject.encode("utf-8"), digest_size=16).digest()
+        key = int.from_bytes(digest[:8], "little")
+        self.keys.append(key)
+        if self.bloom is not None:
+            maybe = self.bloom.add(key, int.from_bytes(digest[8:], "little"))
+        else:
+            maybe = key in self.seen
+            self.seen.add(key)
+        if maybe and key not in self.suspects:
+            self.suspects[key] = subject
+
+    def confirm(self) -> dict[str, int]:
+        """返回确实出现多次的主语及次数。"""
+        if not self.suspects:
+            return {}
+        counts = dict.fromkeys(self.suspects, 0)
+        for key in self.keys:
+            if key in counts:
+                counts[key] += 1
+        return {self.suspects[key]: count for key, count in counts.items() if count > 1}
+
+
+def duplicate_check_mode() -> str:
+    return (get_setting("ABOX_DUPLICATE_CHECK", "bloom") or "bloom").strip().lower()
+
+
+def track_subjects(
+    table_name: str,
+    rows: list,
+    subject_of: SubjectFactory,
+    report: Optional[dict] = None,
+    check: Optional[str] = None,
+) -> Iterator[tuple[str, dict]]:
+    """逐行产出 (主语, 行) 并检测键重复；表处理完后按 ABOX_DUPLICATE_POLICY 报告或报错。键列为空的行跳过并告警。
+
+    check 覆盖 ABOX_DUPLICATE_CHECK（增量生成依赖主语唯一，不允许关闭检测）。
+    """
+    mode = check or duplicate_check_mode()
+    detector = None
+    if mode in DUPLICATE_CHECKS and mode != "off":
+        detector = DuplicateDetector(mode, len(rows), get_float_setting("ABOX_BLOOM_ERROR_RATE", 0.001))
+    skipped = 0
+    for index, row in enumerate(rows, start=1):
+        subject = subject_of(index, row)
+        if subject is None:
+            skipped += 1
+            continue
+        if detector is not None:
+            detector.add(subject)
+        yield subject, row
+    if skipped:
+        logger.warning("表 %s 有 %d 行键列为空，无法生成主语，已跳过", table_name, skipped)
+    if detector is None:
+        return
+    duplicates = detector.confirm()
+    if not duplicates:
+        return
+    sample = ", ".join(list(duplicates)[:5])
+    policy = (get_setting("ABOX_DUPLICATE_POLICY", "warn") or "warn").strip().lower()
+    if policy == "error":
+        raise ValueError(f"Duplicate subject keys in table {table_name}: {sample}")
+    logger.warning("表 %s 有 %d 个重复主语（后出现的行会合并到同一主语）：%s", table_name, len(duplicates), sample)
+    if report is not None:
+        report[table_name] = sum(duplicates.values()) - len(duplicates)
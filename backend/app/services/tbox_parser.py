@@ -1,8 +1,10 @@
+from pathlib import Path
 from typing import List
 
 from rdflib import Graph, RDF, RDFS, OWL
 
 from app.models.schemas import IriItem, ObjectPropertyItem, PropertyItem
+from app.utils.metrics import BYTES_IN, BYTES_OUT, ITEMS, timed
 from app.utils.text import local_name_from_iri
 
 
@@ -15,7 +17,8 @@ EXTENSION_FORMAT_MAP = {
 }
 
 
-def parse_tbox(content: bytes, filename: str | None) -> dict:
+def parse_tbox(content: bytes | Path, filename: str | None) -> dict:
+    """content 可以是 bytes 或落盘文件路径；路径交给 rdflib 直接按文件读取。"""
     graph = Graph()
     fmt = None
     if filename:
@@ -24,7 +27,13 @@ def parse_tbox(content: bytes, filename: str | None) -> dict:
             if lower.endswith(ext):
                 fmt = value
                 break
-    graph.parse(data=content, format=fmt)
+    with timed("tbox.parse"):
+        if isinstance(content, Path):
+            BYTES_IN.inc(content.stat().st_size, source="tbox")
+            graph.parse(source=str(content), format=fmt)
+        else:
+            BYTES_IN.inc(len(content), source="tbox")
+            graph.parse(data=content, format=fmt)
 
     properties: dict[str, object] = {}
     for prop in graph.subjects(RDF.type, OWL.DatatypeProperty):
@@ -53,7 +62,10 @@ def parse_tbox(content: bytes, filename: str | None) -> dict:
     results.sort(key=lambda item: item.label or item.local_name or item.iri)
     classes = _extract_classes(graph)
     object_props = _extract_object_properties(graph)
-    ttl = graph.serialize(format="turtle")
+    ITEMS.inc(len(results), kind="tbox_properties")
+    with timed("tbox.serialize"):
+        ttl = graph.serialize(format="turtle")
+    BYTES_OUT.inc(len(ttl.encode("utf-8")), target="tbox_ttl")
     return {
         "properties": results,
         "classes": classes,
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Lock
+from typing import Iterator
+import sqlite3
+
+from app.services.rdf_output import Triple
+from app.utils.config import get_int_setting
+from app.utils.metrics import timed
+
+TRIPLE_STORES = ("oxigraph", "sqlite")
+
+
+class OxigraphSink:
+    """写入本地 Oxigraph 持久化库（可选安装 pyoxigraph）：每批按 N-Quads 在一个事务内装载。"""
+
+    kind = "oxigraph"
+
+    def __init__(self, path: Path, batch_size: int = 10000) -> None:
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.store = _open_oxigraph(path)
+        self.triples = 0
+        self.batches = 0
+        self.removed = 0
+        self._pending: list[str] = []
+
+    def write(self, triples: list[Triple], graph: str | None = None) -> None:
+        suffix = f" {graph} .\n" if graph else " .\n"
+        self._pending.extend([f"{s} {p} {o}{suffix}" for s, p, o in triples])
+        while len(self._pending) >= self.batch_size:
+            batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+            self._load(batch)
+
+    def remove(self, triples: list[Triple], graph: str | None = None) -> None:
+        """按批以 SPARQL DELETE DATA 删除（增量更新时使用）。"""
+        for start in range(0, len(triples), self.batch_size):
+            body = "\n".join(f"{s} {p} {o} ." for s, p, o in triples[start : start + self.batch_size])
+            if graph:
+                body = f"GRAPH {graph} {{ {body} }}"
+            with timed("store.batch"):
+                self.store.update(f"DELETE DATA {{ {body} }}")
+            self.batches += 1
+        self.removed += len(triples)
+
+    def clear_graphs(self, graphs: list[str]) -> None:
+        """清空命名图（全量重新装载前调用）。"""
+        for graph in graphs:
+            with timed("store.batch"):
+                self.store.update(f"CLEAR SILENT GRAPH {graph}")
+            self.batches += 1
+
+    def _load(self, lines: list[str]) -> None:
+        from pyoxigraph import RdfFormat
+
+        with timed("store.batch"):
+            self.store.load(input="".join(lines).encode("utf-8"), format=RdfFormat.N_QUADS)
+        self.triples += len(lines)
+        self.batches += 1
+
+    def close(self) -> None:
+        if self._pending:
+            self._load(self._pending)
+            self._pending = []
+        self.store.flush()
+
+    def query(self, sparql: str):
+        return self.store.query(sparql)
+
+
+class SqliteSink:
+    """写入 SQLite 三元组表（标准库，无需额外依赖）：每批一个事务，重复三元组忽略。"""
+
+    kind = "sqlite"
+
+    def __init__(self, path: Path, batch_size: int = 10000) -> None:
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS quads ("
+            "s TEXT NOT NULL, p TEXT NOT NULL, o TEXT NOT NULL, g TEXT NOT NULL DEFAULT '', "
+            "PRIMARY KEY (s, p, o, g)) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS quads_po ON quads (p, o)")
+        self.connection.commit()
+        self.triples = 0
+        self.batches = 0
+        self.removed = 0
+        self._pending: list[tuple[str, str, str, str]] = []
+
+    def write(self, triples: list[Triple], graph: str | None = None) -> None:
+        g = graph or ""
+        self._pending.extend([(s, p, o, g) for s, p, o in triples])
+        while len(self._pending) >= self.batch_size:
+            batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+            self._load(batch)
+
+    def remove(self, triples: list[Triple], graph: str | None = None) -> None:
+        g = graph or ""
+        for start in range(0, len(triples), self.batch_size):
+            rows = [(s, p, o, g) for s, p, o in triples[start : start + self.batch_size]]
+            before = self.connection.total_changes
+            with timed("store.batch"):
+                with self.connection:
+                    self.connection.executemany("DELETE FROM quads WHERE s = ? AND p = ? AND o = ? AND g = ?", rows)
+            self.removed += self.connection.total_changes - before
+            self.batches += 1
+
+    def clear_graphs(self, graphs: list[str]) -> None:
+        """清空命名图（全量重新装载前调用）。g 不在索引里：一次删除全部命名图只扫描一遍表，
+        比为 g 建索引（每次插入多维护一棵 B 树）更划算。
+        """
+        if not graphs:
+            return
+        before = self.connection.total_changes
+        with timed("store.batch"):
+            with self.connection:
+                self.connection.execute(
+                    f"DELETE FROM quads WHERE g IN ({', '.join('?' * len(graphs))})", list(graphs)
+                )
+        self.removed += self.connection.total_changes - before
+        self.batches += 1
+
+    def _load(self, rows: list[tuple[str, str, str, str]]) -> None:
+        # INSERT OR IGNORE 会跳过已存在的三元组，按实际变更行数计数。
+        before = self.connection.total_changes
+        with timed("store.batch"):
+            with self.connection:
+                self.connection.executemany("INSERT OR IGNORE INTO quads (s, p, o, g) VALUES (?, ?, ?, ?)", rows)
+        self.triples += self.connection.total_changes - before
+        self.batches += 1
+
+    def close(self) -> None:
+        if self._pending:
+            self._load(self._pending)
+            self._pending = []
+        self.connection.close()
+
+    def match(self, subject: str | None = None, predicate: str | None = None, obj: str | None = None) -> Iterator[Triple]:
+        """按 N-Triples 词项做三元组模式匹配，None 为通配。"""
+        clauses = []
+        params = []
+        for column, value in (("s", subject), ("p", predicate), ("o", obj)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self.connection.execute(f"SELECT s, p, o FROM quads{where}", params)
+
+
+_oxigraph_stores: dict[Path, object] = {}
+_oxigraph_lock = Lock()
+
+
+def _open_oxigraph(path: Path):
+    # RocksDB 目录同一进程只能打开一次，按路径复用 Store 实例（Store 本身线程安全）。
+    try:
+        from pyoxigraph import Store
+    except ImportError as exc:
+        raise ValueError("oxigraph store requires the optional 'pyoxigraph' package") from exc
+    key = path.resolve()
+    with _oxigraph_lock:
+        store = _oxigraph_stores.get(key)
+        if store is None:
+            path.mkdir(parents=True, exist_ok=True)
+            store = Store(str(path))
+            _oxigraph_stores[key] = store
+        return store
+
+
+def close_triple_stores() -> None:
+    """释放已打开的 Oxigraph 库（RocksDB 锁随 Store 释放）。"""
+    with _oxigraph_lock:
+        for store in _oxigraph_stores.values():
+            store.flush()
+        _oxigraph_stores.clear()
+
+
+def open_triple_sink(kind: str, path: str | Path, batch_size: int | None = None):
+    """batch_size 为 None 时取 ABOX_STORE_BATCH_SIZE。"""
+    name = (kind or "").strip().lower()
+    if batch_size is None:
+        batch_size = get_int_setting("ABOX_STORE_BATCH_SIZE", 10000)
+    if name not in TRIPLE_STORES:
+        raise ValueError(f"Unsupported triple store: {kind}")
+    if name == "oxigraph":
+        return OxigraphSink(Path(path), batch_size)
+    return SqliteSink(Path(path), batch_size)
+
+
+def default_store_path(data_dir: str | Path, kind: str) -> Path:
+    store_dir = Path(data_dir) / "store"
+    return store_dir / "oxigraph" if kind == "oxigraph" else store_dir / "abox.sqlite3"
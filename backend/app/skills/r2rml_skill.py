@@ -1,5 +1,35 @@
-from app.services.matcher import match_properties
+from app.services.matcher import (
+    TABLE_CONTEXT_MODES,
+    match_properties,
+    match_properties_incremental,
+    remember_match_results,
+)
+from app.services.relations import infer_relations
 
 
-def run_matching(properties, tables, mode: str, threshold: float, skill_doc: str | None):
-    return match_properties(properties, tables, mode, threshold, skill_doc)
+def run_matching(
+    properties,
+    tables,
+    mode: str,
+    threshold: float,
+    skill_doc: str | None,
+    on_result=None,
+    session_id: str | None = None,
+):
+    # 表间关系只推断一次，匹配与写入会话状态共用。
+    relations = infer_relations(tables) if mode in TABLE_CONTEXT_MODES else None
+    results = match_properties(properties, tables, mode, threshold, skill_doc, on_result, relations=relations)
+    if session_id:
+        remember_match_results(properties, tables, mode, threshold, skill_doc, session_id, results, relations)
+    return results
+
+
+def run_incremental_matching(
+    properties,
+    tables,
+    mode: str,
+    threshold: float,
+    skill_doc: str | None,
+    session_id: str | None,
+):
+    return match_properties_incremental(properties, tables, mode, threshold, skill_doc, session_id)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Hashable
+
+from app.utils.config import get_int_setting
+from app.utils.metrics import REGISTRY
+
+CACHE_ENTRIES = REGISTRY.gauge("r2rml_cache_entries", "Entries held by in-process LRU caches.", ("cache",))
+CACHE_HITS = REGISTRY.counter("r2rml_cache_hits_total", "Lookups served by in-process LRU caches.", ("cache",))
+CACHE_MISSES = REGISTRY.counter("r2rml_cache_misses_total", "Lookups missed by in-process LRU caches.", ("cache",))
+
+_MISSING = object()
+_caches: list["LRUCache"] = []
+_published: dict[tuple[str, str], int] = {}
+_publish_lock = Lock()
+
+
+class LRUCache:
+    """进程内共享的定长 LRU 缓存（线程安全），记录命中/未命中次数。
+
+    容量取自设置项 size_setting（0 关闭缓存），首次写入时才读取，保证 .env 已加载。
+    """
+
+    def __init__(self, name: str, size_setting: str, default_size: int) -> None:
+        self.name = name
+        self.size_setting = size_setting
+        self.default_size = default_size
+        self.hits = 0
+        self.misses = 0
+        self._max_size: int | None = None
+        self._items: OrderedDict[Hashable, object] = OrderedDict()
+        self._lock = Lock()
+        _caches.append(self)
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            self._max_size = max(0, get_int_setting(self.size_setting, self.default_size))
+        return self._max_size
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]):
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is not _MISSING:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        # 计算放在锁外：并发时同一键可能重复计算一次，结果相同，不影响正确性。
+        value = compute()
+        limit = self.max_size
+        if limit:
+            with self._lock:
+                self._items[key] = value
+                if len(self._items) > limit:
+                    self._items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def cache_stats() -> dict[str, dict]:
+    return {cache.name: cache.stats() for cache in _caches}
+
+
+def publish_cache_metrics() -> None:
+    """把各缓存当前的条目数与命中次数写入 /metrics（查询路径上只做整数自增，不直接操作指标）。
+
+    命中/未命中是计数器：每次只累加自上次发布以来的增量；clear() 把计数清零后，从零重新累计。
+    """
+    with _publish_lock:
+        for cache in _caches:
+            CACHE_ENTRIES.set(len(cache._items), cache=cache.name)
+            for counter, kind, current in ((CACHE_HITS, "hits", cache.hits), (CACHE_MISSES, "misses", cache.misses)):
+                previous = _published.get((cache.name, kind), 0)
+                counter.inc(current - previous if current >= previous else current, cache=cache.name)
+                _published[(cache.name, kind)] = current
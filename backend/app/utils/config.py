@@ -6,6 +6,20 @@ def get_setting(name: str, default: str | None = None) -> str | None:
     return value
 
 
+def get_int_setting(name: str, default: int) -> int:
+    try:
+        return int(get_setting(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_float_setting(name: str, default: float) -> float:
+    try:
+        return float(get_setting(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
 def is_truthy(value: str | None) -> bool:
     if value is None:
         return False
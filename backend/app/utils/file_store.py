@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.utils.config import get_int_setting, get_setting
+from app.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+FILE_STORE_BYTES = REGISTRY.gauge(
+    "r2rml_file_store_bytes",
+    "Bytes currently held by the upload file store.",
+    ("tier",),
+)
+FILE_STORE_EVICTIONS = REGISTRY.counter(
+    "r2rml_file_store_evictions_total",
+    "Upload entries removed without being consumed.",
+    ("reason",),
+)
+FILE_STORE_ENTRIES = REGISTRY.gauge(
+    "r2rml_file_store_entries",
+    "Upload entries currently held by the file store.",
+    ("tier",),
+)
+
+_stores: list["FileStore"] = []
+_WORKER_PREFIX = "worker-"
+
+
+@dataclass
+class StoredFile:
+    filename: str
+    size: int
+    path: Path
+    created_at: float = field(default_factory=time.monotonic)
+
+    @contextmanager
+    def buffer(self):
+        """以只读缓冲区形式访问内容：按 mmap 映射读取落盘文件。"""
+        if self.size == 0:
+            yield b""
+            return
+        with open(self.path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+    @property
+    def source(self) -> Path:
+        """交给解析器的输入：落盘文件路径。"""
+        return self.path
+
+    @property
+    def content(self) -> bytes:
+        with self.buffer() as buffer:
+            return bytes(buffer)
+
+    def close(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "StoredFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SpoolWriter:
+    def __init__(self, file_id: str, path: Path) -> None:
+        self.file_id = file_id
+        self.path = path
+        self.size = 0
+        self._handle = open(path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._handle.write(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class FileStore:
+    """上传内容暂存：上传按块写入落盘目录（spool），不在内存中保留整份内容；
+
+    未被取走的条目超过 TTL 后清理，避免代理在调用工具前失败导致内容永久驻留。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 600.0,
+        spill_dir: Path | None = None,
+        owns_spill_dir: bool = False,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = owns_spill_dir or spill_dir is None
+        self._files: dict[str, StoredFile] = {}
+        self._disk_bytes = 0
+        self._expired = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper: threading.Thread | None = None
+
+    @contextmanager
+    def spool(self, filename: str):
+        """分块写入上传内容：直接写到落盘目录，结束后登记为条目，写入失败时删除半截文件。"""
+        self.sweep()
+        file_id = uuid.uuid4().hex
+        writer = SpoolWriter(file_id, self._spill_path(file_id))
+        try:
+            yield writer
+        except BaseException:
+            writer.close()
+            writer.path.unlink(missing_ok=True)
+            raise
+        writer.close()
+        with self._lock:
+            self._disk_bytes += writer.size
+            self._files[file_id] = StoredFile(filename=filename, size=writer.size, path=writer.path)
+            self._publish()
+
+    def pop(self, file_id: str) -> StoredFile:
+        """取走条目；落盘内容由调用方在 close() 或 with 块结束时删除。"""
+        with self._lock:
+            stored = self._files.pop(file_id, None)
+            if stored is not None:
+                self._forget(stored)
+        if stored is None:
+            raise ValueError(f"Unknown file id: {file_id}")
+        return stored
+
+    def pop_many(self, file_ids: list[str]) -> list[StoredFile]:
+        return [self.pop(file_id) for file_id in file_ids]
+
+    def discard(self, file_ids: list[str]) -> None:
+        """丢弃尚未被取走的条目（工具调用失败时由调用方清理）。"""
+        with self._lock:
+            removed = [self._files.pop(file_id) for file_id in file_ids if file_id in self._files]
+            for stored in removed:
+                self._forget(stored)
+        for stored in removed:
+            FILE_STORE_EVICTIONS.inc(reason="discarded")
+            stored.close()
+
+    def sweep(self) -> int:
+        if self.ttl_seconds <= 0:
+            return 0
+        deadline = time.monotonic() - self.ttl_seconds
+        with self._lock:
+            expired = [file_id for file_id, stored in self._files.items() if stored.created_at < deadline]
+            removed = [self._files.pop(file_id) for file_id in expired]
+            for stored in removed:
+                self._forget(stored)
+            self._expired += len(removed)
+        for stored in removed:
+            FILE_STORE_EVICTIONS.inc(reason="expired")
+            stored.close()
+        if removed:
+            logger.warning("清理过期未使用的上传文件 %d 个", len(removed))
+        return len(removed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._files),
+                "disk_bytes": self._disk_bytes,
+                "expired_total": self._expired,
+            }
+
+    def start_sweeper(self, interval_seconds: float) -> None:
+        """后台定时清理过期条目：sweep 平时只在写入时触发，没有新上传时过期文件会一直留在磁盘上。"""
+        if interval_seconds <= 0 or self.ttl_seconds <= 0 or self._sweeper is not None:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.sweep()
+                except Exception as exc:
+                    logger.warning("上传文件定时清理失败：%s", exc)
+
+        self._sweeper = threading.Thread(target=run, name="file-store-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            removed = list(self._files.values())
+            self._files.clear()
+            self._disk_bytes = 0
+            self._publish()
+        for stored in removed:
+            stored.close()
+        if self._owns_spill_dir and self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def _spill_path(self, file_id: str) -> Path:
+        with self._lock:
+            if self._spill_dir is None:
+                self._spill_dir = Path(tempfile.mkdtemp(prefix="r2rml-upload-"))
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+            return self._spill_dir / file_id
+
+    def _forget(self, stored: StoredFile) -> None:
+        # 调用方需持有 _lock。
+        self._disk_bytes -= stored.size
+        self._publish()
+
+    def _publish(self) -> None:
+        FILE_STORE_BYTES.set(self._disk_bytes, tier="disk")
+
+
+def create_file_store() -> FileStore:
+    spill_root = get_setting("FILE_STORE_SPILL_DIR")
+    ttl_seconds = get_int_setting("FILE_STORE_TTL_SECONDS", 600)
+    spill_dir = None
+    if spill_root:
+        # 多个工作进程共用同一落盘目录时，各进程只写自己的子目录，启动清理不会删到其他进程正在用的文件。
+        spill_dir = Path(spill_root) / f"{_WORKER_PREFIX}{os.getpid()}"
+        _remove_stale_spills(Path(spill_root), ttl_seconds)
+    store = FileStore(
+        ttl_seconds=ttl_seconds,
+        spill_dir=spill_dir,
+        owns_spill_dir=spill_dir is not None,
+    )
+    store.start_sweeper(get_int_setting("FILE_STORE_SWEEP_SECONDS", 60))
+    atexit.register(store.close)
+    _stores.append(store)
+    return store
+
+
+def publish_file_store_metrics() -> None:
+    """把各暂存区当前的条目数写入 /metrics（字节数在每次增删时已更新）。"""
+    FILE_STORE_ENTRIES.set(sum(store.stats()["entries"] for store in _stores), tier="disk")
+
+
+def _remove_stale_spills(spill_root: Path, ttl_seconds: float) -> None:
+    """启动时清理共享落盘目录中的遗留内容。
+
+    worker-<pid> 子目录在对应进程已退出（或 pid 与当前进程相同，即上次同 pid 进程的遗留）时整个删除，
+    仍在运行的进程的子目录不动；旧版本直接写在根目录下的文件超过 TTL 才删除。
+    """
+    if not spill_root.is_dir():
+        return
+    deadline = time.time() - ttl_seconds
+    removed = 0
+    for path in spill_root.iterdir():
+        try:
+            if path.is_dir() and path.name.startswith(_WORKER_PREFIX):
+                pid = path.name[len(_WORKER_PREFIX):]
+                if pid.isdigit() and (int(pid) == os.getpid() or not _process_alive(int(pid))):
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            elif ttl_seconds > 0 and path.is_file() and path.stat().st_mtime < deadline:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    if removed:
+        logger.warning("清理落盘目录中遗留的上传文件或进程子目录 %d 个：%s", removed, spill_root)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
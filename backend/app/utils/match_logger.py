@@ -1,28 +1,187 @@
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable
 
+from app.utils.config import get_int_setting, get_setting
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_LOG_PATH = Path(__file__).resolve().parents[3] / "logs" / "match_reason.log"
+
+
+def _format_text(entry: dict) -> str:
+    timestamp = entry.get("timestamp") or "-"
+    level = entry.get("level") or "INFO"
+    property_label = entry.get("property_label") or "-"
+    group_name = entry.get("group_name") or "-"
+    field = entry.get("field") or "-"
+    result = entry.get("result") or "-"
+    reason = entry.get("reason") or ""
+    return f"{level}：{timestamp} {property_label} {group_name} {field} {result} {reason}".strip()
+
+
+def _format_jsonl(entry: dict) -> str:
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class MatchLogSink:
+    """后台写匹配日志：请求线程只入队，写线程批量落盘并按大小/时间轮转。"""
+
+    def __init__(
+        self,
+        path: Path,
+        fmt: str = "text",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        rotate_seconds: int = 0,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.formatter = _format_jsonl if fmt == "jsonl" else _format_text
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._opened_at = time.time()
+
+    def submit(self, entries: Iterable[dict]) -> None:
+        self._ensure_started()
+        dropped = 0
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            self.dropped += dropped
+            logger.warning("匹配日志队列已满，本次丢弃=%d，累计丢弃=%d", dropped, self.dropped)
+
+    def flush(self, timeout: float | None = None) -> None:
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="match-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception:
+                logger.exception("写入匹配日志失败")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._rotate_if_needed()
+        lines = "".join(self.formatter(entry) + "\n" for entry in batch)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+    def _rotate_if_needed(self) -> None:
+        if not self.path.exists():
+            self._opened_at = time.time()
+            return
+        too_large = self.max_bytes > 0 and self.path.stat().st_size >= self.max_bytes
+        too_old = self.rotate_seconds > 0 and time.time() - self._opened_at >= self.rotate_seconds
+        if not too_large and not too_old:
+            return
+        if self.backup_count <= 0:
+            self.path.unlink()
+        else:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{index}")
+                if source.exists():
+                    source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        self._opened_at = time.time()
+
+
+_default_sink: MatchLogSink | None = None
+_sink_lock = threading.Lock()
+
+
+def get_match_log_sink() -> MatchLogSink:
+    global _default_sink
+    if _default_sink is None:
+        with _sink_lock:
+            if _default_sink is None:
+                raw_path = get_setting("MATCH_LOG_PATH")
+                fmt = (get_setting("MATCH_LOG_FORMAT", "text") or "text").lower()
+                path = Path(raw_path) if raw_path else DEFAULT_LOG_PATH
+                if fmt == "jsonl" and not raw_path:
+                    path = path.with_suffix(".jsonl")
+                _default_sink = MatchLogSink(
+                    path,
+                    fmt=fmt,
+                    max_bytes=get_int_setting("MATCH_LOG_MAX_BYTES", 10 * 1024 * 1024),
+                    backup_count=get_int_setting("MATCH_LOG_BACKUP_COUNT", 5),
+                    rotate_seconds=get_int_setting("MATCH_LOG_ROTATE_SECONDS", 0),
+                )
+                atexit.register(_default_sink.close)
+    return _default_sink
+
 
 def append_match_logs(entries: Iterable[dict]) -> None:
-    log_path = Path(__file__).resolve().parents[3] / "logs" / "match_reason.log"
-    log_path.parent.mkdir(parents=True, exist_ok=True)
     default_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    stamped = []
+    for entry in entries:
+        if not entry.get("timestamp"):
+            entry = {**entry, "timestamp": default_timestamp}
+        stamped.append(entry)
     try:
-        with log_path.open("a", encoding="utf-8") as handle:
-            for entry in entries:
-                timestamp = entry.get("timestamp") or default_timestamp
-                level = entry.get("level") or "INFO"
-                property_label = entry.get("property_label") or "-"
-                group_name = entry.get("group_name") or "-"
-                field = entry.get("field") or "-"
-                result = entry.get("result") or "-"
-                reason = entry.get("reason") or ""
-                line = f"{level}：{timestamp} {property_label} {group_name} {field} {result} {reason}".strip()
-                handle.write(line + "\n")
+        get_match_log_sink().submit(stamped)
     except Exception:
         logger.exception("写入匹配日志失败")
+
+
+def shutdown_match_logs() -> None:
+    if _default_sink is not None:
+        _default_sink.close()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+import json
+import logging
+
+from app.utils.config import get_setting
+
+logger = logging.getLogger(__name__)
+
+# 常见数据表字段/类名的同义词：规范词（英文）-> 别名（中文词与英文缩写）。
+# 中文标签按最长匹配切分后替换成规范词，中英文命名的同一概念就能直接比较。
+DEFAULT_SYNONYMS: dict[str, list[str]] = {
+    "id": ["标识", "标识符", "主键", "序号", "identifier"],
+    "name": ["名称", "名字", "姓名", "名"],
+    "email": ["邮箱", "电子邮箱", "电子邮件", "邮件", "mail", "e mail"],
+    "phone": ["电话", "手机", "手机号", "电话号码", "联系电话", "联系方式", "tel", "mobile", "telephone"],
+    "address": ["地址", "住址", "addr"],
+    "city": ["城市", "市"],
+    "province": ["省", "省份"],
+    "country": ["国家", "国别"],
+    "region": ["区域", "地区", "片区"],
+    "age": ["年龄"],
+    "gender": ["性别", "sex"],
+    "birthday": ["生日", "出生日期", "birth date", "dob"],
+    "price": ["价格", "单价", "售价"],
+    "amount": ["金额", "总额", "总金额", "amt"],
+    "quantity": ["数量", "件数", "qty"],
+    "weight": ["重量"],
+    "height": ["高度", "身高"],
+    "score": ["评分", "分数", "得分"],
+    "date": ["日期"],
+    "time": ["时间"],
+    "created": ["创建时间", "创建日期", "create time"],
+    "updated": ["更新时间", "修改时间", "update time"],
+    "status": ["状态"],
+    "code": ["编码", "代码", "编号", "代号", "no"],
+    "number": ["号码", "号", "num"],
+    "type": ["类型", "种类"],
+    "category": ["类别", "分类", "品类"],
+    "level": ["级别", "等级", "层级"],
+    "url": ["链接", "网址", "地址链接", "link"],
+    "title": ["标题", "题目", "职称"],
+    "description": ["描述", "说明", "简介", "desc"],
+    "remark": ["备注", "附注", "note", "notes", "comment"],
+    "owner": ["负责人", "所有者", "责任人"],
+    "channel": ["渠道"],
+    "source": ["来源"],
+    "customer": ["客户", "顾客", "cust"],
+    "order": ["订单"],
+    "product": ["产品", "商品", "货品"],
+    "supplier": ["供应商", "供货商", "vendor"],
+    "employee": ["员工", "职员", "雇员", "emp"],
+    "department": ["部门", "dept"],
+    "invoice": ["发票"],
+    "shipment": ["运单", "发货", "物流单"],
+    "contract": ["合同", "合约"],
+    "project": ["项目"],
+    "company": ["公司", "企业", "单位"],
+    "user": ["用户"],
+    "account": ["账户", "账号", "帐号"],
+}
+
+
+@lru_cache(maxsize=1)
+def synonym_table() -> dict[str, str]:
+    """别名 -> 规范词；TEXT_SYNONYMS_PATH 指向的 JSON（{规范词: [别名, ...]}）会合并到内置词典上。"""
+    groups = {canonical: list(aliases) for canonical, aliases in DEFAULT_SYNONYMS.items()}
+    path = get_setting("TEXT_SYNONYMS_PATH")
+    if path:
+        try:
+            extra = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("同义词文件读取失败，只使用内置词典：%s（%s）", path, exc)
+        else:
+            for canonical, aliases in extra.items():
+                groups.setdefault(str(canonical).lower(), []).extend(str(alias) for alias in aliases or [])
+    table: dict[str, str] = {}
+    for canonical, aliases in groups.items():
+        for alias in aliases:
+            table[alias.lower()] = canonical
+    return table
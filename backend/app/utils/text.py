@@ -1,14 +1,193 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
 import re
+import unicodedata
+
+from app.utils.cache import LRUCache
+from app.utils.synonyms import synonym_table
+
+# 中日韩文字：统一表意文字（含扩展 A、兼容区）、假名、谚文音节。
+_CJK_CHARS = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_CJK_RUN = re.compile(f"[{_CJK_CHARS}]+|[^{_CJK_CHARS}]+")
+_IS_CJK = re.compile(f"[{_CJK_CHARS}]")
+_SEPARATORS = re.compile(r"[_\-]+")
+_DISALLOWED = re.compile(f"[^a-z0-9\\s{_CJK_CHARS}]")
+_SPACES = re.compile(r"\s+")
+
+# 英文别名最多按几个连续单词整体查词典（如 "e mail"、"birth date"）。
+_MAX_PHRASE_WORDS = 3
+
+# 表名、字段名、属性标签在各次请求间高度重复：归一化结果与两两相似度都跨请求缓存。
+_NORMALIZED = LRUCache("text.normalize", "TEXT_CACHE_SIZE", 65536)
+_FORMS = LRUCache("text.forms", "TEXT_CACHE_SIZE", 65536)
+_SIMILARITY = LRUCache("text.similarity", "TEXT_SIMILARITY_CACHE_SIZE", 262144)
 
 
 def normalize_text(text: str) -> str:
-    text = text.lower().strip()
-    text = re.sub(r"[_\-]+", " ", text)
-    text = re.sub(r"[^a-z0-9\s]", "", text)
-    return re.sub(r"\s+", " ", text).strip()
+    return _NORMALIZED.get_or_compute(text, lambda: _normalize(text))
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower().strip()
+    text = _SEPARATORS.sub(" ", text)
+    text = _DISALLOWED.sub("", text)
+    return _SPACES.sub(" ", text).strip()
 
 
 def local_name_from_iri(iri: str) -> str:
     if "#" in iri:
         return iri.split("#")[-1]
     return iri.rsplit("/", 1)[-1]
+
+
+@dataclass(frozen=True)
+class LabelForms:
+    """标签的各种归一化形式：text 为 normalize_text 结果；canonical 为按同义词词典替换后的规范形式；
+    pinyin/initials 为整串的拼音与首字母（ASCII 原样保留、去空格）；grams 为中文字符二元组。
+    """
+
+    text: str
+    canonical: str
+    pinyin: str
+    initials: str
+    grams: frozenset[str]
+    cjk: bool
+
+
+def label_forms(text: str) -> LabelForms:
+    """按唯一字符串缓存的归一化结果；同一表名、字段名、属性标签在整个进程内只处理一次。"""
+    return _FORMS.get_or_compute(text, lambda: _build_forms(text))
+
+
+def _build_forms(text: str) -> LabelForms:
+    normalized = normalize_text(text)
+    if not _IS_CJK.search(normalized):
+        canonical = " ".join(_canonical_words(normalized.split()))
+        compact = normalized.replace(" ", "")
+        return LabelForms(normalized, canonical, compact, "", frozenset(), False)
+
+    synonyms = synonym_table()
+    longest = max((len(alias) for alias in synonyms), default=1)
+    canonical_parts: list[str] = []
+    pinyin_parts: list[str] = []
+    initial_parts: list[str] = []
+    chars: list[str] = []
+    transliterated = False
+    for run in _CJK_RUN.findall(normalized):
+        if not _IS_CJK.match(run):
+            words = run.split()
+            canonical_parts.extend(_canonical_words(words))
+            pinyin_parts.extend(words)
+            initial_parts.extend(words)
+            continue
+        chars.extend(run)
+        syllables = _transliterate(run)
+        if syllables:
+            transliterated = True
+            pinyin_parts.extend(syllables)
+            initial_parts.extend(syllable[:1] for syllable in syllables)
+        canonical_parts.extend(_segment(run, synonyms, longest))
+    grams = frozenset("".join(pair) for pair in zip(chars, chars[1:])) or frozenset(chars)
+    return LabelForms(
+        normalized,
+        " ".join(canonical_parts),
+        "".join(pinyin_parts) if transliterated else "",
+        "".join(initial_parts) if transliterated else "",
+        grams,
+        True,
+    )
+
+
+def label_similarity(left: str, right: str) -> float:
+    """两个标签的相似度（0~1）：原文、同义词规范形式、中文字符二元组与跨文字的拼音比较取最大值。"""
+    return _SIMILARITY.get_or_compute((left, right), lambda: _similarity(left, right))
+
+
+def clear_text_caches() -> None:
+    for cache in (_NORMALIZED, _FORMS, _SIMILARITY):
+        cache.clear()
+
+
+def _similarity(left: str, right: str) -> float:
+    a, b = label_forms(left), label_forms(right)
+    if not a.text or not b.text:
+        return 0.0
+    best = _ratio(a.text, b.text)
+    if a.canonical != a.text or b.canonical != b.text:
+        best = max(best, _ratio(a.canonical, b.canonical))
+    if a.grams and b.grams:
+        best = max(best, 2 * len(a.grams & b.grams) / (len(a.grams) + len(b.grams)))
+    if a.cjk != b.cjk and a.pinyin and b.pinyin:
+        # 中文标签对拼音命名的字段（kehu_mingcheng、khmc）。
+        best = max(best, _ratio(a.pinyin, b.pinyin))
+        cjk_side, other = (a, b) if a.cjk else (b, a)
+        if len(cjk_side.initials) >= 3 and len(other.pinyin) >= 3:
+            best = max(best, _ratio(cjk_side.initials, other.pinyin))
+    return best
+
+
+def _ratio(left: str, right: str) -> float:
+    if not left or not right:
+        return 0.0
+    return SequenceMatcher(None, left, right).ratio()
+
+
+def _canonical_words(words: list[str]) -> list[str]:
+    synonyms = synonym_table()
+    result: list[str] = []
+    index = 0
+    while index < len(words):
+        for size in range(min(_MAX_PHRASE_WORDS, len(words) - index), 0, -1):
+            canonical = synonyms.get(" ".join(words[index:index + size]))
+            if canonical is not None:
+                result.append(canonical)
+                index += size
+                break
+        else:
+            result.append(words[index])
+            index += 1
+    return result
+
+
+def _segment(run: str, synonyms: dict[str, str], longest: int) -> list[str]:
+    """正向最长匹配切分中文串：词典命中的词换成规范词，连续未命中的字转成拼音（无 pypinyin 时保留原字）。"""
+    parts: list[str] = []
+    pending = ""
+    index = 0
+    while index < len(run):
+        for size in range(min(longest, len(run) - index), 0, -1):
+            canonical = synonyms.get(run[index:index + size])
+            if canonical is not None:
+                break
+        else:
+            pending += run[index]
+            index += 1
+            continue
+        if pending:
+            parts.append("".join(_transliterate(pending)) or pending)
+            pending = ""
+        parts.append(canonical)
+        index += size
+    if pending:
+        parts.append("".join(_transliterate(pending)) or pending)
+    return parts
+
+
+@lru_cache(maxsize=1)
+def _pinyin():
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:
+        return None
+    return lazy_pinyin
+
+
+def _transliterate(run: str) -> list[str]:
+    """中文串转拼音音节列表；未安装可选依赖 pypinyin 时返回空列表。"""
+    convert = _pinyin()
+    if convert is None:
+        return []
+    return [syllable for syllable in convert(run, errors="ignore") if syllable.isascii()]
@@ -0,0 +1,43 @@
+"""对比两次基准结果：python -m benchmarks.compare old.json new.json [--threshold 0.1]"""
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import json
+import sys
+
+
+def _index(results: dict) -> dict[tuple[str, str], dict]:
+    indexed = {}
+    for report in results.get("scales", []):
+        scale = report["scale"]["name"]
+        for stage, entry in report.get("stages", {}).items():
+            indexed[(scale, stage)] = entry
+    return indexed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as regression")
+    args = parser.parse_args(argv)
+
+    baseline = _index(json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+    current = _index(json.loads(Path(args.current).read_text(encoding="utf-8")))
+    regressions = 0
+    for key in sorted(set(baseline) & set(current)):
+        before = baseline[key]["seconds_min"]
+        after = current[key]["seconds_min"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        scale, stage = key
+        print(f"{scale:<8} {stage:<16} {before:>10.4f}s -> {after:>10.4f}s  x{ratio:.2f}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+"""基准测试入口（在 backend 目录执行）：
+
+    python -m benchmarks.run --scales small,medium --output benchmarks/results/latest.json
+
+各阶段分别计时（不开 tracemalloc）与测量峰值内存（单独一次 tracemalloc 运行），
+结果写成 JSON，便于跨提交对比。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import (
+    generate_ontology,
+    generate_tables,
+    ontology_to_turtle,
+    table_to_csv,
+    tables_to_xlsx,
+)
+
+
+@dataclass
+class Scale:
+    name: str
+    properties: int
+    classes: int
+    rows: int
+    extra_columns: int = 0
+
+
+SCALES = {
+    "tiny": Scale("tiny", properties=20, classes=4, rows=100),
+    "small": Scale("small", properties=100, classes=10, rows=1000),
+    "medium": Scale("medium", properties=500, classes=25, rows=10000, extra_columns=10),
+    "large": Scale("large", properties=2000, classes=50, rows=50000, extra_columns=20),
+}
+
+
+def measure(fn, repeat: int, memory: bool) -> dict:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    entry = {
+        "seconds_min": round(min(timings), 6),
+        "seconds_mean": round(sum(timings) / len(timings), 6),
+        "repeat": repeat,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        entry["peak_mb"] = round(peak / (1024 * 1024), 3)
+    return entry, result
+
+
+def _measure_parallel_parse(raw_tables, repeat: int, max_workers: int) -> dict:
+    """CSV 写成临时文件（与上传暂存后的形态一致），按 1、2、4… 个工作进程解析，报告吞吐与加速比。
+
+    工作进程的内存不在 tracemalloc 统计范围内，因此该阶段只计时。
+    """
+    from app.services.data_source import parse_tabular_files
+
+    os.environ["DATA_PARSE_PARALLEL_MIN_BYTES"] = "0"
+    with tempfile.TemporaryDirectory(prefix="r2rml-bench-") as directory:
+        files = []
+        for name, fields, data in raw_tables:
+            path = Path(directory) / f"{name}.csv"
+            path.write_bytes(table_to_csv(fields, data))
+            files.append((path.name, path))
+        total_bytes = sum(path.stat().st_size for _, path in files)
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= max_workers:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != max_workers:
+            worker_counts.append(max_workers)
+        runs = {}
+        for workers in worker_counts:
+            # 先预热一次，排除进程池启动开销。
+            parse_tabular_files(files, workers=workers)
+            entry, _ = measure(lambda: parse_tabular_files(files, workers=workers), repeat, False)
+            entry["mb_per_second"] = round(total_bytes / (1024 * 1024) / entry["seconds_min"], 3)
+            runs[str(workers)] = entry
+    baseline = runs["1"]["seconds_min"]
+    for entry in runs.values():
+        entry["speedup"] = round(baseline / entry["seconds_min"], 3)
+    best = min(runs.values(), key=lambda item: item["seconds_min"])
+    return {**best, "files": len(files), "cpu_count": os.cpu_count(), "workers": runs}
+
+
+def _measure_csv_engines(csv_files, repeat: int) -> dict:
+    """分别用各 CSV 引擎解析并转成行，报告耗时与相对标准库的加速比；未安装的引擎跳过。"""
+    import importlib.util
+
+    from app.services.csv_engine import CSV_ENGINES, read_csv_columns
+
+    runs = {}
+    for engine in CSV_ENGINES:
+        if engine != "stdlib" and importlib.util.find_spec(engine) is None:
+            continue
+        entry, _ = measure(
+            lambda: [read_csv_columns(content, engine).to_rows() for _, content in csv_files],
+            repeat,
+            False,
+        )
+        runs[engine] = entry
+    baseline = runs["stdlib"]["seconds_min"]
+    for entry in runs.values():
+        entry["speedup"] = round(baseline / entry["seconds_min"], 3)
+    best = min(runs.values(), key=lambda item: item["seconds_min"])
+    return {**best, "engines": runs}
+
+
+ABOX_EXPORTS = (
+    ("ntriples", "none"),
+    ("ntriples", "gzip"),
+    ("ntriples", "zstd"),
+    ("binary", "none"),
+    ("binary", "zstd"),
+)
+
+
+def _measure_abox_exports(tables, mapping, properties, repeat: int) -> dict:
+    """按各输出格式/压缩方式流式导出 ABox，报告耗时与文件体积；未安装 zstandard 时跳过 zstd。"""
+    import importlib.util
+
+    from app.services.abox_generator import export_abox
+
+    runs = {}
+    for output_format, compression in ABOX_EXPORTS:
+        if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+            continue
+        output_dir = tempfile.mkdtemp(prefix="abox-bench-")
+        try:
+            entry, result = measure(
+                lambda: export_abox(
+                    tables,
+                    mapping,
+                    "http://example.com/",
+                    output_dir,
+                    properties=properties,
+                    output_format=output_format,
+                    compression=compression,
+                ),
+                repeat,
+                False,
+            )
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        entry["output_bytes"] = sum(item.bytes for item in result.files)
+        runs[f"{output_format}+{compression}"] = entry
+    best = min(runs.values(), key=lambda item: item["seconds_min"])
+    return {**best, "exports": runs}
+
+
+STORE_BATCH_SIZES = (1000, 10000, 100000)
+
+
+def _measure_abox_store(tables, mapping, properties) -> dict:
+    """按不同批大小把 ABox 写入本地三元组库（SQLite 与已安装时的 Oxigraph），报告每秒三元组数。"""
+    import importlib.util
+
+    from app.services.abox_generator import load_abox
+    from app.services.triple_store import TRIPLE_STORES, close_triple_stores, default_store_path, open_triple_sink
+
+    runs = {}
+    for kind in TRIPLE_STORES:
+        if kind == "oxigraph" and importlib.util.find_spec("pyoxigraph") is None:
+            continue
+        for batch_size in STORE_BATCH_SIZES:
+            store_dir = tempfile.mkdtemp(prefix="abox-store-bench-")
+            try:
+                sink = open_triple_sink(kind, default_store_path(store_dir, kind), batch_size)
+                entry, result = measure(
+                    lambda: load_abox(tables, mapping, "http://example.com/", sink, properties=properties),
+                    1,
+                    False,
+                )
+            finally:
+                close_triple_stores()
+                shutil.rmtree(store_dir, ignore_errors=True)
+            entry["triples"] = result["triples"]
+            entry["batches"] = result["batches"]
+            entry["triples_per_second"] = round(result["triples"] / entry["seconds_min"]) if entry["seconds_min"] else 0
+            runs[f"{kind}/{batch_size}"] = entry
+    best = min(runs.values(), key=lambda item: item["seconds_min"])
+    return {**best, "stores": runs}
+
+
+def _measure_abox_incremental(tables, mapping, properties, change_ratio: float = 0.01) -> dict:
+    """先全量建立行状态，再修改约 1% 的行生成增量，对比两次耗时与输出的三元组数。"""
+
+    from app.services.abox_incremental import generate_abox_delta
+
+    work_dir = tempfile.mkdtemp(prefix="abox-delta-bench-")
+    state_path = f"{work_dir}/state.sqlite3"
+    try:
+        full_entry, full = measure(
+            lambda: generate_abox_delta(tables, mapping, "http://example.com/", work_dir, state_path, properties),
+            1,
+            False,
+        )
+        mapped_fields = {item.table_name: item.field for item in mapping}
+        step = max(1, int(1 / change_ratio))
+        changed_tables = []
+        for table in tables:
+            rows = [dict(row) for row in table["rows"]]
+            field_name = mapped_fields.get(table["name"])
+            if field_name:
+                for row in rows[::step]:
+                    row[field_name] = f"changed-{row.get(field_name)}"
+            changed_tables.append({**table, "rows": rows})
+        delta_entry, delta = measure(
+            lambda: generate_abox_delta(changed_tables, mapping, "http://example.com/", work_dir, state_path, properties),
+            1,
+            False,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    delta_entry["full_seconds"] = full_entry["seconds_min"]
+    delta_entry["full_triples"] = full["triples_added"]
+    delta_entry["rows_changed"] = delta["rows_changed"]
+    delta_entry["delta_triples"] = delta["triples_added"] + delta["triples_removed"]
+    return delta_entry
+
+
+def _measure_relations(tables, repeat: int, memory: bool) -> dict:
+    """为每张表追加一张引用其 id 的子表，测量列草图生成与表间关系推断的耗时，并统计找回的外键数。"""
+    import random
+
+    from app.services.relations import infer_relations, sketch_table
+
+    rng = random.Random(11)
+    child_tables = []
+    for table in tables:
+        ids = [row.get("id") for row in table["rows"]]
+        if not ids:
+            continue
+        rows = [{"ref_id": index, f"{table['name']}_ref": rng.choice(ids)} for index in range(max(1, len(ids) // 10))]
+        child_tables.append({"name": f"{table['name']}_refs", "fields": list(rows[0]), "rows": rows})
+    sketch_entry, sketches = measure(
+        lambda: [sketch_table(table["rows"], table["fields"]) for table in child_tables], repeat, False
+    )
+    all_tables = list(tables) + [
+        {**table, "sketches": sketch} for table, sketch in zip(child_tables, sketches)
+    ]
+    entry, relations = measure(lambda: infer_relations(all_tables), repeat, memory)
+    expected = {(child["name"], parent["name"]) for child, parent in zip(child_tables, tables)}
+    found = {(item["left_table"], item["right_table"]) for item in relations if "left_field" in item}
+    entry["child_sketch_seconds"] = sketch_entry["seconds_min"]
+    entry["relations"] = len(relations)
+    entry["foreign_keys_expected"] = len(expected)
+    entry["foreign_keys_found"] = len(expected & found)
+    entry["foreign_keys_extra"] = len(found - expected)
+    return entry
+
+
+def run_scale(
+    scale: Scale,
+    repeat: int,
+    memory: bool,
+    stages: set[str],
+    llm_url: str | None,
+    parse_workers: int = 4,
+) -> dict:
+    from app.models.schemas import MappingItem
+    from app.services.abox_generator import generate_abox
+    from app.services.data_source import parse_tabular_files
+    from app.services.matcher import _build_candidates, _build_table_summary, heuristic_match, match_properties
+    from app.services.r2rml_generator import generate_r2rml
+    from app.services.tbox_parser import parse_tbox
+    from app.utils.cache import cache_stats
+    from app.utils.text import clear_text_caches
+
+    ontology = generate_ontology(scale.properties, scale.classes)
+    tbox_bytes = ontology_to_turtle(ontology)
+    raw_tables = generate_tables(ontology, scale.rows, scale.extra_columns)
+    csv_files = [(f"{name}.csv", table_to_csv(fields, data)) for name, fields, data in raw_tables]
+
+    report: dict = {
+        "scale": scale.__dict__,
+        "inputs": {
+            "tbox_bytes": len(tbox_bytes),
+            "csv_bytes": sum(len(content) for _, content in csv_files),
+            "tables": len(csv_files),
+        },
+        "stages": {},
+    }
+    stage_results = report["stages"]
+
+    entry, parsed_tbox = measure(lambda: parse_tbox(tbox_bytes, "synthetic.ttl"), repeat, memory)
+    if "parse_tbox" in stages:
+        stage_results["parse_tbox"] = entry
+    properties = parsed_tbox["properties"]
+
+    entry, tables = measure(lambda: parse_tabular_files(csv_files), repeat, memory)
+    if "parse_csv" in stages:
+        stage_results["parse_csv"] = entry
+
+    if "csv_engines" in stages:
+        stage_results["csv_engines"] = _measure_csv_engines(csv_files, repeat)
+
+    if "parse_parallel" in stages:
+        stage_results["parse_parallel"] = _measure_parallel_parse(raw_tables, repeat, parse_workers)
+
+    if "parse_xlsx" in stages:
+        xlsx_bytes = tables_to_xlsx(raw_tables)
+        report["inputs"]["xlsx_bytes"] = len(xlsx_bytes)
+        entry, _ = measure(lambda: parse_tabular_files([("synthetic.xlsx", xlsx_bytes)]), repeat, memory)
+        stage_results["parse_xlsx"] = entry
+
+    if "heuristic_match" in stages:
+        candidates = _build_candidates(tables)
+        summary = _build_table_summary(tables)
+        # 每次计时前清空文本缓存测冷启动；warm_* 为同一 schema 再次匹配（缓存已热）的耗时与命中率。
+        entry, matches = measure(
+            lambda: (clear_text_caches(), heuristic_match(properties, candidates, summary, 0.5))[1], repeat, memory
+        )
+        entry["matched"] = sum(1 for item in matches if item.field)
+        warm, _ = measure(lambda: heuristic_match(properties, candidates, summary, 0.5), repeat, False)
+        entry["warm_seconds_min"] = warm["seconds_min"]
+        entry["text_cache"] = {name: stats["hit_rate"] for name, stats in cache_stats().items()}
+        stage_results["heuristic_match"] = entry
+
+    if "infer_relations" in stages:
+        stage_results["infer_relations"] = _measure_relations(tables, repeat, memory)
+
+    if "llm_match" in stages and llm_url:
+        os.environ["QWEN_API_KEY"] = "benchmark"
+        os.environ["QWEN_BASE_URL"] = llm_url
+        os.environ.pop("QWEN_MODEL_CANDIDATES", None)
+        entry, matches = measure(lambda: match_properties(properties, tables, "llm", 0.5), 1, memory)
+        entry["matched"] = sum(1 for item in matches if item.field)
+        stage_results["llm_match"] = entry
+
+    mapping = [
+        MappingItem(field=prop.field, property_iri=ontology.base + prop.local_name, table_name=prop.domain.lower())
+        for prop in ontology.properties
+    ]
+    if "generate_abox" in stages:
+        entry, output = measure(lambda: generate_abox(tables, mapping, "http://example.com/", properties=properties), repeat, memory)
+        entry["output_bytes"] = len(output[0].encode("utf-8"))
+        stage_results["generate_abox"] = entry
+
+    if "abox_exports" in stages:
+        stage_results["abox_exports"] = _measure_abox_exports(tables, mapping, properties, repeat)
+
+    if "abox_incremental" in stages:
+        stage_results["abox_incremental"] = _measure_abox_incremental(tables, mapping, properties)
+
+    if "abox_store" in stages:
+        stage_results["abox_store"] = _measure_abox_store(tables, mapping, properties)
+
+    if "generate_r2rml" in stages:
+        entry, _ = measure(lambda: generate_r2rml(mapping, "data_table", "http://example.com/"), repeat, memory)
+        stage_results["generate_r2rml"] = entry
+
+    return report
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+ALL_STAGES = (
+    "parse_tbox",
+    "parse_csv",
+    "parse_xlsx",
+    "csv_engines",
+    "parse_parallel",
+    "heuristic_match",
+    "infer_relations",
+    "llm_match",
+    "generate_abox",
+    "abox_exports",
+    "abox_store",
+    "abox_incremental",
+    "generate_r2rml",
+)
+
+
+# 应用运行时会写盘的设置：压测时全部指向临时目录，避免追加到仓库里的 logs/ 与 data/。
+OUTPUT_SETTINGS = {
+    "MATCH_LOG_PATH": "logs/match_reason.log",
+    "DATA_DIR": "data",
+    "FILE_STORE_SPILL_DIR": "spill",
+}
+
+
+def redirect_outputs(work_dir: Path) -> None:
+    """在导入 app 模块之前调用：日志、数据目录与落盘文件都写到 work_dir 下。"""
+    for name, relative in OUTPUT_SETTINGS.items():
+        os.environ[name] = str(work_dir / relative)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="R2RML backend benchmarks")
+    parser.add_argument("--scales", default="tiny,small", help=f"comma separated: {','.join(SCALES)}")
+    parser.add_argument("--stages", default=",".join(ALL_STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak measurement")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1, help="max workers for parse_parallel")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="mock LLM latency per request (seconds)")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="JSON file; defaults to benchmarks/results/<commit>.json")
+    args = parser.parse_args(argv)
+
+    stages = {item.strip() for item in args.stages.split(",") if item.strip()}
+    work_dir = Path(tempfile.mkdtemp(prefix="r2rml-bench-run-"))
+    redirect_outputs(work_dir)
+    server = None
+    llm_url = None
+    if "llm_match" in stages:
+        from mock_llm.server import MockConfig, start_mock_server
+
+        server = start_mock_server(MockConfig(latency=args.llm_latency, jitter=args.llm_jitter))
+        llm_url = server.url
+
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scales": [],
+    }
+    try:
+        for name in args.scales.split(","):
+            scale = SCALES[name.strip()]
+            print(f"running scale={scale.name}", file=sys.stderr)
+            report = run_scale(scale, args.repeat, not args.no_memory, stages, llm_url, max(1, args.parse_workers))
+            results["scales"].append(report)
+            for stage, entry in report["stages"].items():
+                print(f"  {stage:<16} {entry['seconds_min']:>10.4f}s  peak={entry.get('peak_mb', '-')}MB", file=sys.stderr)
+    finally:
+        if server is not None:
+            results["mock_llm"] = server.stats.snapshot()
+            server.stop()
+        if "app.utils.match_logger" in sys.modules:
+            sys.modules["app.utils.match_logger"].shutdown_match_logs()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = Path(args.output) if args.output else Path(__file__).parent / "results" / f"{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from io import BytesIO
+import csv
+import io
+import random
+
+VOCABULARY = [
+    ("name", "名称"),
+    ("email", "邮箱"),
+    ("phone", "电话"),
+    ("address", "地址"),
+    ("city", "城市"),
+    ("country", "国家"),
+    ("age", "年龄"),
+    ("price", "价格"),
+    ("amount", "金额"),
+    ("date", "日期"),
+    ("time", "时间"),
+    ("status", "状态"),
+    ("code", "编码"),
+    ("type", "类型"),
+    ("level", "级别"),
+    ("url", "链接"),
+    ("title", "标题"),
+    ("description", "描述"),
+    ("quantity", "数量"),
+    ("weight", "重量"),
+    ("height", "高度"),
+    ("score", "评分"),
+    ("owner", "负责人"),
+    ("region", "区域"),
+    ("channel", "渠道"),
+    ("category", "类别"),
+    ("source", "来源"),
+    ("remark", "备注"),
+]
+
+CLASS_WORDS = [
+    ("customer", "客户"),
+    ("order", "订单"),
+    ("product", "产品"),
+    ("supplier", "供应商"),
+    ("employee", "员工"),
+    ("department", "部门"),
+    ("invoice", "发票"),
+    ("shipment", "运单"),
+    ("contract", "合同"),
+    ("project", "项目"),
+]
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RANGE_BY_WORD = {
+    "email": "string",
+    "phone": "string",
+    "url": "anyURI",
+    "age": "integer",
+    "quantity": "integer",
+    "price": "decimal",
+    "amount": "decimal",
+    "weight": "decimal",
+    "height": "decimal",
+    "score": "double",
+    "date": "date",
+    "time": "dateTime",
+}
+
+
+@dataclass
+class SyntheticProperty:
+    local_name: str
+    labels: dict[str, str]
+    domain: str
+    range: str
+    field: str
+
+
+@dataclass
+class SyntheticOntology:
+    base: str
+    classes: list[str]
+    parents: dict[str, str]
+    class_labels: dict[str, dict[str, str]]
+    properties: list[SyntheticProperty] = field(default_factory=list)
+
+    def properties_by_class(self) -> dict[str, list[SyntheticProperty]]:
+        grouped: dict[str, list[SyntheticProperty]] = {name: [] for name in self.classes}
+        for prop in self.properties:
+            grouped[prop.domain].append(prop)
+        return grouped
+
+
+def generate_ontology(
+    property_count: int,
+    class_count: int,
+    depth: int = 2,
+    languages: tuple[str, ...] = ("en", "zh"),
+    seed: int = 42,
+    base: str = "http://example.com/onto#",
+) -> SyntheticOntology:
+    rng = random.Random(seed)
+    classes: list[str] = []
+    class_labels: dict[str, dict[str, str]] = {}
+    for index in range(class_count):
+        en, zh = CLASS_WORDS[index % len(CLASS_WORDS)]
+        suffix = "" if index < len(CLASS_WORDS) else str(index // len(CLASS_WORDS))
+        local = f"{en.capitalize()}{suffix}"
+        classes.append(local)
+        class_labels[local] = {"en": f"{en}{suffix}", "zh": f"{zh}{suffix}"}
+
+    parents: dict[str, str] = {}
+    for index, local in enumerate(classes):
+        level = index % max(depth, 1)
+        if level and index - 1 >= 0:
+            parents[local] = classes[index - 1]
+
+    ontology = SyntheticOntology(base=base, classes=classes, parents=parents, class_labels=class_labels)
+    for index in range(property_count):
+        domain = classes[index % class_count]
+        word_en, word_zh = VOCABULARY[index // class_count % len(VOCABULARY)]
+        repeat = index // (class_count * len(VOCABULARY))
+        suffix = str(repeat) if repeat else ""
+        class_en = class_labels[domain]["en"]
+        local = f"{class_en}{word_en.capitalize()}{suffix}"
+        labels = {"en": f"{class_en} {word_en}{suffix}", "zh": f"{class_labels[domain]['zh']}{word_zh}{suffix}"}
+        labels = {lang: value for lang, value in labels.items() if lang in languages}
+        field_name = _field_variant(rng, word_en + suffix)
+        ontology.properties.append(
+            SyntheticProperty(
+                local_name=local,
+                labels=labels,
+                domain=domain,
+                range=RANGE_BY_WORD.get(word_en, "string"),
+                field=field_name,
+            )
+        )
+    return ontology
+
+
+def _field_variant(rng: random.Random, word: str) -> str:
+    variants = [word, word.upper(), f"{word}_value", f"f_{word}", word.replace("e", "", 1) or word]
+    return rng.choice(variants)
+
+
+def ontology_to_turtle(ontology: SyntheticOntology) -> bytes:
+    lines = [
+        f"@prefix : <{ontology.base}> .",
+        "@prefix owl: <http://www.w3.org/2002/07/owl#> .",
+        "@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .",
+        f"@prefix xsd: <{XSD}> .",
+        "",
+    ]
+    for local in ontology.classes:
+        lines.append(f":{local} a owl:Class ;")
+        for lang, label in ontology.class_labels[local].items():
+            lines.append(f'  rdfs:label "{label}"@{lang} ;')
+        if local in ontology.parents:
+            lines.append(f"  rdfs:subClassOf :{ontology.parents[local]} ;")
+        lines[-1] = lines[-1][:-2] + " ."
+    lines.append("")
+    for prop in ontology.properties:
+        lines.append(f":{prop.local_name} a owl:DatatypeProperty ;")
+        for lang, label in prop.labels.items():
+            lines.append(f'  rdfs:label "{label}"@{lang} ;')
+        lines.append(f"  rdfs:domain :{prop.domain} ;")
+        lines.append(f"  rdfs:range xsd:{prop.range} .")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _value_for(rng: random.Random, prop: SyntheticProperty, row: int):
+    if prop.range == "integer":
+        return rng.randint(0, 120)
+    if prop.range in ("decimal", "double"):
+        return round(rng.uniform(0, 10000), 2)
+    if prop.range == "date":
+        return f"20{rng.randint(10, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    if prop.range == "dateTime":
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+    if prop.range == "anyURI":
+        return f"https://example.com/item/{row}"
+    if "email" in prop.local_name.lower():
+        return f"user{row}@example.com"
+    if "phone" in prop.local_name.lower():
+        return f"138{rng.randint(10000000, 99999999)}"
+    return f"{prop.local_name.lower()}-{row}"
+
+
+def generate_tables(
+    ontology: SyntheticOntology,
+    rows: int,
+    extra_columns: int = 0,
+    seed: int = 7,
+) -> list[tuple[str, list[str], list[list]]]:
+    """每个类生成一张表；extra_columns 追加与本体无关的噪声列，用于构造宽表。"""
+    rng = random.Random(seed)
+    tables: list[tuple[str, list[str], list[list]]] = []
+    for class_name, props in ontology.properties_by_class().items():
+        if not props:
+            continue
+        fields = ["id"] + [prop.field for prop in props] + [f"extra_{index}" for index in range(extra_columns)]
+        data: list[list] = []
+        for row in range(1, rows + 1):
+            values = [row] + [_value_for(rng, prop, row) for prop in props]
+            values.extend(rng.randint(0, 1000) for _ in range(extra_columns))
+            data.append(values)
+        tables.append((class_name.lower(), fields, data))
+    return tables
+
+
+def table_to_csv(fields: list[str], data: list[list]) -> bytes:
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(fields)
+    writer.writerows(data)
+    return stream.getvalue().encode("utf-8")
+
+
+def tables_to_xlsx(tables: list[tuple[str, list[str], list[list]]]) -> bytes:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for name, fields, data in tables:
+        sheet = workbook.create_sheet(title=name[:31])
+        sheet.append(fields)
+        for row in data:
+            sheet.append(row)
+    stream = BytesIO()
+    workbook.save(stream)
+    return stream.getvalue()
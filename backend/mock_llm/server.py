@@ -0,0 +1,370 @@
+"""本地 OpenAI 兼容的模拟 LLM 服务，用于离线压测与基准测试。
+
+在 backend 目录执行：
+
+    python -m mock_llm.server --port 8900 --latency 0.5 --jitter 0.2 --error-rate 0.05 --rpm 120
+
+然后设置 QWEN_BASE_URL=http://127.0.0.1:8900/v1、QWEN_API_KEY=mock。
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rpm: int = 0
+    tpm: int = 0
+    seed: int = 0
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    completed: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    by_kind: dict[str, int] = field(default_factory=dict)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "completed": self.completed,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "by_kind": dict(self.by_kind),
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _score(prop: dict, candidate: dict) -> float:
+    from app.models.schemas import PropertyItem
+    from app.services.matcher import FieldCandidate, _score_candidate
+
+    item = PropertyItem(
+        iri=prop.get("iri") or "",
+        label=prop.get("label"),
+        local_name=prop.get("local_name"),
+        domains=prop.get("domains") or [],
+        ranges=prop.get("ranges") or [],
+    )
+    field_candidate = FieldCandidate(
+        table_name=candidate.get("table_name") or "",
+        field=str(candidate.get("field") or ""),
+        samples=candidate.get("sample_values") or [],
+    )
+    return _score_candidate(item, field_candidate)
+
+
+def answer_match(request: dict) -> dict:
+    candidates = request.get("candidates") or []
+    matches = []
+    for prop in request.get("properties") or []:
+        best = None
+        best_score = 0.0
+        for candidate in candidates:
+            score = _score(prop, candidate)
+            if score > best_score:
+                best, best_score = candidate, score
+        matches.append(
+            {
+                "property_iri": prop.get("iri"),
+                "table_name": best.get("table_name") if best else None,
+                "field": best.get("field") if best else None,
+                "reason": "mock: heuristic score" if best else "mock: no candidate",
+                "confidence": round(best_score, 4),
+            }
+        )
+    return {"matches": matches}
+
+
+def answer_model_select(request: dict) -> dict:
+    candidates = request.get("candidates") or [request.get("default_model")]
+    stats = request.get("stats") or {}
+    # 规模大时选候选列表中的最后一个（约定为更快的模型），否则用默认模型。
+    if stats.get("property_count", 0) > 50 and len(candidates) > 1:
+        return {"model": candidates[-1], "reason": "mock: large task"}
+    return {"model": request.get("default_model") or candidates[0], "reason": "mock: default"}
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: MockConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.stats = MockStats()
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.request_times: deque[float] = deque()
+        self.token_times: deque[tuple[float, int]] = deque()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def admit(self, tokens: int) -> tuple[int, float]:
+        """返回 (状态码, 延迟秒)；状态码非 200 时直接返回错误。"""
+        now = time.monotonic()
+        with self.lock:
+            self.stats.requests += 1
+            while self.request_times and now - self.request_times[0] >= 60:
+                self.request_times.popleft()
+            while self.token_times and now - self.token_times[0][0] >= 60:
+                self.token_times.popleft()
+            used_tokens = sum(item[1] for item in self.token_times)
+            if (self.config.rpm and len(self.request_times) >= self.config.rpm) or (
+                self.config.tpm and used_tokens + tokens > self.config.tpm
+            ):
+                self.stats.rate_limited += 1
+                return 429, 0.0
+            self.request_times.append(now)
+            self.token_times.append((now, tokens))
+            if self.config.error_rate and self.random.random() < self.config.error_rate:
+                self.stats.errors += 1
+                return 500, 0.0
+            delay = self.config.latency
+            if self.config.jitter:
+                delay += self.random.uniform(-self.config.jitter, self.config.jitter)
+            self.stats.in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+            return 200, max(0.0, delay)
+
+    def release(self, kind: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self.lock:
+            self.stats.in_flight -= 1
+            self.stats.completed += 1
+            self.stats.prompt_tokens += prompt_tokens
+            self.stats.completion_tokens += completion_tokens
+            self.stats.by_kind[kind] = self.stats.by_kind.get(kind, 0) + 1
+
+
+def build_reply(payload: dict) -> tuple[str, dict]:
+    """按请求内容生成回复消息，返回 (类型, assistant message)。"""
+    messages = payload.get("messages") or []
+    last = messages[-1] if messages else {}
+
+    if payload.get("tools"):
+        if last.get("role") == "tool":
+            content = last.get("content")
+            if isinstance(content, list):
+                content = "".join(item.get("text", "") for item in content if isinstance(item, dict))
+            return "tool_result", {"role": "assistant", "content": content or ""}
+        try:
+            request = json.loads(_text_content(last))
+        except (TypeError, json.JSONDecodeError):
+            request = {}
+        tool = request.get("tool")
+        if tool:
+            call = {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tool, "arguments": json.dumps(request.get("input") or {}, ensure_ascii=False)},
+            }
+            return "tool_call", {"role": "assistant", "content": None, "tool_calls": [call]}
+
+    user_message = next((item for item in reversed(messages) if item.get("role") == "user"), {})
+    try:
+        request = json.loads(_text_content(user_message))
+    except (TypeError, json.JSONDecodeError):
+        request = {}
+    if "default_model" in request:
+        reply = answer_model_select(request)
+        kind = "model_select"
+    elif "properties" in request:
+        reply = answer_match(request)
+        kind = "match"
+    else:
+        reply = {"message": "mock"}
+        kind = "other"
+    return kind, {"role": "assistant", "content": json.dumps(reply, ensure_ascii=False)}
+
+
+def _text_content(message: dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(item.get("text", "") for item in content if isinstance(item, dict))
+    return content or ""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockLLMServer
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.stats.snapshot())
+            return
+        self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            payload = json.loads(raw)
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid json"}})
+            return
+
+        prompt_tokens = estimate_tokens(raw.decode("utf-8", errors="ignore"))
+        status, delay = self.server.admit(prompt_tokens)
+        if status == 429:
+            self._send_json(429, {"error": {"message": "rate limited", "type": "rate_limit"}}, {"Retry-After": "1"})
+            return
+        if status != 200:
+            self._send_json(status, {"error": {"message": "mock failure", "type": "server_error"}})
+            return
+
+        kind = "other"
+        completion_tokens = 0
+        try:
+            if payload.get("stream"):
+                kind, message = build_reply(payload)
+                completion_tokens = estimate_tokens(message.get("content") or "")
+                self._send_stream(payload, message, delay, prompt_tokens, completion_tokens)
+                return
+            time.sleep(delay)
+            kind, message = build_reply(payload)
+            completion_tokens = estimate_tokens(message.get("content") or json.dumps(message.get("tool_calls")))
+            finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+            body = {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model") or "mock",
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+            self._send_json(200, body)
+        finally:
+            self.server.release(kind, prompt_tokens, completion_tokens)
+
+    def _send_stream(
+        self,
+        payload: dict,
+        message: dict,
+        delay: float,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        """以 SSE 分块返回：首块前等待 20% 延迟，其余延迟均摊到各块之间。"""
+        content = message.get("content") or ""
+        chunks = [content[index : index + 24] for index in range(0, len(content), 24)] or [""]
+        chunk_delay = delay * 0.8 / len(chunks)
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model") or "mock",
+        }
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        time.sleep(delay * 0.2)
+        for chunk in chunks:
+            event = {**base, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(chunk_delay)
+        final = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            final["usage"] = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def start_mock_server(config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> MockLLMServer:
+    return MockLLMServer((host, port), config or MockConfig()).start()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="prompt tokens per minute before 429 (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        seed=args.seed,
+    )
+    server = MockLLMServer((args.host, args.port), config)
+    print(f"mock LLM listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
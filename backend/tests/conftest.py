@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 在导入 app 模块之前把日志、数据目录与上传落盘目录指向临时目录，测试不写入仓库。
+_WORK_DIR = Path(tempfile.mkdtemp(prefix="r2rml-tests-"))
+os.environ.setdefault("MATCH_LOG_PATH", str(_WORK_DIR / "logs" / "match_reason.log"))
+os.environ.setdefault("DATA_DIR", str(_WORK_DIR / "data"))
+os.environ.setdefault("FILE_STORE_SPILL_DIR", str(_WORK_DIR / "spill"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,67 @@
+import random
+
+from app.services.abox_links import LinkSpec, hash_join, iter_link_triples, join_key
+from app.services.subjects import subject_specs
+
+BASE = "http://example.org/"
+LINK = LinkSpec("http://example.org/placedBy", "orders", "customer_id", "customers", "id")
+SUBJECTS = subject_specs([{"table_name": "orders", "keys": ["id"]}, {"table_name": "customers", "keys": ["id"]}])
+
+
+def _pairs(rows: int, keys: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [(str(rng.randrange(keys)), f"v{seed}-{index}") for index in range(rows)]
+
+
+def test_grace_join_matches_in_memory_join():
+    build = _pairs(500, 120, 1)
+    probe = _pairs(800, 150, 2)
+    expected = sorted(hash_join(build, probe, len(build), memory_rows=len(build)))
+    # 内存上限远小于构建侧：分区后仍过大的分区会继续按下一组哈希位拆分。
+    spilled = sorted(hash_join(build, probe, len(build), memory_rows=10, partitions=2))
+    assert spilled == expected
+    assert len(expected) > 0
+
+
+def test_grace_join_handles_single_hot_key():
+    build = [("k", f"b{index}") for index in range(50)]
+    probe = [("k", "p0"), ("other", "p1")]
+    result = list(hash_join(build, probe, len(build), memory_rows=5, partitions=4))
+    assert sorted(result) == sorted((f"b{index}", "p0") for index in range(50))
+
+
+def test_join_key_normalizes_numeric_forms():
+    assert join_key(1) == join_key(1.0) == join_key("1.0") == join_key(" 1 ") == "1"
+    assert join_key(-0.0) == join_key("-0") == join_key(0) == "0"
+    assert join_key("007") == "007"
+
+
+def test_links_join_integer_and_float_keys():
+    # 同一键在两张表里被推断成不同类型（int 与 float），连接结果不受影响。
+    tables = [
+        {"name": "orders", "rows": [{"id": 10, "customer_id": 1.0}, {"id": 11, "customer_id": 2.0}]},
+        {"name": "customers", "rows": [{"id": 1}, {"id": "2"}]},
+    ]
+    triples = [triple for _, batch in iter_link_triples(tables, [LINK], BASE, SUBJECTS) for triple in batch]
+    assert sorted(triples) == [
+        ("<http://example.org/table/orders/key/10>", "<http://example.org/placedBy>", "<http://example.org/table/customers/key/1>"),
+        ("<http://example.org/table/orders/key/11>", "<http://example.org/placedBy>", "<http://example.org/table/customers/key/2>"),
+    ]
+
+
+def test_links_spill_to_disk_with_same_result():
+    tables = [
+        {"name": "orders", "rows": [{"id": index, "customer_id": index % 7} for index in range(40)]},
+        {"name": "customers", "rows": [{"id": index} for index in range(7)]},
+    ]
+
+    def collect(memory_rows: int) -> list:
+        return sorted(
+            triple
+            for _, batch in iter_link_triples(tables, [LINK], BASE, SUBJECTS, memory_rows=memory_rows)
+            for triple in batch
+        )
+
+    in_memory = collect(1000)
+    assert len(in_memory) == 40
+    assert collect(2) == in_memory
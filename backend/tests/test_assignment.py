@@ -0,0 +1,28 @@
+from app.services.assignment import AssignmentEdge, solve_assignment
+
+
+def test_assignment_maximizes_total_score():
+    # 贪心会先取 0.9（行 0 -> 列 0），行 1 只剩 0.1；全局最优是交叉分配，总分 1.65。
+    edges = [
+        AssignmentEdge(0, 0, 0.9),
+        AssignmentEdge(0, 1, 0.8),
+        AssignmentEdge(1, 0, 0.85),
+        AssignmentEdge(1, 1, 0.1),
+    ]
+    assert solve_assignment(2, 2, edges) == {0: 1, 1: 0}
+
+
+def test_assignment_respects_column_capacity():
+    # 列 0 最多容纳两行：把行 0 让给只有它能用的列 1，总分 0.8 + 0.7 + 0.6 最高。
+    edges = [
+        AssignmentEdge(0, 0, 0.9),
+        AssignmentEdge(1, 0, 0.8),
+        AssignmentEdge(2, 0, 0.7),
+        AssignmentEdge(0, 1, 0.6),
+    ]
+    assert solve_assignment(3, 2, edges, capacities=[2, 1]) == {0: 1, 1: 0, 2: 0}
+
+
+def test_assignment_leaves_rows_without_positive_edges_unassigned():
+    edges = [AssignmentEdge(0, 0, 0.7), AssignmentEdge(1, 0, 0.0)]
+    assert solve_assignment(2, 1, edges) == {0: 0}
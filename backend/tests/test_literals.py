@@ -0,0 +1,48 @@
+import rdflib
+
+from app.services.literals import RDF_LANG_STRING, XSD, compile_literal_encoder, escape_iri
+from app.services.rdf_output import iter_ntriples_lines
+
+SUBJECT = "<http://example.org/s>"
+PREDICATE = "<http://example.org/p>"
+
+
+def _parse(objects: list[str]) -> rdflib.Graph:
+    text = "".join(iter_ntriples_lines((SUBJECT, PREDICATE, obj) for obj in objects))
+    graph = rdflib.Graph()
+    graph.parse(data=text, format="nt")
+    return graph
+
+
+def test_string_literals_escape_quotes_backslashes_and_newlines():
+    value = 'say "hi"\\ \nnext line\r'
+    encoded = compile_literal_encoder(XSD + "string")(value)
+    (literal,) = _parse([encoded]).objects()
+    assert str(literal) == value
+
+
+def test_typed_literals_keep_datatype_and_escape_lexical_form():
+    encode = compile_literal_encoder(XSD + "integer")
+    assert encode("42") == f'"42"^^<{XSD}integer>'
+    # 无法转换为整数的值退回按 Python 类型编码，仍需转义。
+    fallback = encode('4"2')
+    (literal,) = _parse([fallback]).objects()
+    assert str(literal) == '4"2'
+
+
+def test_language_tagged_literals():
+    encoded = compile_literal_encoder(RDF_LANG_STRING, "zh")('中文 "引号"')
+    (literal,) = _parse([encoded]).objects()
+    assert literal.language == "zh"
+    assert str(literal) == '中文 "引号"'
+
+
+def test_unsafe_datatype_iris_are_escaped():
+    encoded = compile_literal_encoder(XSD + "custom type")("x")
+    (literal,) = _parse([encoded]).objects()
+    assert str(literal.datatype) == XSD + "custom%20type"
+
+
+def test_escape_iri_percent_encodes_forbidden_characters():
+    assert escape_iri("http://example.org/a b<c>\"d") == "http://example.org/a%20b%3Cc%3E%22d"
+    assert escape_iri("http://example.org/中文#x") == "http://example.org/中文#x"
@@ -0,0 +1,56 @@
+import uuid
+
+from app.models.schemas import PropertyItem
+from app.services.matcher import match_properties_incremental
+
+PROPERTIES = [
+    PropertyItem(iri="http://example.org/name", label="name"),
+    PropertyItem(iri="http://example.org/email", label="email"),
+]
+PERSON = {"name": "person", "fields": ["name", "email"], "sample_rows": [{"name": "Alice", "email": "a@example.org"}]}
+INVENTORY = {"name": "inventory", "fields": ["sku", "quantity"], "sample_rows": [{"sku": "A-1", "quantity": 3}]}
+
+
+def _session() -> str:
+    return uuid.uuid4().hex
+
+
+def test_first_run_adds_every_property():
+    results, diff = match_properties_incremental(PROPERTIES, [PERSON], "heuristic", 0.5, session_id=_session())
+    assert [(item.table_name, item.field) for item in results] == [("person", "name"), ("person", "email")]
+    assert sorted(diff.added) == sorted(prop.iri for prop in PROPERTIES)
+    assert (diff.rescored, diff.reused) == (2, 0)
+
+
+def test_unchanged_input_reuses_every_property():
+    session = _session()
+    first, _ = match_properties_incremental(PROPERTIES, [PERSON], "heuristic", 0.5, session_id=session)
+    second, diff = match_properties_incremental(PROPERTIES, [PERSON], "heuristic", 0.5, session_id=session)
+    assert second == first
+    assert (diff.rescored, diff.reused) == (0, 2)
+    assert not diff.added and not diff.changed and not diff.removed
+
+
+def test_adding_unrelated_table_keeps_local_matches():
+    # 回归：新增一张无关表曾让全部属性的指纹失效。本地模式只对达到阈值的候选取指纹。
+    for mode in ("heuristic", "assignment"):
+        session = _session()
+        match_properties_incremental(PROPERTIES, [PERSON], mode, 0.5, session_id=session)
+        _, diff = match_properties_incremental(PROPERTIES, [PERSON, INVENTORY], mode, 0.5, session_id=session)
+        assert (diff.rescored, diff.reused) == (0, 2), mode
+
+
+def test_config_change_rescores_without_reporting_additions():
+    session = _session()
+    match_properties_incremental(PROPERTIES, [PERSON], "heuristic", 0.5, session_id=session)
+    _, diff = match_properties_incremental(PROPERTIES, [PERSON], "heuristic", 0.6, session_id=session)
+    assert (diff.rescored, diff.reused) == (2, 0)
+    assert diff.added == []
+
+
+def test_removed_property_is_reported():
+    session = _session()
+    match_properties_incremental(PROPERTIES, [PERSON], "heuristic", 0.5, session_id=session)
+    _, diff = match_properties_incremental(PROPERTIES[:1], [PERSON], "heuristic", 0.5, session_id=session)
+    assert diff.removed == [PROPERTIES[1].iri]
+    assert diff.reused == 1
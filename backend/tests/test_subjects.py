@@ -0,0 +1,51 @@
+import pytest
+
+from app.services.subjects import SubjectSpec, compile_subject, subject_template, track_subjects
+
+BASE = "http://example.org/"
+
+
+@pytest.mark.parametrize("spec", [SubjectSpec(keys=["id"]), SubjectSpec(keys=["id"], hash=True)])
+def test_subject_does_not_depend_on_inferred_key_type(spec):
+    # 回归：哈希主语曾按 repr 计算，列类型推断从文本变成整数（"1" -> 1）时主语随之改变。
+    subject_of = compile_subject("people", BASE, spec)
+    subjects = {subject_of(index, {"id": value}) for index, value in enumerate([1, 1.0, "1", " 1 "], start=1)}
+    assert len(subjects) == 1
+
+
+def test_hash_subject_is_stable_across_runs():
+    subject_of = compile_subject("people", BASE, SubjectSpec(keys=["id", "name"], hash=True))
+    row = {"id": 7, "name": "Alice"}
+    assert subject_of(1, row) == subject_of(99, dict(row))
+    assert subject_of(1, row).startswith("<http://example.org/table/people/hash/")
+    assert subject_of(1, row) != subject_of(1, {"id": 7, "name": "Bob"})
+
+
+def test_key_subject_encodes_segments():
+    subject_of = compile_subject("people", BASE, SubjectSpec(keys=["code"]))
+    assert subject_of(1, {"code": "a b/c"}) == "<http://example.org/table/people/key/a%20b%2Fc>"
+
+
+def test_empty_key_rows_have_no_subject():
+    subject_of = compile_subject("people", BASE, SubjectSpec(keys=["id"]))
+    rows = [{"id": 1}, {"id": None}, {"id": ""}, {"id": 2}]
+    assert [subject_of(index, row) for index, row in enumerate(rows, start=1)] == [
+        "<http://example.org/table/people/key/1>",
+        None,
+        None,
+        "<http://example.org/table/people/key/2>",
+    ]
+    tracked = list(track_subjects("people", rows, subject_of))
+    assert [row for _, row in tracked] == [rows[0], rows[3]]
+
+
+def test_r2rml_template_matches_generated_subjects():
+    spec = SubjectSpec(keys=["id"])
+    template = subject_template("people", BASE, spec)
+    assert template == "http://example.org/table/people/key/{id}"
+    assert compile_subject("people", BASE, spec)(1, {"id": 5}) == "<" + template.replace("{id}", "5") + ">"
+
+
+def test_hash_subjects_have_no_r2rml_template():
+    assert subject_template("people", BASE, SubjectSpec(keys=["id"], hash=True)) is None
+    assert subject_template("people", BASE, None) is None
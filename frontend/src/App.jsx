@@ -43,6 +43,7 @@ export default function App() {
   const [graphOffset, setGraphOffset] = useState({ x: 0, y: 0 });
   const [isPanning, setIsPanning] = useState(false);
   const [panStart, setPanStart] = useState(null);
+  const matchSessionRef = useRef(`session-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`);
   const simulationRef = useRef(null);
   const nodesRef = useRef([]);
   const svgRef = useRef(null);
@@ -283,6 +284,54 @@ export default function App() {
     }
   };
 
+  // 首次匹配走流式接口，逐条展示结果并写入会话状态；后续重算走增量接口复用未变化的结果。
+  const runMatchStream = async () => {
+    const response = await fetch('/api/match/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+      body: JSON.stringify({
+        properties: tboxProps,
+        tables,
+        mode: matchMode,
+        threshold: confidence / 100,
+        session_id: matchSessionRef.current
+      })
+    });
+    if (!response.ok || !response.body) {
+      const data = await response.json().catch(() => ({}));
+      throw new Error(data.detail || '匹配失败');
+    }
+    setMatches([]);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let received = 0;
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      const items = [];
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const record = JSON.parse(line);
+        if (record.type === 'match') {
+          items.push(record.item);
+        } else if (record.type === 'summary') {
+          handleStatus(`已生成自动匹配结果：匹配 ${record.matched}/${record.total}，耗时 ${record.elapsed}s`);
+        } else if (record.type === 'error') {
+          throw new Error(record.detail || '匹配失败');
+        }
+      }
+      if (items.length) {
+        received += items.length;
+        setMatches((prev) => [...prev, ...items]);
+        handleStatus(`匹配中：已返回 ${received}/${tboxProps.length}`);
+      }
+    }
+  };
+
   const runMatch = async () => {
     if (!tables.length || !tboxProps.length) {
       handleStatus('请先完成 TBox 与数据解析');
@@ -290,6 +339,10 @@ export default function App() {
     }
     setBusy(true);
     try {
+      if (!matches.length) {
+        await runMatchStream();
+        return;
+      }
       const response = await fetch('/api/match', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
@@ -297,13 +350,20 @@ export default function App() {
           properties: tboxProps,
           tables,
           mode: matchMode,
-          threshold: confidence / 100
+          threshold: confidence / 100,
+          session_id: matchSessionRef.current,
+          incremental: true
         })
       });
       const data = await response.json();
       if (!response.ok) throw new Error(data.detail || '匹配失败');
       setMatches(data.matches || []);
-      handleStatus('已生成自动匹配结果');
+      const diff = data.diff;
+      if (diff) {
+        handleStatus(`已生成自动匹配结果：重算 ${diff.rescored}，复用 ${diff.reused}，变化 ${diff.changed.length}`);
+      } else {
+        handleStatus('已生成自动匹配结果');
+      }
     } catch (error) {
       handleStatus(error.message);
     } finally {
@@ -338,7 +398,13 @@ export default function App() {
       const response = await fetch('/api/abox', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ tables, mapping: mappingPayload })
+        body: JSON.stringify({
+          tables,
+          mapping: mappingPayload,
+          properties: tboxProps,
+          object_properties: tboxObjectProps,
+          infer_links: true
+        })
       });
       const data = await response.json();
       if (!response.ok) throw new Error(data.detail || 'ABox 生成失败');
@@ -361,7 +427,15 @@ export default function App() {
       const response = await fetch('/api/r2rml', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ mapping: mappingPayload, table_name: tableName })
+        body: JSON.stringify({
+          mapping: mappingPayload,
+          table_name: tableName,
+          // 关系推断只需字段与列草图，不必上传全部行。
+          tables: tables.map(({ name, fields, sketches }) => ({ name, fields, sketches })),
+          properties: tboxProps,
+          object_properties: tboxObjectProps,
+          infer_links: true
+        })
       });
       const data = await response.json();
       if (!response.ok) throw new Error(data.detail || 'R2RML 生成失败');
@@ -847,7 +921,9 @@ export default function App() {
                 匹配模式
                 <select value={matchMode} onChange={(event) => setMatchMode(event.target.value)}>
                   <option value="heuristic">启发式</option>
+                  <option value="assignment">启发式（全局分配）</option>
                   <option value="llm">LLM（Qwen）</option>
+                  <option value="pipeline">召回 + LLM 精排</option>
                 </select>
               </label>
             </div>